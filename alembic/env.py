@@ -4,8 +4,10 @@ from sqlalchemy import engine_from_config, pool
 
 from alembic import context
 from src.fast_stars_bot.config.settings import settings
+from src.fast_stars_bot.db.models.balance_ledger import BalanceLedger, BalanceSnapshot
 from src.fast_stars_bot.db.models.base import Base
 from src.fast_stars_bot.db.models.basketball_log import BasketballLog
+from src.fast_stars_bot.db.models.broadcast_job import BroadcastJob
 from src.fast_stars_bot.db.models.channel import Channel
 from src.fast_stars_bot.db.models.cube_game import CubeGame
 from src.fast_stars_bot.db.models.daily_bonus_claim import DailyBonusClaim
@@ -14,6 +16,7 @@ from src.fast_stars_bot.db.models.game_settings import GameSetting
 from src.fast_stars_bot.db.models.giveaway import Giveaway, GiveawayTicket
 from src.fast_stars_bot.db.models.promo_code import PromoActivation, PromoCode
 from src.fast_stars_bot.db.models.referral import Referral
+from src.fast_stars_bot.db.models.referral_stats import ReferralStats
 from src.fast_stars_bot.db.models.slot_machine_log import SlotMachineLog
 from src.fast_stars_bot.db.models.subscription_log import SubscriptionLog
 from src.fast_stars_bot.db.models.task import Task, TaskCompletion
@@ -0,0 +1,105 @@
+"""Add balance_ledger and balance_snapshots tables
+
+Revision ID: a8b7c0d1e2f3
+Revises: f7a6b9c0d1e2
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a8b7c0d1e2f3"
+down_revision: Union[str, None] = "f7a6b9c0d1e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _add_months(month: date, months: int) -> date:
+    year, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + year, index + 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "balance_ledger",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("delta", sa.Numeric(10, 2), nullable=False),
+        sa.Column("balance_after", sa.Numeric(10, 2), nullable=False),
+        sa.Column(
+            "reason",
+            sa.Enum(
+                "DEPOSIT",
+                "WITHDRAWAL",
+                "ADMIN",
+                "DAILY_BONUS",
+                "PROMO",
+                "TASK",
+                "SUBSCRIPTION",
+                "REFERRAL",
+                "VIP",
+                "GIVEAWAY",
+                "X2GAME",
+                "CUBE_GAME",
+                "CUBE_TIMEOUT",
+                "BASKETBALL",
+                "SLOT_MACHINE",
+                name="ledgerreason",
+            ),
+            nullable=False,
+        ),
+        sa.Column("ref_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index(
+        "ix_balance_ledger_user_created",
+        "balance_ledger",
+        ["user_id", "created_at"],
+    )
+    # Дальше секции создаёт бот при запуске и ночной задачей
+    month = datetime.now(timezone.utc).date().replace(day=1)
+    for offset in range(3):
+        start = _add_months(month, offset)
+        end = _add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE balance_ledger_{start:%Y_%m} "
+            "PARTITION OF balance_ledger "
+            f"FOR VALUES FROM ('{start} 00:00+00') TO ('{end} 00:00+00')"
+        )
+
+    op.create_table(
+        "balance_snapshots",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("taken_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("stars", sa.Numeric(10, 2), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "taken_at"),
+    )
+    # Начальные снимки: история до журнала сводится к текущему балансу
+    op.execute("""
+        INSERT INTO balance_snapshots (user_id, taken_at, stars)
+        SELECT id, now(), stars FROM users
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("balance_snapshots")
+    # Секции удаляются вместе с родительской таблицей
+    op.drop_table("balance_ledger")
+    sa.Enum(name="ledgerreason").drop(op.get_bind(), checkfirst=True)
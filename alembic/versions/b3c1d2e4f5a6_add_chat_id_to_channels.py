@@ -0,0 +1,29 @@
+"""Add chat_id to channels
+
+Revision ID: b3c1d2e4f5a6
+Revises: 5ff015e3e31a
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b3c1d2e4f5a6"
+down_revision: Union[str, None] = "5ff015e3e31a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("channels", sa.Column("chat_id", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("channels", "chat_id")
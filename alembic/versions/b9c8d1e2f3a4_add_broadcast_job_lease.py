@@ -0,0 +1,34 @@
+"""Add owner lease to broadcast_jobs
+
+Revision ID: b9c8d1e2f3a4
+Revises: a8b7c0d1e2f3
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b9c8d1e2f3a4"
+down_revision: Union[str, None] = "a8b7c0d1e2f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("broadcast_jobs", sa.Column("owner", sa.String(), nullable=True))
+    op.add_column(
+        "broadcast_jobs",
+        sa.Column("lease_until", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("broadcast_jobs", "lease_until")
+    op.drop_column("broadcast_jobs", "owner")
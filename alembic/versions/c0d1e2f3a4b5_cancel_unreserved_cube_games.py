@@ -0,0 +1,34 @@
+"""Cancel cube games opened before stakes were reserved
+
+Revision ID: c0d1e2f3a4b5
+Revises: b9c8d1e2f3a4
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c0d1e2f3a4b5"
+down_revision: Union[str, None] = "b9c8d1e2f3a4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Ставки теперь списываются при входе за стол; у открытых до этого столов
+    # они не списаны, и при выплате победителю банк оказался бы пустым.
+    # Индекс активных игроков в Redis пересобирается при старте бота
+    op.execute("""
+        UPDATE cube_games SET status = 'CANCELED'
+        WHERE status IN ('WAITING', 'IN_PROGRESS')
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Отменённые игры не восстанавливаются
+    pass
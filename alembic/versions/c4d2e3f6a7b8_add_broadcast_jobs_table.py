@@ -0,0 +1,48 @@
+"""Add broadcast jobs table
+
+Revision ID: c4d2e3f6a7b8
+Revises: b3c1d2e4f5a6
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4d2e3f6a7b8"
+down_revision: Union[str, None] = "b3c1d2e4f5a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "broadcast_jobs",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("audience", sa.String(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("SCHEDULED", "RUNNING", "FINISHED", name="broadcaststatus"),
+            nullable=False,
+        ),
+        sa.Column("send_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_user_id", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=True),
+        sa.Column("sent", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("broadcast_jobs")
+    sa.Enum(name="broadcaststatus").drop(op.get_bind(), checkfirst=True)
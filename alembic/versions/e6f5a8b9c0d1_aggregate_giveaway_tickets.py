@@ -0,0 +1,59 @@
+"""Aggregate giveaway tickets per user
+
+Revision ID: e6f5a8b9c0d1
+Revises: d5e4f7a8b9c0
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e6f5a8b9c0d1"
+down_revision: Union[str, None] = "d5e4f7a8b9c0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "giveaway_tickets",
+        sa.Column("count", sa.Integer(), server_default="1", nullable=False),
+    )
+    # Схлопываем строки-билеты в одну строку на (розыгрыш, пользователь)
+    op.execute("""
+        UPDATE giveaway_tickets AS t
+        SET count = agg.total
+        FROM (
+            SELECT min(id) AS id, count(*) AS total
+            FROM giveaway_tickets
+            GROUP BY giveaway_id, user_id
+        ) AS agg
+        WHERE t.id = agg.id
+        """)
+    op.execute("""
+        DELETE FROM giveaway_tickets
+        WHERE id NOT IN (
+            SELECT min(id) FROM giveaway_tickets GROUP BY giveaway_id, user_id
+        )
+        """)
+    op.alter_column("giveaway_tickets", "count", server_default=None)
+    op.create_unique_constraint(
+        "uq_giveaway_tickets_user", "giveaway_tickets", ["giveaway_id", "user_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("uq_giveaway_tickets_user", "giveaway_tickets", type_="unique")
+    op.execute("""
+        INSERT INTO giveaway_tickets (user_id, giveaway_id)
+        SELECT t.user_id, t.giveaway_id
+        FROM giveaway_tickets AS t, generate_series(2, t.count)
+        """)
+    op.drop_column("giveaway_tickets", "count")
@@ -0,0 +1,41 @@
+"""Add referral_stats table
+
+Revision ID: f7a6b9c0d1e2
+Revises: e6f5a8b9c0d1
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f7a6b9c0d1e2"
+down_revision: Union[str, None] = "e6f5a8b9c0d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Строки заполняются лениво при первом чтении и ночной сверкой
+    op.create_table(
+        "referral_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("referral_count", sa.Integer(), nullable=False),
+        sa.Column("nested_referrals", sa.Integer(), nullable=False),
+        sa.Column("banned_count", sa.Integer(), nullable=False),
+        sa.Column("bonus_percent_sum", sa.Numeric(14, 4), nullable=False),
+        sa.Column("task_percent_sum", sa.Numeric(14, 4), nullable=False),
+        sa.Column("reconciled_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("referral_stats")
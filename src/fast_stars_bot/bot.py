@@ -3,14 +3,19 @@ import logging
 
 from aiogram import Bot, Dispatcher
 from config.settings import settings
+from db.session import SessionLocal
 from handlers.admin_handlers import register_admin_handlers
+from handlers.channel_member_handlers import register_channel_member_handlers
 from handlers.daily_bonus_handlers import register_daily_bonus_handlers
 from handlers.deposit_handlers import register_deposit_handlers
 from handlers.giveaway_handlers import register_giveaway_handlers
 from handlers.invite_friend_handlers import register_invite_friend_handlers
 from handlers.menu_handlers import register_menu_handlers
 from handlers.minigames_handlers.basketball_handlers import register_basketball_handlers
-from handlers.minigames_handlers.cube_handlers import register_cube_handlers
+from handlers.minigames_handlers.cube_handlers import (
+    register_cube_handlers,
+    throw_timeout_loop,
+)
 from handlers.minigames_handlers.games_handlers import register_games_handlers
 from handlers.minigames_handlers.slot_machine_handlers import (
     register_slot_machine_settings,
@@ -29,10 +34,18 @@ from middlewares.block_actions_while_playing import BlockActionsWhilePlayingMidd
 from middlewares.logging import LoggingMiddleware
 from middlewares.private_chat_only import PrivateChatOnlyMiddleware
 from middlewares.subscription_required import SubscriptionRequiredMiddleware
+from middlewares.user_context import UserContextMiddleware
 from middlewares.username_tracking import UserTrackingMiddleware
+from services.active_players import rebuild_active_players
+from services.broadcast import resume_broadcast_jobs
+from services.channel_resolver import refresh_channel_chat_ids
 from services.cleanup import cleanup_old_canceled_games
 from services.giveaway_scheduler import setup_weekly_giveaway
+from services.ledger_scheduler import setup_balance_ledger_jobs
+from services.outbound import outbound_scheduler
+from services.referral_reconciler import setup_referral_stats_reconciliation
 from services.scheduler import setup_daily_reminders
+from utils.ledger_requests import ensure_ledger_partitions
 
 logging.basicConfig(
     level=logging.INFO,
@@ -47,9 +60,12 @@ logging.basicConfig(
 logging.getLogger("aiogram.event").setLevel(logging.WARNING)
 
 bot = Bot(token=settings.TOKEN)
+bot.session.middleware(outbound_scheduler)
 dp = Dispatcher()
 
 # Middleware
+dp.message.outer_middleware(UserContextMiddleware())
+dp.callback_query.outer_middleware(UserContextMiddleware())
 dp.message.middleware(PrivateChatOnlyMiddleware())
 dp.callback_query.middleware(PrivateChatOnlyMiddleware())
 dp.message.middleware(UserTrackingMiddleware())
@@ -83,17 +99,34 @@ register_stats_handlers(dp)
 register_games_handlers(dp)
 register_giveaway_handlers(dp)
 register_slot_machine_settings(dp)
+register_channel_member_handlers(dp)
 
 
 async def main():
+    # Rebuild cube active players index
+    async with SessionLocal() as session:
+        await rebuild_active_players(session)
+    # Balance ledger partitions for this and upcoming months
+    async with SessionLocal() as session:
+        await ensure_ledger_partitions(session)
     # Scheduler
     setup_daily_reminders(bot)
     # Giveaway scheduler
     setup_weekly_giveaway(bot)
+    # Nightly referral stats reconciliation
+    setup_referral_stats_reconciliation()
+    # Nightly balance snapshots
+    setup_balance_ledger_jobs()
     # Cancelled games cleanup
     asyncio.create_task(cleanup_old_canceled_games())
+    # Unfinished broadcasts
+    await resume_broadcast_jobs(bot)
+    # Private channel chat ids
+    asyncio.create_task(refresh_channel_chat_ids(bot))
+    # Cube throw deadlines, including ones left by a previous run
+    asyncio.create_task(throw_timeout_loop(bot))
     # Start polling
-    await dp.start_polling(bot)
+    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+import enum
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    func,
+)
+
+from .base import Base
+
+
+class LedgerReason(enum.Enum):
+    DEPOSIT = "deposit"
+    WITHDRAWAL = "withdrawal"
+    ADMIN = "admin"
+    DAILY_BONUS = "daily_bonus"
+    PROMO = "promo"
+    TASK = "task"
+    SUBSCRIPTION = "subscription"
+    REFERRAL = "referral"
+    VIP = "vip"
+    GIVEAWAY = "giveaway"
+    X2GAME = "x2game"
+    CUBE_GAME = "cube_game"
+    CUBE_TIMEOUT = "cube_timeout"
+    BASKETBALL = "basketball"
+    SLOT_MACHINE = "slot_machine"
+
+
+class BalanceLedger(Base):
+    """
+    Журнал изменений баланса: строки только добавляются, в той же транзакции,
+    что и само изменение. Таблица секционирована по месяцам (created_at).
+    """
+
+    __tablename__ = "balance_ledger"
+    __table_args__ = (
+        Index("ix_balance_ledger_user_created", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Ключ секционирования обязан входить в первичный ключ
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    created_at = Column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
+    )
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    delta = Column(Numeric(10, 2), nullable=False)
+    balance_after = Column(Numeric(10, 2), nullable=False)
+    reason = Column(Enum(LedgerReason), nullable=False)
+    ref_id = Column(Integer, nullable=True)  # id игры, депозита, задания и т.п.
+
+
+class BalanceSnapshot(Base):
+    """
+    Баланс пользователя на момент taken_at: сверка читает только строки
+    журнала после последнего снимка.
+    """
+
+    __tablename__ = "balance_snapshots"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    taken_at = Column(DateTime(timezone=True), primary_key=True)
+    stars = Column(Numeric(10, 2), nullable=False)
@@ -0,0 +1,37 @@
+import enum
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, Column, DateTime, Enum, Integer, String
+
+from .base import Base
+
+
+class BroadcastStatus(enum.Enum):
+    SCHEDULED = "scheduled"
+    RUNNING = "running"
+    FINISHED = "finished"
+
+
+class BroadcastJob(Base):
+    __tablename__ = "broadcast_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    audience = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(
+        Enum(BroadcastStatus), default=BroadcastStatus.SCHEDULED, nullable=False
+    )
+    send_at = Column(DateTime(timezone=True), nullable=False)
+    last_user_id = Column(Integer, default=0, nullable=False)  # чекпоинт
+    total = Column(Integer, nullable=True)
+    sent = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # Процесс, который ведёт рассылку, и срок его аренды
+    owner = Column(String, nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy import BigInteger, Boolean, Column, Integer, String
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -12,5 +12,6 @@ class Channel(Base):
     username = Column(String, nullable=False, unique=True)
     link = Column(String, nullable=False, unique=True)
     requires_subscription = Column(Boolean, default=False)
+    chat_id = Column(BigInteger, nullable=True)  # id приватного канала
 
     subscribers = relationship("SubscriptionLog", back_populates="channel")
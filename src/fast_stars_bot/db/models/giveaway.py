@@ -1,6 +1,15 @@
 from datetime import timezone
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    Numeric,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -23,11 +32,19 @@ class Giveaway(Base):
 
 
 class GiveawayTicket(Base):
+    """
+    Билеты пользователя в розыгрыше: одна строка на участника, count — сколько куплено.
+    """
+
     __tablename__ = "giveaway_tickets"
+    __table_args__ = (
+        UniqueConstraint("giveaway_id", "user_id", name="uq_giveaway_tickets_user"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     giveaway_id = Column(Integer, ForeignKey("giveaways.id"), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
 
     user = relationship("User", back_populates="giveaway_tickets")
     giveaway = relationship("Giveaway", back_populates="tickets")
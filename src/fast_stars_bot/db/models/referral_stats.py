@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric
+
+from .base import Base
+
+
+class ReferralStats(Base):
+    """
+    Счётчики рефералов пользователя, обновляемые по событиям.
+    Проценты хранятся суммой по рефералам — делятся на referral_count при чтении.
+    """
+
+    __tablename__ = "referral_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    referral_count = Column(Integer, default=0, nullable=False)
+    nested_referrals = Column(Integer, default=0, nullable=False)
+    banned_count = Column(Integer, default=0, nullable=False)
+    bonus_percent_sum = Column(Numeric(14, 4), default=0, nullable=False)
+    task_percent_sum = Column(Numeric(14, 4), default=0, nullable=False)
+    reconciled_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
@@ -1,7 +1,16 @@
 from datetime import date
 from decimal import Decimal
 
-from sqlalchemy import BigInteger, Boolean, Column, Date, Integer, Numeric, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    Numeric,
+    String,
+)
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -18,6 +27,8 @@ class User(Base):
     reg_date = Column(Date, nullable=False, default=date.today)
     is_banned = Column(Boolean, default=False, nullable=False)
     is_admin = Column(Boolean, default=False, nullable=False)
+    # Бот заблокирован или чат удалён — пропускаем в рассылках
+    unreachable_since = Column(DateTime(timezone=True), nullable=True)
 
     daily_bonus_claims = relationship("DailyBonusClaim", back_populates="user")
     subscriptions = relationship("SubscriptionLog", back_populates="user")
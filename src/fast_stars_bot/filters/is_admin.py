@@ -1,14 +1,10 @@
 from aiogram.filters import BaseFilter
 from aiogram.types import CallbackQuery, Message
-from db.session import SessionLocal
-from utils.user_requests import get_user_by_telegram_id
+from middlewares.user_context import UserContext
 
 
 class IsAdmin(BaseFilter):
-    async def __call__(self, event: Message | CallbackQuery) -> bool:
-        telegram_id = event.from_user.id
-
-        async with SessionLocal() as session:
-            user = await get_user_by_telegram_id(session, telegram_id)
-
-            return user is not None and user.is_admin
+    async def __call__(
+        self, event: Message | CallbackQuery, user_context: UserContext
+    ) -> bool:
+        return user_context.is_admin
@@ -15,6 +15,7 @@ from utils.channel_requests import (
     get_channel_by_id,
     get_channel_completion_count,
 )
+from utils.subscription_requests import fetch_chat_id, is_private_link
 
 channel_admin_router = Router()
 
@@ -135,6 +136,11 @@ async def add_channel_subscription_status(
     channel_link = data.get("channel_link")
     requires_subscription = data.get("subscription") == "да"
 
+    # id приватного канала резолвим один раз при добавлении
+    chat_id = None
+    if is_private_link(channel_link):
+        chat_id = await fetch_chat_id(message.bot, channel_username)
+
     async with SessionLocal() as session:
         await add_channel(
             session,
@@ -142,6 +148,7 @@ async def add_channel_subscription_status(
             username=channel_username,
             link=channel_link,
             requires_subscription=requires_subscription,
+            chat_id=chat_id,
         )
         channels = await get_all_channels(session)
         await message.answer(
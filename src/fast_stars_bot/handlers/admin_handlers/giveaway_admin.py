@@ -21,7 +21,7 @@ from utils.giveaway_requests import (
     delete_giveaway,
     get_all_giveaways,
     get_giveaway_by_id,
-    get_tickets_for_giveaway,
+    get_giveaway_counters,
 )
 
 kyiv_tz = timezone("Europe/Kyiv")
@@ -57,9 +57,9 @@ async def info_giveaway_handler(callback: types.CallbackQuery) -> None:
 
     async with SessionLocal() as session:
         giveaway = await get_giveaway_by_id(session, giveaway_id)
-        tickets = await get_tickets_for_giveaway(session, giveaway_id)
-    total_tickets = len(tickets)
-    unique_users = len(set(ticket.user_id for ticket in tickets))
+        total_tickets, unique_users, _ = await get_giveaway_counters(
+            session, giveaway_id
+        )
     start = giveaway.start_time.astimezone(kyiv_tz).strftime("%d.%m.%Y %H:%M")
     end = giveaway.end_time.astimezone(kyiv_tz).strftime("%d.%m.%Y %H:%M")
     giveaway_link = f"https://t.me/STARS_FAST_bot?start=giveaway_{giveaway.id}"
@@ -1,16 +1,21 @@
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from aiogram import F, Router, types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from db.models.broadcast_job import BroadcastStatus
+from db.session import SessionLocal
 from keyboards.admin_keyboards import (
     admin_back_keyboard,
     audience_keyboard,
     back_to_message_keyboard,
+    broadcast_jobs_keyboard,
     time_choice_keyboard,
 )
-from services.broadcast import delayed_broadcast, send_broadcast
+from services.broadcast import create_broadcast, run_broadcast_job
+from utils.broadcast_requests import get_recent_broadcast_jobs
 
 message_admin_router = Router()
 
@@ -56,6 +61,8 @@ async def receive_message_text(message: types.Message, state: FSMContext):
         "text": message.text or message.caption,
         "entities": message.entities or message.caption_entities,
         "photo": message.photo[-1].file_id if message.photo else None,
+        "from_chat_id": message.chat.id,
+        "message_id": message.message_id,
     }
     await state.update_data(**msg_data)
     await state.set_state(BroadcastState.choosing_time)
@@ -72,15 +79,22 @@ async def send_now(callback: types.CallbackQuery, state: FSMContext):
     sent = await callback.message.edit_text(
         "Отправка запущена...", reply_markup=admin_back_keyboard()
     )
-    await send_broadcast(callback.bot, data)
+    await state.clear()
+    job_id = await create_broadcast(data, datetime.now(timezone.utc))
+    stats = await run_broadcast_job(callback.bot, job_id)
     try:
         await callback.bot.delete_message(callback.message.chat.id, sent.message_id)
     except Exception:
         pass
+    if stats is None:
+        await callback.message.answer(
+            f"Рассылка #{job_id} прервана, она продолжится после перезапуска бота.",
+            reply_markup=admin_back_keyboard(),
+        )
+        return
     await callback.message.answer(
-        "Рассылка завершена.", reply_markup=admin_back_keyboard()
+        f"Рассылка завершена: {stats.summary()}.", reply_markup=admin_back_keyboard()
     )
-    await state.clear()
 
 
 @message_admin_router.message(BroadcastState.choosing_time)
@@ -105,7 +119,11 @@ async def schedule_send(message: types.Message, state: FSMContext):
             send_at = datetime.combine(now.date(), t) + timedelta(days=1)
         delay = (send_at - now).total_seconds()
 
-        asyncio.create_task(delayed_broadcast(message.bot, delay, data))
+        # Задание хранится в БД и переживёт перезапуск бота
+        job_id = await create_broadcast(
+            data, datetime.now(timezone.utc) + timedelta(seconds=delay)
+        )
+        asyncio.create_task(run_broadcast_job(message.bot, job_id))
         await state.clear()
     except ValueError:
         sent = await message.answer(
@@ -113,3 +131,37 @@ async def schedule_send(message: types.Message, state: FSMContext):
             reply_markup=back_to_message_keyboard(),
         )
         await state.update_data(last_bot_message_id=sent.message_id)
+
+
+BROADCAST_STATUS_NAMES = {
+    BroadcastStatus.SCHEDULED: "⏳ запланирована",
+    BroadcastStatus.RUNNING: "📤 идёт",
+    BroadcastStatus.FINISHED: "✅ завершена",
+}
+
+
+@message_admin_router.callback_query(F.data == "broadcast_jobs")
+async def broadcast_jobs_callback(callback: types.CallbackQuery):
+    async with SessionLocal() as session:
+        jobs = await get_recent_broadcast_jobs(session)
+
+    if not jobs:
+        text = "Рассылок пока не было."
+    else:
+        lines = ["<b>Последние рассылки:</b>\n"]
+        for job in jobs:
+            audience = "VIP" if job.audience == "vip" else "все"
+            progress = f"{job.sent + job.failed}/{job.total or '?'}"
+            lines.append(
+                f"#{job.id} • {BROADCAST_STATUS_NAMES[job.status]} • {audience}\n"
+                f"Старт: {job.send_at.strftime('%d.%m %H:%M')} UTC • "
+                f"обработано {progress}, ошибок {job.failed}"
+            )
+        text = "\n".join(lines)
+
+    try:
+        await callback.message.edit_text(
+            text, parse_mode="HTML", reply_markup=broadcast_jobs_keyboard()
+        )
+    except TelegramBadRequest:
+        await callback.answer("Без изменений")
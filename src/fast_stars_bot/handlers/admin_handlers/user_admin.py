@@ -1,10 +1,7 @@
-from decimal import Decimal
-
 from aiogram import F, Router, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from db.models.user import User
-from db.models.withdrawal import WithdrawalStatus
 from db.session import SessionLocal
 from keyboards.admin_keyboards import (
     back_to_users_keyboard,
@@ -14,27 +11,22 @@ from keyboards.admin_keyboards import (
     user_referrals_keyboard,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.dossier_requests import get_user_dossier
 from utils.referral_requests import (
     get_referral_count,
     get_referral_stats,
-    get_referrals,
     get_referrals_page,
-    get_who_referred,
 )
 from utils.user_requests import (
     add_admin,
     ban_user,
     get_banned_users_count,
     get_banned_users_page,
-    get_user_bonus_claim_percent,
     get_user_by_id,
     get_user_by_telegram_id,
-    get_user_task_completion_percent,
     remove_admin,
     unban_user,
 )
-from utils.vip_requests import is_user_vip
-from utils.withdrawal_requests import get_completed_user_withdrawals
 
 user_admin_router = Router()
 
@@ -50,15 +42,10 @@ class AdminActions(StatesGroup):
 async def generate_detailed_user_text(
     session: AsyncSession, user: User, withdrawal_id: int | None = None
 ) -> tuple[str, types.InlineKeyboardMarkup]:
-    is_vip = await is_user_vip(session, user.id)
-    withdrawals = await get_completed_user_withdrawals(session, user.id)
-    referral_stats = await get_referral_stats(session, user.id)
-    user_bonus_claim_percent = await get_user_bonus_claim_percent(session, user.id)
-    user_task_completion_percent = await get_user_task_completion_percent(
-        session, user.id
-    )
-    referrals = await get_referrals(session, user.id)
-    referrer = await get_who_referred(session, user.id)
+    dossier = await get_user_dossier(session, user.id)
+    await session.commit()  # сохраняем строку счётчиков, если она создана сейчас
+    referral_stats = dossier.referral_stats
+    referrer = dossier.referrer
 
     text = (
         f"<b>Пользователь:</b>\n\n"
@@ -68,15 +55,14 @@ async def generate_detailed_user_text(
         f"Заблокирован? {'Да' if user.is_banned else 'Нет'}\n"
         f"Дата регистрации: {user.reg_date}\n"
         f"Баланс: {user.stars:.2f}⭐\n"
-        f"VIP? {'Да' if is_vip else 'Нет'}\n"
-        f"Бонус дня: {user_bonus_claim_percent}%\n"
-        f"Выполнение заданий: {user_task_completion_percent}%\n\n"
+        f"VIP? {'Да' if dossier.is_vip else 'Нет'}\n"
+        f"Бонус дня: {dossier.bonus_claim_percent}%\n"
+        f"Выполнение заданий: {dossier.task_completion_percent}%\n\n"
         f"<b>Рефералы:</b>\n"
     )
 
-    if referrals:
-        last_referrals = sorted(referrals, key=lambda x: x.reg_date, reverse=True)[:10]
-        for idx, ref in enumerate(last_referrals, start=1):
+    if dossier.last_referrals:
+        for idx, ref in enumerate(dossier.last_referrals, start=1):
             username = f"@{ref.username}" if ref.username else f"ID:{ref.telegram_id}"
             reg_date = f"{ref.reg_date}"
             text += f"{idx}. {username} - {reg_date}\n"
@@ -92,17 +78,11 @@ async def generate_detailed_user_text(
     else:
         text += f"У пользователя нет рефералов.\n\n" f"<b>Обработанные выводы:</b>\n"
 
-    if withdrawals:
-        approved = [w for w in withdrawals if w.status == WithdrawalStatus.APPROVED]
-        rejected = [w for w in withdrawals if w.status == WithdrawalStatus.REJECTED]
-        total_withdrawn = (
-            sum(w.stars for w in approved) if approved else Decimal("0.00")
-        )
-
+    if dossier.has_withdrawals:
         text += (
-            f"Заявок одобрено: {len(approved)}\n"
-            f"Заявок отклонено: {len(rejected)}\n"
-            f"Всего выведено: {total_withdrawn:.2f}⭐\n\n"
+            f"Заявок одобрено: {dossier.approved_count}\n"
+            f"Заявок отклонено: {dossier.rejected_count}\n"
+            f"Всего выведено: {dossier.total_withdrawn:.2f}⭐\n\n"
         )
     else:
         text += "У пользователя ещё нет обработаных выводов.\n\n"
@@ -129,6 +109,7 @@ async def generate_user_referrals_text(
 ) -> tuple[str, types.InlineKeyboardMarkup]:
     referrals = await get_referrals_page(session, user.id, page, per_page)
     referral_stats = await get_referral_stats(session, user.id)
+    await session.commit()
     total_referrals = await get_referral_count(session, user.id)
     total_pages = (total_referrals + per_page - 1) // per_page
 
@@ -1,5 +1,3 @@
-from decimal import Decimal
-
 from aiogram import F, Router, types
 from aiogram.exceptions import TelegramForbiddenError
 from db.models.user import User
@@ -11,13 +9,8 @@ from keyboards.admin_keyboards import (
     withdraw_info_keyboard,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
-from utils.referral_requests import get_referral_stats, get_referrals, get_who_referred
-from utils.user_requests import (
-    get_user_bonus_claim_percent,
-    get_user_by_id,
-    get_user_task_completion_percent,
-)
-from utils.vip_requests import is_user_vip
+from utils.dossier_requests import get_user_dossier
+from utils.user_requests import get_user_by_id
 from utils.withdrawal_requests import (
     get_all_pending_withdrawals,
     get_completed_user_withdrawals,
@@ -37,15 +30,10 @@ status_map = {
 async def generate_detailed_withdraw_text(
     session: AsyncSession, withdrawal: Withdrawal, user: User
 ) -> str:
-    is_vip = await is_user_vip(session, user.id)
-    withdrawals = await get_completed_user_withdrawals(session, user.id)
-    referral_stats = await get_referral_stats(session, user.id)
-    user_bonus_claim_percent = await get_user_bonus_claim_percent(session, user.id)
-    user_task_completion_percent = await get_user_task_completion_percent(
-        session, user.id
-    )
-    referrals = await get_referrals(session, user.id)
-    referrer = await get_who_referred(session, user.id)
+    dossier = await get_user_dossier(session, user.id)
+    await session.commit()  # сохраняем строку счётчиков, если она создана сейчас
+    referral_stats = dossier.referral_stats
+    referrer = dossier.referrer
 
     status_text = status_map.get(withdrawal.status, "Неизвестно")
     text = ""
@@ -61,23 +49,18 @@ async def generate_detailed_withdraw_text(
         text += f"<b>TON Address:</b> <code>{withdrawal.ton_address}</code>\n"
 
     text += (
-        f"VIP? {'Да' if is_vip else 'Нет'}\n"
+        f"VIP? {'Да' if dossier.is_vip else 'Нет'}\n"
         f"Баланс: {user.stars:.2f}⭐\n"
-        f"Бонус дня: {user_bonus_claim_percent}%\n"
-        f"Выполнение заданий: {user_task_completion_percent}%\n"
+        f"Бонус дня: {dossier.bonus_claim_percent}%\n"
+        f"Выполнение заданий: {dossier.task_completion_percent}%\n"
     )
 
     text += f"\n<b>Рефералы:</b>\n"
 
-    if referrals:
-        sorted_referrals = sorted(referrals, key=lambda x: x.reg_date, reverse=True)[
-            :10
-        ]
-        for idx, user in enumerate(sorted_referrals, start=1):
-            username = (
-                f"@{user.username}" if user.username else f"ID:{user.telegram_id}"
-            )
-            reg_date = f"{user.reg_date}"
+    if dossier.last_referrals:
+        for idx, ref in enumerate(dossier.last_referrals, start=1):
+            username = f"@{ref.username}" if ref.username else f"ID:{ref.telegram_id}"
+            reg_date = f"{ref.reg_date}"
             text += f"{idx}. {username} - {reg_date}\n"
         text += (
             f"\n👥 Всего приглашено: {referral_stats['referral_count']}\n"
@@ -90,17 +73,11 @@ async def generate_detailed_withdraw_text(
     else:
         text += f"У пользователя нет рефералов.\n\n" f"<b>Обработанные выводы:</b>\n"
 
-    if withdrawals:
-        approved = [w for w in withdrawals if w.status == WithdrawalStatus.APPROVED]
-        rejected = [w for w in withdrawals if w.status == WithdrawalStatus.REJECTED]
-        total_withdrawn = (
-            sum(w.stars for w in approved) if approved else Decimal("0.00")
-        )
-
+    if dossier.has_withdrawals:
         text += (
-            f"Заявок одобрено: {len(approved)}\n"
-            f"Заявок отклонено: {len(rejected)}\n"
-            f"Всего выведено: {total_withdrawn:.2f}⭐\n\n"
+            f"Заявок одобрено: {dossier.approved_count}\n"
+            f"Заявок отклонено: {dossier.rejected_count}\n"
+            f"Всего выведено: {dossier.total_withdrawn:.2f}⭐\n\n"
         )
     else:
         text += "У пользователя ещё нет обработаных выводов.\n\n"
@@ -0,0 +1,51 @@
+from aiogram import Router, types
+from db.session import SessionLocal
+from utils.subscription_requests import (
+    MEMBER_STATUSES,
+    invalidate_user_subscriptions,
+    set_channel_member,
+    set_channel_tracked,
+)
+from utils.user_requests import mark_user_reachable, mark_users_unreachable
+
+router = Router()
+
+
+def register_channel_member_handlers(dp) -> None:
+    dp.include_router(router)
+
+
+def get_chat_keys(chat: types.Chat) -> list[str]:
+    # Канал может быть сохранён как по числовому id, так и по @username
+    keys = [str(chat.id)]
+    if chat.username:
+        keys.append(f"@{chat.username.lower()}")
+    return keys
+
+
+@router.my_chat_member()
+async def bot_membership_changed(update: types.ChatMemberUpdated) -> None:
+    if update.chat.type == "private":
+        # kicked — пользователь заблокировал бота, member — разблокировал
+        async with SessionLocal() as session:
+            if update.new_chat_member.status == "kicked":
+                await mark_users_unreachable(session, [update.chat.id])
+            else:
+                await mark_user_reachable(session, update.chat.id)
+        return
+    if update.chat.type != "channel":
+        return
+    is_admin = update.new_chat_member.status == "administrator"
+    await set_channel_tracked(get_chat_keys(update.chat), is_admin)
+
+
+@router.chat_member()
+async def channel_member_changed(update: types.ChatMemberUpdated) -> None:
+    if update.chat.type != "channel":
+        return
+    telegram_id = update.new_chat_member.user.id
+    is_member = update.new_chat_member.status in MEMBER_STATUSES
+    await set_channel_member(get_chat_keys(update.chat), telegram_id, is_member)
+    if not is_member:
+        # Отписался — сбрасываем кэш подписок, следующее меню проверит заново
+        await invalidate_user_subscriptions(telegram_id)
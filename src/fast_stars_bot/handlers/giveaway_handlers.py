@@ -1,5 +1,7 @@
 import asyncio
 from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
 
 from aiogram import F, Router, types
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
@@ -12,8 +14,7 @@ from utils.giveaway_requests import (
     buy_tickets_for_giveaway,
     get_all_active_giveaways,
     get_giveaway_by_id,
-    get_tickets_for_giveaway,
-    get_tickets_per_user,
+    get_giveaway_counters,
 )
 from utils.user_requests import get_user_by_telegram_id
 
@@ -69,16 +70,47 @@ async def giveaways_callback(callback: types.CallbackQuery, state: FSMContext) -
         )
 
 
+@lru_cache(maxsize=64)
+def render_prize_block(num_of_winners: int, prize_pool: Decimal) -> str:
+    # Блок зависит только от числа победителей и фонда — считаем один раз
+    prizes = generate_prizes(num_of_winners, prize_pool)
+    text = ""
+    last_amount = None
+    range_start = None
+
+    for i in range(1, num_of_winners + 1):
+        reward = prizes[i]
+        if reward != last_amount:
+            if range_start and range_start != i - 1:
+                text += f"{range_start}–{i - 1} места — по {last_amount} ⭐\n"
+            elif range_start:
+                place = (
+                    "место" if range_start > 3 else ["🥇", "🥈", "🥉"][range_start - 1]
+                )
+                text += f"{place if range_start <= 3 else f'{range_start} место'} — {last_amount} ⭐\n"
+            range_start = i
+            last_amount = reward
+
+    if range_start:
+        if range_start != num_of_winners:
+            text += f"{range_start}–{num_of_winners} места — по {last_amount} ⭐\n"
+        else:
+            place = "место" if range_start > 3 else ["🥇", "🥈", "🥉"][range_start - 1]
+            text += f"{place if range_start <= 3 else f'{range_start} место'} — {last_amount} ⭐\n"
+
+    return text
+
+
 async def show_giveaway_info(
     message: types.Message, giveaway_id: int, telegram_id: int
 ) -> None:
     async with SessionLocal() as session:
         giveaway = await get_giveaway_by_id(session, giveaway_id)
-        tickets = await get_tickets_for_giveaway(session, giveaway.id)
         user = await get_user_by_telegram_id(session, telegram_id)
-        tickets_bought = await get_tickets_per_user(session, giveaway.id, user.id)
+        _, unique_users, tickets_bought = await get_giveaway_counters(
+            session, giveaway.id, user.id
+        )
         end = giveaway.end_time.astimezone(kyiv_tz).strftime("%d.%m.%Y %H:%M")
-        prizes = generate_prizes(giveaway.num_of_winners, giveaway.prize_pool)
 
     text = (
         f"<b>🎁 Розыгрыш {giveaway.prize_pool}⭐️ на {giveaway.num_of_winners} победителей! 🎉</b>\n"
@@ -94,30 +126,7 @@ async def show_giveaway_info(
         "<b>🏆 Распределение призов</b>:\n"
     )
 
-    last_amount = None
-    range_start = None
-
-    for i in range(1, giveaway.num_of_winners + 1):
-        reward = prizes[i]
-        if reward != last_amount:
-            if range_start and range_start != i - 1:
-                text += f"{range_start}–{i - 1} места — по {last_amount} ⭐\n"
-            elif range_start:
-                place = (
-                    "место" if range_start > 3 else ["🥇", "🥈", "🥉"][range_start - 1]
-                )
-                text += f"{place if range_start <= 3 else f'{range_start} место'} — {last_amount} ⭐\n"
-            range_start = i
-            last_amount = reward
-
-    if range_start:
-        if range_start != giveaway.num_of_winners:
-            text += (
-                f"{range_start}–{giveaway.num_of_winners} места — по {last_amount} ⭐\n"
-            )
-        else:
-            place = "место" if range_start > 3 else ["🥇", "🥈", "🥉"][range_start - 1]
-            text += f"{place if range_start <= 3 else f'{range_start} место'} — {last_amount} ⭐\n"
+    text += render_prize_block(giveaway.num_of_winners, giveaway.prize_pool)
 
     text += (
         "\n🧠 Все победители автоматически определяются ботом случайным образом\n"
@@ -125,7 +134,6 @@ async def show_giveaway_info(
         "📢 Сразу после розыгрыша бот отправит рассылку со списком победителей 🫡\n\n"
     )
 
-    unique_users = len(set(ticket.user_id for ticket in tickets))
     remaining_time = format_timedelta_ru(giveaway.end_time - datetime.now(kyiv_tz))
 
     text += "<blockquote>✨ Не упусти шанс — участвуй прямо сейчас!\n"
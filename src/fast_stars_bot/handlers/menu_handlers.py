@@ -1,9 +1,8 @@
 from aiogram import F, Router, types
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
-from db.session import SessionLocal
 from keyboards.menu_keyboard import menu_keyboard
-from utils.user_requests import get_user_by_telegram_id
+from middlewares.user_context import UserContext
 
 router = Router()
 
@@ -21,29 +20,25 @@ def get_menu_text(user) -> str:
 
 
 @router.message(F.text.in_({"/menu", "⭐️ Меню"}))
-async def menu_callback(message: types.Message, state: FSMContext) -> None:
+async def menu_callback(
+    message: types.Message, state: FSMContext, user_context: UserContext
+) -> None:
     await state.clear()
-    telegram_id = message.from_user.id
-    async with SessionLocal() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-
     await message.answer(
-        get_menu_text(user),
+        get_menu_text(user_context.user),
         parse_mode="HTML",
         reply_markup=menu_keyboard(),
     )
 
 
 @router.callback_query(F.data == "back")
-async def back_menu_callback(callback: types.CallbackQuery, state: FSMContext) -> None:
+async def back_menu_callback(
+    callback: types.CallbackQuery, state: FSMContext, user_context: UserContext
+) -> None:
     await state.clear()
-    telegram_id = callback.from_user.id
-    async with SessionLocal() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-
     try:
         await callback.message.edit_text(
-            get_menu_text(user),
+            get_menu_text(user_context.user),
             parse_mode="HTML",
             reply_markup=menu_keyboard(),
         )
@@ -86,37 +86,39 @@ async def successful_basketball_payment(
     amount = Decimal(message.successful_payment.total_amount)
     telegram_id = message.from_user.id
 
+    data = await state.get_data()
+    invoice_msg_id = data.get("invoice_msg_id")
+    if invoice_msg_id:
+        try:
+            await message.bot.delete_message(
+                chat_id=message.chat.id, message_id=invoice_msg_id
+            )
+        except Exception:
+            pass
+
+    sent_dice = await message.answer_dice(emoji=DiceEmoji.BASKETBALL)
+    result = sent_dice.dice.value
+    win = result == 4 or result == 5
+
+    # Сессия открыта только на запись результата, не на время анимации
     async with SessionLocal() as session:
         user = await get_user_by_telegram_id(session, telegram_id)
-
-        data = await state.get_data()
-        invoice_msg_id = data.get("invoice_msg_id")
-        if invoice_msg_id:
-            try:
-                await message.bot.delete_message(
-                    chat_id=message.chat.id, message_id=invoice_msg_id
-                )
-            except Exception:
-                pass
-
-        sent_dice = await message.answer_dice(emoji=DiceEmoji.BASKETBALL)
-        result = sent_dice.dice.value
-        win = result == 4 or result == 5
         multiplier = await get_game_setting(session, "basketball_multiplier")
         if multiplier is None:
             multiplier = Decimal("1.5")
 
         await log_basketball_game(session, user, amount, win, multiplier)
-        await asyncio.sleep(3)
 
-        if win:
-            reward = amount * multiplier
-            await message.answer(
-                f"✅ Победа! +{reward:.2f} ⭐\nВаш баланс: {user.stars:.2f}",
-                reply_markup=back_to_basketball_keyboard(amount),
-            )
-        else:
-            await message.answer(
-                f"❌ Неудача! -{amount:.2f} Telegram Stars",
-                reply_markup=back_to_basketball_keyboard(amount),
-            )
+    await asyncio.sleep(3)
+
+    if win:
+        reward = amount * multiplier
+        await message.answer(
+            f"✅ Победа! +{reward:.2f} ⭐\nВаш баланс: {user.stars:.2f}",
+            reply_markup=back_to_basketball_keyboard(amount),
+        )
+    else:
+        await message.answer(
+            f"❌ Неудача! -{amount:.2f} Telegram Stars",
+            reply_markup=back_to_basketball_keyboard(amount),
+        )
@@ -1,5 +1,4 @@
 import asyncio
-import time
 from decimal import Decimal
 
 from aiogram import Bot, F, Router, types
@@ -17,14 +16,13 @@ from keyboards.cube_keyboard import (
     end_game_keyboard,
     throw_cube_keyboard,
 )
+from services.cube_state import cube_store
 from utils.cube_requests import (
     cancel_game,
-    create_game,
-    find_waiting_game,
     finish_game,
     get_game_by_id,
     handle_throw_timeout,
-    join_game,
+    match_cube_game,
 )
 from utils.user_requests import get_user_by_id, get_user_by_telegram_id
 
@@ -40,18 +38,44 @@ class CubeGameState(StatesGroup):
     waiting_for_p2 = State()
 
 
-active_throws = set()
-user_cooldowns: dict[int, float] = {}
-pending_throws: dict[int, asyncio.Task] = {}
-throw_messages: dict[int, tuple[int, int]] = {}
+THROW_TIMEOUT = 30  # сек на бросок
+REJOIN_COOLDOWN = 15  # сек после выхода из комнаты
+TIMEOUT_POLL_INTERVAL = 0.5  # сек между проверками просроченных бросков
+TIMEOUT_BATCH = 100
 
 
-async def start_throw_timeout(
-    game_id: int, user_id: int, bet: Decimal, user: User, bot: Bot
-):
-    await asyncio.sleep(30)
+async def schedule_throw_timeout(game_id: int, user_id: int) -> None:
+    # Дедлайн хранится в Redis — переживает рестарт и виден всем процессам;
+    # срабатывает его throw_timeout_loop, отменяет clear_deadline
+    await cube_store.set_deadline(game_id, user_id, THROW_TIMEOUT)
 
-    chat_msg = throw_messages.pop(game_id, None)
+
+async def throw_timeout_loop(bot: Bot) -> None:
+    """
+    Единственный таймер бросков на процесс: забирает просроченные дедлайны
+    из Redis вместо отдельной спящей задачи на каждый ход.
+    """
+    while True:
+        due = []
+        try:
+            due = await cube_store.get_due_deadlines(TIMEOUT_BATCH)
+            if due:
+                await asyncio.gather(
+                    *(fire_throw_timeout(g, u, bot) for g, u in due),
+                    return_exceptions=True,
+                )
+        except Exception as e:
+            print(f"[Cube Timeout Error] {e}")
+        if len(due) < TIMEOUT_BATCH:
+            await asyncio.sleep(TIMEOUT_POLL_INTERVAL)
+
+
+async def fire_throw_timeout(game_id: int, user_id: int, bot: Bot) -> None:
+    # Ход уже сделан или дедлайн забрал другой процесс
+    if not await cube_store.claim_deadline(game_id, user_id):
+        return
+
+    chat_msg = await cube_store.pop_throw_message(game_id)
     if chat_msg:
         chat_id, msg_id = chat_msg
         try:
@@ -61,7 +85,7 @@ async def start_throw_timeout(
 
     async with SessionLocal() as session:
         leaver, other_player, game = await handle_throw_timeout(
-            session, game_id, user_id, bet
+            session, game_id, user_id
         )
         if not game:
             return
@@ -85,9 +109,7 @@ async def start_throw_timeout(
     except Exception:
         pass
 
-    pending_throws.pop(game_id, None)
-    active_throws.discard((game_id, 1))
-    active_throws.discard((game_id, 2))
+    await cube_store.release_throws(game_id, 1, 2)
 
 
 @router.callback_query(F.data == "cube_game")
@@ -113,9 +135,8 @@ async def play_cube_game(callback: types.CallbackQuery) -> None:
     bet_amount = Decimal(callback.data.split("_")[-1])
     telegram_id = callback.from_user.id
 
-    last_exit = user_cooldowns.get(telegram_id)
-    if last_exit and (time.time() - last_exit) < 15:
-        remaining = 15 - int(time.time() - last_exit)
+    remaining = await cube_store.get_cooldown(telegram_id)
+    if remaining:
         await callback.answer(
             f"⏳ Подождите {remaining} сек перед повторным входом", show_alert=True
         )
@@ -131,42 +152,47 @@ async def play_cube_game(callback: types.CallbackQuery) -> None:
             )
             return
 
-        waiting_game = await find_waiting_game(session, bet_amount)
-
-        if not waiting_game:
-            game = await create_game(session, user, bet_amount)
-            await callback.message.edit_text(
-                f"Вы присоединились к столу со ставкой {bet_amount} ⭐️.\n"
-                "Ждём второго игрока и начинаем игру 🎲\n\n"
-                "❗️Внимание: если вы начнёте игру со вторым игроком, покинуть её будет невозможно до завершения партии!\n\n"
-                "⏱️У вас есть 30 секунд на бросок!",
-                reply_markup=back_to_cube_keyboard(game.id),
+        try:
+            game = await match_cube_game(session, user, bet_amount)
+        except ValueError:
+            # Баланс мог уменьшиться после проверки выше
+            await callback.answer(
+                "Недостаточно звезд для ставки! ⭐️",
+                show_alert=True,
             )
-        else:
-            game = await join_game(session, waiting_game, user)
-
+            return
+        if game and game.player2_id is not None:
             player1 = await get_user_by_id(session, game.player1_id)
-            player2 = user
 
-            if player1.telegram_id:
-                msg = await callback.bot.send_message(
-                    player1.telegram_id,
-                    f"Все игроки присоединились 🤝\n👤 @{player1.username or 'Игрок'} кидает кубик.",
-                    reply_markup=throw_cube_keyboard(game.id, 1),
-                )
-                throw_messages[game.id] = (msg.chat.id, msg.message_id)
-            task = asyncio.create_task(
-                start_throw_timeout(
-                    game.id, player1.id, game.bet, player1, callback.bot
-                )
+    if not game:
+        await callback.answer("Вы уже сидите за столом 🎲", show_alert=True)
+        return
+
+    if game.player2_id is None:
+        await callback.message.edit_text(
+            f"Вы присоединились к столу со ставкой {bet_amount} ⭐️.\n"
+            "Ждём второго игрока и начинаем игру 🎲\n\n"
+            "❗️Внимание: если вы начнёте игру со вторым игроком, покинуть её будет невозможно до завершения партии!\n\n"
+            "⏱️У вас есть 30 секунд на бросок!",
+            reply_markup=back_to_cube_keyboard(game.id),
+        )
+    else:
+        player2 = user
+
+        if player1.telegram_id:
+            msg = await callback.bot.send_message(
+                player1.telegram_id,
+                f"Все игроки присоединились 🤝\n👤 @{player1.username or 'Игрок'} кидает кубик.",
+                reply_markup=throw_cube_keyboard(game.id, 1),
             )
-            pending_throws[game.id] = task
+            await cube_store.set_throw_message(game.id, msg.chat.id, msg.message_id)
+        await schedule_throw_timeout(game.id, player1.id)
 
-            if player2.telegram_id:
-                await callback.bot.send_message(
-                    player2.telegram_id,
-                    f"Все игроки присоединились 🤝\n👤 @{player1.username or 'Игрок'} кидает кубик.",
-                )
+        if player2.telegram_id:
+            await callback.bot.send_message(
+                player2.telegram_id,
+                f"Все игроки присоединились 🤝\n👤 @{player1.username or 'Игрок'} кидает кубик.",
+            )
 
 
 @router.callback_query(F.data.startswith("throw_cube_"))
@@ -176,145 +202,134 @@ async def handle_throw_cube(callback: types.CallbackQuery, state: FSMContext) ->
     player = int(parts[3])
     first_value = int(parts[4]) if len(parts) == 5 else None
 
-    key = (game_id, player)
-    if key in active_throws:
+    if not await cube_store.claim_throw(game_id, player):
         await callback.answer("⏳ Вы уже бросили кубик", show_alert=True)
         return
 
-    active_throws.add(key)
-
+    # Сессия не живёт дольше чтения: дальше анимация и запросы к Telegram
     async with SessionLocal() as session:
         game = await get_game_by_id(session, game_id)
-        if not game:
-            await callback.answer("Игра не найдена", show_alert=True)
-            return
+        if game:
+            player1 = await get_user_by_id(session, game.player1_id)
+            player2 = await get_user_by_id(session, game.player2_id)
+    if not game:
+        await callback.answer("Игра не найдена", show_alert=True)
+        return
 
-        player1 = await get_user_by_id(session, game.player1_id)
-        player2 = await get_user_by_id(session, game.player2_id)
-
-        sent_dice = await callback.message.answer_dice(emoji=DiceEmoji.DICE)
-        await callback.message.edit_reply_markup(reply_markup=None)
-        value = sent_dice.dice.value
-        await asyncio.sleep(4)
-
-        if player == 1:
-            task = pending_throws.pop(game.id, None)
-            if task:
-                task.cancel()
-            await callback.bot.forward_message(
-                chat_id=player2.telegram_id,
-                from_chat_id=player1.telegram_id,
-                message_id=sent_dice.message_id,
-            )
+    sent_dice = await callback.message.answer_dice(emoji=DiceEmoji.DICE)
+    await callback.message.edit_reply_markup(reply_markup=None)
+    value = sent_dice.dice.value
+    await asyncio.sleep(4)
+
+    if player == 1:
+        await cube_store.clear_deadline(game.id)
+        await callback.bot.forward_message(
+            chat_id=player2.telegram_id,
+            from_chat_id=player1.telegram_id,
+            message_id=sent_dice.message_id,
+        )
 
-            txt_p1 = (
-                f"👤 @{player1.username or 'Игрок'} выбил {value}.\n"
-                f"👤 @{player2.username or 'Игрок'} кидает кубик!"
-            )
-            kb = types.InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        types.InlineKeyboardButton(
-                            text="🎲 Бросить кубик",
-                            callback_data=f"throw_cube_{game_id}_2_{value}",
-                        )
-                    ]
+        txt_p1 = (
+            f"👤 @{player1.username or 'Игрок'} выбил {value}.\n"
+            f"👤 @{player2.username or 'Игрок'} кидает кубик!"
+        )
+        kb = types.InlineKeyboardMarkup(
+            inline_keyboard=[
+                [
+                    types.InlineKeyboardButton(
+                        text="🎲 Бросить кубик",
+                        callback_data=f"throw_cube_{game_id}_2_{value}",
+                    )
                 ]
-            )
+            ]
+        )
 
-            await callback.bot.send_message(
-                player2.telegram_id, txt_p1, reply_markup=kb
-            )
-            await callback.bot.send_message(player1.telegram_id, txt_p1)
+        await callback.bot.send_message(player2.telegram_id, txt_p1, reply_markup=kb)
+        await callback.bot.send_message(player1.telegram_id, txt_p1)
 
-            task = asyncio.create_task(
-                start_throw_timeout(
-                    game.id, player2.id, game.bet, player2, callback.bot
-                )
-            )
-            pending_throws[game.id] = task
+        await schedule_throw_timeout(game.id, player2.id)
 
-            await callback.answer()
+        await callback.answer()
 
-            return
+        return
 
-        else:
-            task = pending_throws.pop(game.id, None)
-            if task:
-                task.cancel()
+    else:
+        await cube_store.clear_deadline(game.id)
 
-            p1_result = first_value
-            p2_result = value
+        p1_result = first_value
+        p2_result = value
 
-            await callback.bot.forward_message(
-                chat_id=player1.telegram_id,
-                from_chat_id=player2.telegram_id,
-                message_id=sent_dice.message_id,
+        await callback.bot.forward_message(
+            chat_id=player1.telegram_id,
+            from_chat_id=player2.telegram_id,
+            message_id=sent_dice.message_id,
+        )
+
+        # info = (
+        #     f"👤 @{player2.username or 'Игрок'} бросил кубик и выбил {p2_result}."
+        # )
+        # await asyncio.gather(
+        #     callback.bot.send_message(player1.telegram_id, info),
+        #     callback.bot.send_message(player2.telegram_id, info)
+        # )
+        if p1_result == p2_result:
+            await cube_store.release_throws(game_id, 1, 2)
+            # клавиатура только первому игроку
+            await callback.bot.send_message(
+                player1.telegram_id,
+                "Ничья! 🎲\nКидаем кубики заново.",
+                reply_markup=throw_cube_keyboard(game.id, 1),  # тут кнопка
             )
 
-            # info = (
-            #     f"👤 @{player2.username or 'Игрок'} бросил кубик и выбил {p2_result}."
-            # )
-            # await asyncio.gather(
-            #     callback.bot.send_message(player1.telegram_id, info),
-            #     callback.bot.send_message(player2.telegram_id, info)
-            # )
-            if p1_result == p2_result:
-                active_throws.discard((game_id, 1))
-                active_throws.discard((game_id, 2))
-                # клавиатура только первому игроку
-                await callback.bot.send_message(
-                    player1.telegram_id,
-                    "Ничья! 🎲\nКидаем кубики заново.",
-                    reply_markup=throw_cube_keyboard(game.id, 1),  # тут кнопка
-                )
+            # второму игроку — просто сообщение, без клавиатуры
+            await callback.bot.send_message(
+                player2.telegram_id, "Ничья! 🎲\nОжидаем ход соперника."
+            )
 
-                # второму игроку — просто сообщение, без клавиатуры
-                await callback.bot.send_message(
-                    player2.telegram_id, "Ничья! 🎲\nОжидаем ход соперника."
-                )
+            await schedule_throw_timeout(game.id, player1.id)
 
-                task = asyncio.create_task(
-                    start_throw_timeout(
-                        game.id, player1.id, game.bet, player1, callback.bot
-                    )
-                )
-                pending_throws[game.id] = task
+            await state.clear()
+            await callback.answer()
+            return
 
-                await state.clear()
+        async with SessionLocal() as session:
+            game = await get_game_by_id(session, game_id)
+            # Пока шла анимация, партию мог закрыть таймаут
+            if not game or game.status != GameStatus.IN_PROGRESS:
                 await callback.answer()
                 return
-
             winner = await finish_game(session, game, p1_result, p2_result)
+            player1 = await get_user_by_id(session, game.player1_id)
+            player2 = await get_user_by_id(session, game.player2_id)
 
-            msg = (
-                f"👤 @{player2.username} выпало {p2_result}.\n"
-                f"<b>@{winner.username} победил! 🎉</b>\n"
-                f"<b>Ваш баланс: {player1.stars:.2f} ⭐️</b>\n"
-                f"<b>Продолжим?👇🏻</b>"
-            )
-            await callback.bot.send_message(
-                player1.telegram_id,
-                msg,
-                parse_mode="HTML",
-                reply_markup=end_game_keyboard(game.bet),
-            )
+        msg = (
+            f"👤 @{player2.username} выпало {p2_result}.\n"
+            f"<b>@{winner.username} победил! 🎉</b>\n"
+            f"<b>Ваш баланс: {player1.stars:.2f} ⭐️</b>\n"
+            f"<b>Продолжим?👇🏻</b>"
+        )
+        await callback.bot.send_message(
+            player1.telegram_id,
+            msg,
+            parse_mode="HTML",
+            reply_markup=end_game_keyboard(game.bet),
+        )
 
-            msg = (
-                f"👤 @{player2.username} выпало {p2_result}.\n"
-                f"<b>@{winner.username} победил! 🎉</b>\n"
-                f"Ваш баланс: {player2.stars:.2f} ⭐️\n"
-                f"<b>Продолжим?👇🏻</b>"
-            )
-            await callback.bot.send_message(
-                player2.telegram_id,
-                msg,
-                parse_mode="HTML",
-                reply_markup=end_game_keyboard(game.bet),
-            )
+        msg = (
+            f"👤 @{player2.username} выпало {p2_result}.\n"
+            f"<b>@{winner.username} победил! 🎉</b>\n"
+            f"Ваш баланс: {player2.stars:.2f} ⭐️\n"
+            f"<b>Продолжим?👇🏻</b>"
+        )
+        await callback.bot.send_message(
+            player2.telegram_id,
+            msg,
+            parse_mode="HTML",
+            reply_markup=end_game_keyboard(game.bet),
+        )
 
-        active_throws.discard(key)
-        await callback.answer()
+    await cube_store.release_throws(game_id, player)
+    await callback.answer()
 
 
 @router.callback_query(F.data.startswith("cancel_game_"))
@@ -327,26 +342,30 @@ async def cancel_game_callback(
     async with SessionLocal() as session:
         game = await get_game_by_id(session, game_id)
         user = await get_user_by_telegram_id(session, telegram_id)
-        if game and game.status == GameStatus.WAITING and game.player1_id == user.id:
-            await cancel_game(session, game)
-            user_cooldowns[telegram_id] = time.time()
-            sent = await callback.message.answer("❌ Вы покинули комнату.")
-            kb = await cube_keyboard()
-            await callback.message.edit_text(
-                "🎲 Добро пожаловать в игру Cube Game!\n\n"
-                "Выберите стол — от этого зависит ставка: 1, 5 или 10 ⭐️.\n"
-                "• После выбора стола ждите соперника. Когда второй игрок присоединится, вы по очереди бросаете кубики.\n"
-                "• 🎯 Победитель — тот, у кого выпадет большее число, забирает банк!\n"
-                "• 💸 Выигрыш: ×2 от ставки минус 20% комиссии игры.\n"
-                "• ♻️ Ничья: Если числа совпали — бросаете кубики заново.\n\n"
-                "🔍 Ищете соперника? Загляните в наш чат — https://t.me/+mKubmWJxJM5mZDUy\n\n"
-                "Готовы испытать удачу? Тогда за стол!👇🏻",
-                disable_web_page_preview=True,
-                reply_markup=kb,
-            )
-            await asyncio.sleep(5)
-            await sent.delete()
-            await state.clear()
+        if not (
+            game and game.status == GameStatus.WAITING and game.player1_id == user.id
+        ):
+            return
+        await cancel_game(session, game)
+
+    await cube_store.set_cooldown(telegram_id, REJOIN_COOLDOWN)
+    sent = await callback.message.answer("❌ Вы покинули комнату.")
+    kb = await cube_keyboard()
+    await callback.message.edit_text(
+        "🎲 Добро пожаловать в игру Cube Game!\n\n"
+        "Выберите стол — от этого зависит ставка: 1, 5 или 10 ⭐️.\n"
+        "• После выбора стола ждите соперника. Когда второй игрок присоединится, вы по очереди бросаете кубики.\n"
+        "• 🎯 Победитель — тот, у кого выпадет большее число, забирает банк!\n"
+        "• 💸 Выигрыш: ×2 от ставки минус 20% комиссии игры.\n"
+        "• ♻️ Ничья: Если числа совпали — бросаете кубики заново.\n\n"
+        "🔍 Ищете соперника? Загляните в наш чат — https://t.me/+mKubmWJxJM5mZDUy\n\n"
+        "Готовы испытать удачу? Тогда за стол!👇🏻",
+        disable_web_page_preview=True,
+        reply_markup=kb,
+    )
+    await asyncio.sleep(5)
+    await sent.delete()
+    await state.clear()
 
 
 @router.callback_query(F.data == "cube_refresh")
@@ -3,17 +3,37 @@ from decimal import Decimal
 
 from aiogram import F, Router, types
 from aiogram.enums import DiceEmoji
+from aiogram.exceptions import TelegramAPIError
 from aiogram.fsm.context import FSMContext
 from db.session import SessionLocal
 from keyboards.slot_machine_keyboard import (
     back_to_slot_machine_keyboard,
     slot_machine_keyboard,
 )
-from utils.slot_machine_requests import log_slot_machine_spin
+from utils.slot_machine_requests import log_slot_machine_spins
 from utils.user_requests import get_user_by_telegram_id
 
 router = Router()
 
+SLOT_ANIMATION = 3  # сек — длительность анимации барабанов
+
+# Ссылки на отложенные отправки итогов, чтобы задачи не собрал GC
+_result_tasks: set[asyncio.Task] = set()
+
+
+def _slot_payout(value: int) -> Decimal:
+    if value in (1, 22, 43):
+        return Decimal(5)
+    if value in (16, 32, 48, 52, 56, 60, 61, 62, 63):
+        return Decimal(1)
+    if value == 64:
+        return Decimal(15)
+    return Decimal(0)
+
+
+# Значение кубика 🎰 (1–64) -> выигрыш
+SLOT_PAYOUTS = {value: _slot_payout(value) for value in range(1, 65)}
+
 
 def register_slot_machine_settings(dp) -> None:
     dp.include_router(router)
@@ -80,40 +100,47 @@ async def pre_checkout_query_handler(
 async def successful_slot_machine_payment(message: types.Message) -> None:
     number_of_spins = int(message.successful_payment.total_amount)
     telegram_id = message.from_user.id
-    total_reward = Decimal(0)
-    results_text = []
-
-    async with SessionLocal() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
 
-        for i in range(number_of_spins):
+    # Ответ игроку — интерактивный трафик, впереди рассылок; на 429
+    # OutboundScheduler сам выждет retry_after и повторит
+    rewards = []
+    try:
+        for _ in range(number_of_spins):
             sent_dice = await message.answer_dice(emoji=DiceEmoji.SLOT_MACHINE)
-            result = sent_dice.dice.value
-
-            if result in (1, 22, 43):
-                reward = Decimal(5)
-            elif result in (16, 32, 48, 52, 56, 60, 61, 62, 63):
-                reward = Decimal(1)
-            elif result == 64:
-                reward = Decimal(15)
-            else:
-                reward = Decimal(0)
-
-            await log_slot_machine_spin(session, user, reward)
-            total_reward += reward
-            results_text.append(
-                f"🎰 Результат #{i+1}: {'+{}⭐'.format(reward) if reward > 0 else 'ничего'}"
-            )
-            await asyncio.sleep(3)
-
+            rewards.append(SLOT_PAYOUTS[sent_dice.dice.value])
+    finally:
+        # Если отправка оборвалась, уже выпавшие оплаченные прокруты всё равно
+        # записываем и начисляем, а ошибка идёт дальше
+        if rewards:
+            async with SessionLocal() as session:
+                user = await get_user_by_telegram_id(session, telegram_id)
+                total_reward = await log_slot_machine_spins(session, user, rewards)
+
+    results_text = [
+        f"🎰 Результат #{i+1}: {'+{}⭐'.format(reward) if reward > 0 else 'ничего'}"
+        for i, reward in enumerate(rewards)
+    ]
     text = (
         "🎰 <b>Результаты прокрутов:</b>\n\n"
         + "\n".join(results_text)
         + f"\n\n💰 <b>Общий выигрыш:</b> {total_reward}⭐"
     )
 
-    await message.answer(
-        text,
-        parse_mode="HTML",
-        reply_markup=back_to_slot_machine_keyboard(number_of_spins),
-    )
+    # Итог — после анимации последнего барабана, без ожидания в хендлере
+    task = asyncio.create_task(send_result_later(message, text, number_of_spins))
+    _result_tasks.add(task)
+    task.add_done_callback(_result_tasks.discard)
+
+
+async def send_result_later(
+    message: types.Message, text: str, number_of_spins: int
+) -> None:
+    await asyncio.sleep(SLOT_ANIMATION)
+    try:
+        await message.answer(
+            text,
+            parse_mode="HTML",
+            reply_markup=back_to_slot_machine_keyboard(number_of_spins),
+        )
+    except TelegramAPIError as e:
+        print(f"[Slot Machine Error] результат для {message.chat.id}: {e}")
@@ -7,6 +7,7 @@ from aiogram.fsm.state import State, StatesGroup
 from db.session import SessionLocal
 from keyboards.games_keyboard import back_to_all_games_keyboard
 from keyboards.x2game_keyboard import play_x2game_again, x2game_keyboard
+from middlewares.user_context import UserContext
 from utils.game_settings_requests import get_game_setting
 from utils.user_requests import get_user_by_telegram_id
 from utils.x2game_requests import save_x2game_results
@@ -24,10 +25,10 @@ def register_x2game_handlers(dp) -> None:
 
 
 @router.callback_query(F.data == "x2_game")
-async def x2_game_callback(callback: types.CallbackQuery, state: FSMContext) -> None:
-    telegram_id = callback.from_user.id
-    async with SessionLocal() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
+async def x2_game_callback(
+    callback: types.CallbackQuery, state: FSMContext, user_context: UserContext
+) -> None:
+    user = user_context.user
     await state.set_state(X2GameState.waiting_for_bet)
     await callback.message.edit_text(
         "🕹️ Добро пожаловать в игру, где удача решает всё!\n\n"
@@ -44,20 +45,18 @@ async def x2_game_callback(callback: types.CallbackQuery, state: FSMContext) ->
 
 
 @router.message(X2GameState.waiting_for_bet, F.text.regexp(r"^\d+(\.\d+)?$"))
-async def x2_game_bet_handler(message: types.Message, state: FSMContext) -> None:
-    telegram_id = message.from_user.id
-    async with SessionLocal() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-
-        try:
-            bet = Decimal(message.text)
-        except Exception:
-            return await message.answer("❌ Неверный формат ставки.")
+async def x2_game_bet_handler(
+    message: types.Message, state: FSMContext, user_context: UserContext
+) -> None:
+    try:
+        bet = Decimal(message.text)
+    except Exception:
+        return await message.answer("❌ Неверный формат ставки.")
 
-        if bet <= 0:
-            return await message.answer("❌ Ставка должна быть больше нуля.")
-        if user.stars < bet:
-            return await message.answer("❌ Недостаточно звёздочек для этой ставки.")
+    if bet <= 0:
+        return await message.answer("❌ Ставка должна быть больше нуля.")
+    if user_context.user.stars < bet:
+        return await message.answer("❌ Недостаточно звёздочек для этой ставки.")
 
     await state.update_data(bet=bet)
     await state.set_state(X2GameState.waiting_for_choice)
@@ -95,7 +94,13 @@ async def x2_game_result_handler(
         elif user_choice == "odd":
             number = random.choice(odd_numbers) if win else random.choice(even_numbers)
 
-        await save_x2game_results(session, user, bet, win)
+        if not await save_x2game_results(session, user, bet, win):
+            # Баланс в кэше контекста мог устареть с момента ставки
+            await state.clear()
+            return await callback.message.edit_text(
+                "❌ Недостаточно звёздочек для этой ставки.",
+                reply_markup=play_x2game_again(),
+            )
 
         if win:
             await callback.message.edit_text(
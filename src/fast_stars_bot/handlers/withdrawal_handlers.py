@@ -12,6 +12,7 @@ from keyboards.withdrawal_keyboard import (
     back_to_withdrawal_keyboard,
     withdrawal_keyboard,
 )
+from middlewares.user_context import UserContext
 from utils.user_requests import (
     get_all_admins,
     get_user_by_telegram_id,
@@ -77,44 +78,38 @@ async def withdrawal_callback(callback: types.CallbackQuery, state: FSMContext)
 
 @router.callback_query(F.data == "withdraw_stars")
 async def withdraw_stars_callback(
-    callback: types.CallbackQuery, state: FSMContext
+    callback: types.CallbackQuery, state: FSMContext, user_context: UserContext
 ) -> None:
     await state.clear()
-    telegram_id = callback.from_user.id
-    async with SessionLocal() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-        if user.stars < 50:
-            await callback.answer(
-                "Вывод доступен от 50.0 ⭐️",
-                show_alert=True,
-            )
-            return
-        await callback.message.edit_text(
-            "Введите сумму для вывода (от 50.0 ⭐️):",
-            reply_markup=back_to_withdrawal_keyboard(),
+    if user_context.user.stars < 50:
+        await callback.answer(
+            "Вывод доступен от 50.0 ⭐️",
+            show_alert=True,
         )
-        await state.set_state(WithdrawalStates.waiting_for_amount)
+        return
+    await callback.message.edit_text(
+        "Введите сумму для вывода (от 50.0 ⭐️):",
+        reply_markup=back_to_withdrawal_keyboard(),
+    )
+    await state.set_state(WithdrawalStates.waiting_for_amount)
 
 
 @router.callback_query(F.data == "withdraw_ton")
 async def withdraw_ton_callback(
-    callback: types.CallbackQuery, state: FSMContext
+    callback: types.CallbackQuery, state: FSMContext, user_context: UserContext
 ) -> None:
     await state.clear()
-    telegram_id = callback.from_user.id
-    async with SessionLocal() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-        if user.stars < 150:
-            await callback.answer(
-                "Вывод доступен от 150.0 ⭐️",
-                show_alert=True,
-            )
-            return
-        await callback.message.edit_text(
-            "Введите сумму для вывода (от 150.0 ⭐️):",
-            reply_markup=back_to_withdrawal_keyboard(),
+    if user_context.user.stars < 150:
+        await callback.answer(
+            "Вывод доступен от 150.0 ⭐️",
+            show_alert=True,
         )
-        await state.set_state(WithdrawalStates.waiting_for_swap_amount)
+        return
+    await callback.message.edit_text(
+        "Введите сумму для вывода (от 150.0 ⭐️):",
+        reply_markup=back_to_withdrawal_keyboard(),
+    )
+    await state.set_state(WithdrawalStates.waiting_for_swap_amount)
 
 
 @router.message(WithdrawalStates.waiting_for_swap_amount)
@@ -14,6 +14,7 @@ from .admin_main_keyboard import admin_back_keyboard, admin_keyboard
 from .admin_message_keyboard import (
     audience_keyboard,
     back_to_message_keyboard,
+    broadcast_jobs_keyboard,
     time_choice_keyboard,
 )
 from .admin_promo_keyboard import (
@@ -9,6 +9,7 @@ def audience_keyboard() -> InlineKeyboardMarkup:
                 text="Отправить только VIP", callback_data="audience_vip"
             )
         ],
+        [InlineKeyboardButton(text="📊 Рассылки", callback_data="broadcast_jobs")],
         [InlineKeyboardButton(text="🔙 Назад", callback_data="back_admin")],
     ]
     return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
@@ -27,3 +28,11 @@ def back_to_message_keyboard() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="🔙 Назад", callback_data="send_message")]
     ]
     return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+
+
+def broadcast_jobs_keyboard() -> InlineKeyboardMarkup:
+    inline_keyboard = [
+        [InlineKeyboardButton(text="🔄 Обновить", callback_data="broadcast_jobs")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="send_message")],
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
@@ -1,21 +1,38 @@
+import asyncio
 from decimal import Decimal
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from db.session import SessionLocal
-from utils.cube_requests import get_active_count, get_waiting_count
+from services.cube_state import cube_store
+from utils.cube_requests import get_lobby_counts
+
+CUBE_BETS = (Decimal("1"), Decimal("5"), Decimal("10"))
+
+_lobby_lock = asyncio.Lock()
+
+
+async def load_lobby_counts() -> dict[Decimal, tuple[int, int]]:
+    counts = await cube_store.get_lobby_snapshot()
+    if counts is not None:
+        return counts
+    # Одновременные обновления в процессе ждут один запрос, а не шлют свои
+    async with _lobby_lock:
+        counts = await cube_store.get_lobby_snapshot()
+        if counts is None:
+            async with SessionLocal() as session:
+                counts = await get_lobby_counts(session, CUBE_BETS)
+            await cube_store.set_lobby_snapshot(counts)
+    return counts
 
 
 async def cube_keyboard() -> InlineKeyboardMarkup:
     rows = []
-    async with SessionLocal() as session:
-        for bet in (Decimal("1"), Decimal("5"), Decimal("10")):
-            wait = await get_waiting_count(session, bet)
-            act = await get_active_count(session, bet)
-
-            text = f"Ставка {bet} ⭐ | ⏳{wait} | 🎮{act}"
-            rows.append(
-                [InlineKeyboardButton(text=text, callback_data=f"cube_bet_{bet}")]
-            )
+    counts = await load_lobby_counts()
+    for bet in CUBE_BETS:
+        wait, act = counts.get(bet, (0, 0))
+
+        text = f"Ставка {bet} ⭐ | ⏳{wait} | 🎮{act}"
+        rows.append([InlineKeyboardButton(text=text, callback_data=f"cube_bet_{bet}")])
 
     rows.append(
         [InlineKeyboardButton(text="🔄 Обновить", callback_data="cube_refresh")]
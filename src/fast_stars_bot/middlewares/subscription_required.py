@@ -7,10 +7,9 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 from db.session import SessionLocal
 from keyboards.channels_keyboard import channels_keyboard
-from services.redis_client import redis_client
+from middlewares.user_context import UserContext
 from utils.channel_requests import get_all_channels
 from utils.subscription_requests import is_user_subscribed_to_all
-from utils.user_requests import get_user_by_telegram_id
 
 
 class SubscriptionRequiredMiddleware(BaseMiddleware):
@@ -35,14 +34,17 @@ class SubscriptionRequiredMiddleware(BaseMiddleware):
         if not is_menu_trigger:
             return await handler(event, data)
 
-        if isinstance(event, CallbackQuery) and event.data == "check_subs":
-            await redis_client.delete(f"subs:{telegram_id}")  # Удаляем кэш ДО проверки
-
         async with SessionLocal() as session:
             channels = await get_all_channels(session)
 
+            # По кнопке "проверить" перепроверяем только неподписанные каналы
             is_subscribed = await is_user_subscribed_to_all(
-                event.bot, telegram_id, channels
+                event.bot,
+                telegram_id,
+                channels,
+                recheck_negative=(
+                    isinstance(event, CallbackQuery) and event.data == "check_subs"
+                ),
             )
 
             if not is_subscribed:
@@ -78,9 +80,9 @@ class SubscriptionRequiredMiddleware(BaseMiddleware):
                     await event.answer(text, parse_mode="HTML", reply_markup=kb)
                 return
 
-            user = await get_user_by_telegram_id(session, telegram_id)
+            user_context: UserContext = data["user_context"]
 
-            if not user:
+            if not user_context.user:
                 if isinstance(event, Message) and (
                     (event.text and event.text.startswith("/start")) or event.contact
                 ):
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+from db.session import SessionLocal
+from services.active_players import ActiveGameRef, get_active_game_ref
+from services.user_cache import (
+    UserProfile,
+    cache_user_profile,
+    get_cached_user_profile,
+)
+from utils.user_requests import get_user_context
+
+
+@dataclass
+class UserContext:
+    telegram_id: int
+    user: UserProfile | None = None
+    active_game: ActiveGameRef | None = None
+
+    @property
+    def is_banned(self) -> bool:
+        return self.user is not None and self.user.is_banned
+
+    @property
+    def is_admin(self) -> bool:
+        return self.user is not None and self.user.is_admin
+
+    @property
+    def is_vip(self) -> bool:
+        return (
+            self.user is not None
+            and self.user.vip_until is not None
+            and self.user.vip_until >= date.today()
+        )
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """
+    Загружает пользователя один раз на апдейт и кладёт UserContext в data.
+    Регистрируется как outer middleware, чтобы контекст был доступен и фильтрам.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: Message | CallbackQuery,
+        data: Dict[str, Any],
+    ) -> Any:
+        if event.from_user is None:
+            return await handler(event, data)
+
+        telegram_id = event.from_user.id
+        profile = await get_cached_user_profile(telegram_id)
+        active_game = None
+        if profile is None:
+            async with SessionLocal() as session:
+                user, game, vip_until = await get_user_context(session, telegram_id)
+            if user:
+                profile = UserProfile.from_user(user, vip_until)
+                await cache_user_profile(profile)
+            if game:
+                active_game = ActiveGameRef(game_id=game.id, status=game.status)
+        else:
+            # Индекс активных игроков в Redis — без обращения к БД
+            active_game = await get_active_game_ref(profile.id)
+
+        data["user_context"] = UserContext(
+            telegram_id=telegram_id, user=profile, active_game=active_game
+        )
+        return await handler(event, data)
@@ -3,7 +3,12 @@ from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
 from aiogram.types import CallbackQuery, Message
 from db.session import SessionLocal
-from utils.user_requests import get_user_by_telegram_id, update_user_username
+from middlewares.user_context import UserContext
+from utils.user_requests import (
+    get_user_by_id,
+    mark_user_reachable,
+    update_user_username,
+)
 
 
 class UserTrackingMiddleware(BaseMiddleware):
@@ -13,7 +18,6 @@ class UserTrackingMiddleware(BaseMiddleware):
         event: Message | CallbackQuery,
         data: Dict[str, Any],
     ) -> Any:
-        telegram_id = event.from_user.id
         current_username = event.from_user.username
 
         if not current_username:
@@ -24,9 +28,15 @@ class UserTrackingMiddleware(BaseMiddleware):
                 await event.answer(text)
             return
 
-        async with SessionLocal() as session:
-            user = await get_user_by_telegram_id(session, telegram_id)
-            if user and user.username != current_username:
-                await update_user_username(session, user, current_username)
+        user_context: UserContext = data["user_context"]
+        user = user_context.user
+        if user and user.username != current_username:
+            async with SessionLocal() as session:
+                db_user = await get_user_by_id(session, user.id)
+                await update_user_username(session, db_user, current_username)
+        if user and user.is_unreachable:
+            # Пользователь снова пишет боту — возвращаем его в рассылки
+            async with SessionLocal() as session:
+                await mark_user_reachable(session, user.telegram_id)
 
         return await handler(event, data)
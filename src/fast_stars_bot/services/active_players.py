@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+
+from db.models.cube_game import CubeGame, GameStatus
+from services.cube_state import cube_store
+from services.redis_client import redis_client
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ACTIVE_PLAYERS_KEY = "cube:active_players"
+ACTIVE_STATUSES = (GameStatus.WAITING, GameStatus.IN_PROGRESS)
+
+
+@dataclass
+class ActiveGameRef:
+    game_id: int
+    status: GameStatus
+
+
+def _players(game: CubeGame) -> list[int]:
+    return [p for p in (game.player1_id, game.player2_id) if p is not None]
+
+
+async def track_game(game: CubeGame) -> None:
+    """
+    Синхронизирует индекс активных игроков с текущим состоянием игры.
+    """
+    players = _players(game)
+    # Статус или состав стола изменился — снимок лобби устарел
+    await cube_store.invalidate_lobby()
+    if not players:
+        return
+    if game.status in ACTIVE_STATUSES:
+        value = f"{game.id}:{game.status.value}"
+        await redis_client.hset(
+            ACTIVE_PLAYERS_KEY, mapping={str(p): value for p in players}
+        )
+    else:
+        await redis_client.hdel(ACTIVE_PLAYERS_KEY, *(str(p) for p in players))
+
+
+async def untrack_players(*user_ids: int) -> None:
+    if user_ids:
+        await redis_client.hdel(ACTIVE_PLAYERS_KEY, *(str(u) for u in user_ids))
+
+
+async def get_active_game_ref(user_id: int) -> ActiveGameRef | None:
+    value = await redis_client.hget(ACTIVE_PLAYERS_KEY, str(user_id))
+    if value is None:
+        return None
+    game_id, status = value.split(":", 1)
+    return ActiveGameRef(game_id=int(game_id), status=GameStatus(status))
+
+
+async def rebuild_active_players(session: AsyncSession) -> None:
+    result = await session.execute(
+        select(CubeGame).where(CubeGame.status.in_(ACTIVE_STATUSES))
+    )
+    mapping = {}
+    for game in result.scalars().all():
+        for player_id in _players(game):
+            mapping[str(player_id)] = f"{game.id}:{game.status.value}"
+
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(ACTIVE_PLAYERS_KEY)
+        if mapping:
+            pipe.hset(ACTIVE_PLAYERS_KEY, mapping=mapping)
+        await pipe.execute()
@@ -1,4 +1,12 @@
 import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 
 from aiogram.exceptions import (
     TelegramAPIError,
@@ -7,59 +15,334 @@ from aiogram.exceptions import (
     TelegramNetworkError,
     TelegramNotFound,
 )
+from aiogram.types import MessageEntity
+from db.models.broadcast_job import BroadcastJob, BroadcastStatus
 from db.session import SessionLocal
-from utils.user_requests import get_all_users
-from utils.vip_requests import get_all_vip_users
+from services.outbound import bulk_sender
+from utils.broadcast_requests import (
+    claim_broadcast_job,
+    create_broadcast_job,
+    finish_broadcast_job,
+    get_broadcast_job,
+    get_unfinished_broadcast_jobs,
+    save_broadcast_checkpoint,
+    start_broadcast_job,
+)
+from utils.user_requests import (
+    count_audience,
+    get_audience_page,
+    mark_users_unreachable,
+)
 
+logger = logging.getLogger("bot.broadcast")
 
-async def send_broadcast(bot, data: dict) -> None:
-    async with SessionLocal() as session:
-        users = (
-            await get_all_vip_users(session)
-            if data["audience"] == "vip"
-            else await get_all_users(session)
+AUDIENCE_PAGE_SIZE = 1000
+BROADCAST_WORKERS = 30  # темп всё равно ограничивает OutboundScheduler
+PROGRESS_LOG_EVERY = 1000
+CHECKPOINT_INTERVAL = 5  # сек — столько работы максимум повторится после рестарта
+# Аренда продлевается с каждым чекпоинтом; упавший процесс отпустит
+# рассылку через LEASE_TTL, и её подхватит другой
+LEASE_TTL = timedelta(seconds=60)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+@dataclass
+class BroadcastStats:
+    sent: int = 0
+    failed: int = 0
+    resumed_from: int = 0  # отправлено до рестарта
+    started_at: float = field(default_factory=time.monotonic)
+    unreachable: list[int] = field(default_factory=list)  # ещё не записаны в БД
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rate(self) -> float:
+        processed = self.sent + self.failed - self.resumed_from
+        return processed / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"отправлено {self.sent}, ошибок {self.failed}, "
+            f"за {self.elapsed:.0f} с ({self.rate:.1f} сообщ./с)"
         )
-        for user in users:
-            try:
-                if data.get("photo"):
-                    await bot.send_photo(
-                        chat_id=user.telegram_id,
-                        photo=data["photo"],
-                        caption=data.get("text"),
-                        caption_entities=data.get("entities"),
-                    )
-                else:
-                    await bot.send_message(
-                        chat_id=user.telegram_id,
-                        text=data["text"],
-                        entities=data.get("entities"),
-                    )
-                await asyncio.sleep(0.05)
-            except TelegramForbiddenError:
-                print(f"Бот заблокирован пользователем {user.telegram_id}.")
-                continue
-            except TelegramNotFound:
-                print(f"Чат с пользователем {user.telegram_id} не найден.")
-                continue
-            except TelegramNetworkError as e:
-                print(
-                    f"Проблема с сетью при отправке пользователю {user.telegram_id}: {e}"
-                )
-                await asyncio.sleep(1)
-                continue
-            except TelegramBadRequest as e:
-                print(f"Некорректный запрос Telegram для {user.telegram_id}: {e}")
-                continue
-            except TelegramAPIError as e:
-                print(f"Ошибка Telegram API для {user.telegram_id}: {e}")
-                continue
-            except Exception as e:
-                print(
-                    f"Неизвестная ошибка при отправке пользователю {user.telegram_id}: {e}"
+
+
+class Checkpoint:
+    """
+    Наибольший user_id, до которого включительно все получатели обработаны.
+    Воркеры завершают отправки не по порядку, поэтому храним очередь id.
+    """
+
+    def __init__(self, last_user_id: int) -> None:
+        self.last_user_id = last_user_id
+        self._pending: deque[int] = deque()
+        self._done: set[int] = set()
+
+    def enqueued(self, user_id: int) -> None:
+        self._pending.append(user_id)
+
+    def completed(self, user_id: int) -> None:
+        self._done.add(user_id)
+        while self._pending and self._pending[0] in self._done:
+            self.last_user_id = self._pending.popleft()
+            self._done.discard(self.last_user_id)
+
+
+def serialize_payload(data: dict) -> dict:
+    entities = data.get("entities")
+    return {
+        "text": data.get("text"),
+        "entities": (
+            [e.model_dump(mode="json", exclude_none=True) for e in entities]
+            if entities
+            else None
+        ),
+        "photo": data.get("photo"),
+        "from_chat_id": data.get("from_chat_id"),
+        "message_id": data.get("message_id"),
+    }
+
+
+def deserialize_payload(payload: dict) -> dict:
+    data = dict(payload)
+    if data.get("entities"):
+        data["entities"] = [MessageEntity.model_validate(e) for e in data["entities"]]
+    return data
+
+
+async def iter_audience(audience: str, after_id: int = 0):
+    """
+    Отдаёт (user_id, telegram_id) получателей страницами; сессия держится только
+    на время запроса страницы, а не всей рассылки.
+    """
+    last_id = after_id
+    while True:
+        async with SessionLocal() as session:
+            page = await get_audience_page(
+                session, last_id, AUDIENCE_PAGE_SIZE, vip_only=audience == "vip"
+            )
+        if not page:
+            return
+        for row in page:
+            yield row
+        last_id = page[-1][0]
+
+
+async def send_broadcast_message(bot, telegram_id: int, data: dict) -> None:
+    # copy_message переиспользует исходное сообщение админа вместе с фото
+    if data.get("from_chat_id") and not data.get("source_missing"):
+        try:
+            await bot.copy_message(
+                chat_id=telegram_id,
+                from_chat_id=data["from_chat_id"],
+                message_id=data["message_id"],
+            )
+            return
+        except TelegramBadRequest as e:
+            if "message to copy not found" not in str(e).lower():
+                raise
+            data["source_missing"] = True  # исходник удалён — шлём по file_id
+
+    if data.get("photo"):
+        await bot.send_photo(
+            chat_id=telegram_id,
+            photo=data["photo"],
+            caption=data.get("text"),
+            caption_entities=data.get("entities"),
+        )
+    else:
+        await bot.send_message(
+            chat_id=telegram_id,
+            text=data["text"],
+            entities=data.get("entities"),
+        )
+
+
+async def broadcast_worker(
+    bot,
+    queue: asyncio.Queue,
+    data: dict,
+    stats,
+    checkpoint: Checkpoint,
+    lease_lost: asyncio.Event,
+) -> None:
+    while True:
+        user_id, telegram_id = await queue.get()
+        if lease_lost.is_set():
+            # Остаток очереди разошлёт процесс, забравший рассылку
+            queue.task_done()
+            continue
+        try:
+            await send_broadcast_message(bot, telegram_id, data)
+            stats.sent += 1
+        except TelegramForbiddenError:
+            stats.failed += 1
+            stats.unreachable.append(telegram_id)
+            print(f"Бот заблокирован пользователем {telegram_id}.")
+        except TelegramNotFound:
+            stats.failed += 1
+            stats.unreachable.append(telegram_id)
+            print(f"Чат с пользователем {telegram_id} не найден.")
+        except TelegramNetworkError as e:
+            stats.failed += 1
+            print(f"Проблема с сетью при отправке пользователю {telegram_id}: {e}")
+            await asyncio.sleep(1)
+        except TelegramBadRequest as e:
+            stats.failed += 1
+            print(f"Некорректный запрос Telegram для {telegram_id}: {e}")
+        except TelegramAPIError as e:
+            stats.failed += 1
+            print(f"Ошибка Telegram API для {telegram_id}: {e}")
+        except Exception as e:
+            stats.failed += 1
+            print(f"Неизвестная ошибка при отправке пользователю {telegram_id}: {e}")
+        finally:
+            checkpoint.completed(user_id)
+            queue.task_done()
+
+        done = stats.sent + stats.failed
+        if done % PROGRESS_LOG_EVERY == 0:
+            logger.info(f"broadcast progress: {stats.summary()}")
+
+
+async def flush_unreachable(session, stats: BroadcastStats) -> None:
+    unreachable, stats.unreachable = stats.unreachable, []
+    await mark_users_unreachable(session, unreachable)
+
+
+async def checkpoint_saver(
+    job_id: int, stats, checkpoint: Checkpoint, lease_lost: asyncio.Event
+) -> None:
+    renewed_at = time.monotonic()
+    while True:
+        await asyncio.sleep(CHECKPOINT_INTERVAL)
+        try:
+            async with SessionLocal() as session:
+                owned = await save_broadcast_checkpoint(
+                    session,
+                    job_id,
+                    checkpoint.last_user_id,
+                    stats.sent,
+                    stats.failed,
+                    WORKER_ID,
+                    LEASE_TTL,
                 )
-                continue
+                await flush_unreachable(session, stats)
+            if owned:
+                renewed_at = time.monotonic()
+        except Exception as e:
+            print(f"[Broadcast Checkpoint Error] job {job_id}: {e}")
+            owned = True
+
+        # Аренду не удалось продлить вовремя — её мог забрать другой процесс
+        expired = time.monotonic() - renewed_at > LEASE_TTL.total_seconds()
+        if not owned or expired:
+            logger.warning(f"broadcast {job_id}: lease lost, stopping")
+            lease_lost.set()
+            return
+
+
+@bulk_sender
+async def send_broadcast(bot, job: BroadcastJob) -> BroadcastStats:
+    """
+    Потоковая рассылка: страницы получателей читаются по мере отправки,
+    сообщения отправляет ограниченный пул воркеров. Продолжает с чекпоинта job.
+    Вызывается только владельцем аренды (см. run_broadcast_job).
+    """
+    data = deserialize_payload(job.payload)
+    stats = BroadcastStats(
+        sent=job.sent, failed=job.failed, resumed_from=job.sent + job.failed
+    )
+    checkpoint = Checkpoint(job.last_user_id)
+    async with SessionLocal() as session:
+        remaining = await count_audience(
+            session, job.last_user_id, vip_only=job.audience == "vip"
+        )
+        await start_broadcast_job(session, job.id, stats.resumed_from + remaining)
+
+    queue: asyncio.Queue[tuple[int, int]] = asyncio.Queue(maxsize=BROADCAST_WORKERS * 2)
+    lease_lost = asyncio.Event()
+    workers = [
+        asyncio.create_task(
+            broadcast_worker(bot, queue, data, stats, checkpoint, lease_lost)
+        )
+        for _ in range(BROADCAST_WORKERS)
+    ]
+    saver = asyncio.create_task(checkpoint_saver(job.id, stats, checkpoint, lease_lost))
+    try:
+        async for user_id, telegram_id in iter_audience(job.audience, job.last_user_id):
+            if lease_lost.is_set():
+                break
+            checkpoint.enqueued(user_id)
+            await queue.put((user_id, telegram_id))
+        await queue.join()
+    finally:
+        for task in (*workers, saver):
+            task.cancel()
+        await asyncio.gather(*workers, saver, return_exceptions=True)
+
+    if lease_lost.is_set():
+        return stats
 
+    async with SessionLocal() as session:
+        await finish_broadcast_job(session, job.id, stats.sent, stats.failed)
+        await flush_unreachable(session, stats)
+    logger.info(f"broadcast {job.id} finished: {stats.summary()}")
+    return stats
+
+
+async def create_broadcast(data: dict, send_at: datetime) -> int:
+    async with SessionLocal() as session:
+        job = await create_broadcast_job(
+            session, data["audience"], serialize_payload(data), send_at
+        )
+    return job.id
+
+
+async def acquire_broadcast_job(job_id: int) -> BroadcastJob | None:
+    """
+    Ждёт, пока рассылку удастся забрать в аренду. None — она уже завершена.
+    """
+    while True:
+        async with SessionLocal() as session:
+            claimed = await claim_broadcast_job(session, job_id, WORKER_ID, LEASE_TTL)
+            # Читаем после захвата: чекпоинт мог сдвинуть прошлый владелец
+            job = await get_broadcast_job(session, job_id)
+        if not job or job.status == BroadcastStatus.FINISHED:
+            return None
+        if claimed:
+            return job
+        # Рассылку ведёт другой процесс; подхватим, если его аренда истечёт
+        await asyncio.sleep(LEASE_TTL.total_seconds())
 
-async def delayed_broadcast(bot, delay: float, data: dict) -> None:
-    await asyncio.sleep(delay)
-    await send_broadcast(bot, data)
+
+async def run_broadcast_job(bot, job_id: int) -> BroadcastStats | None:
+    async with SessionLocal() as session:
+        job = await get_broadcast_job(session, job_id)
+    if not job or job.status == BroadcastStatus.FINISHED:
+        return None
+
+    delay = (job.send_at - datetime.now(timezone.utc)).total_seconds()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    try:
+        job = await acquire_broadcast_job(job_id)
+        if job is None:
+            return None
+        return await send_broadcast(bot, job)
+    except Exception as e:
+        # Задание остаётся незавершённым и продолжится после рестарта
+        print(f"[Broadcast Error] job {job_id}: {e}")
+        return None
+
+
+async def resume_broadcast_jobs(bot) -> None:
+    async with SessionLocal() as session:
+        jobs = await get_unfinished_broadcast_jobs(session)
+    for job in jobs:
+        if job.status == BroadcastStatus.RUNNING:
+            logger.info(f"resuming broadcast {job.id} after user {job.last_user_id}")
+        asyncio.create_task(run_broadcast_job(bot, job.id))
@@ -0,0 +1,34 @@
+import asyncio
+
+from aiogram import Bot
+from db.session import SessionLocal
+from utils.channel_requests import get_all_channels, update_channel_chat_ids
+from utils.subscription_requests import fetch_chat_id, is_private_link
+
+
+async def refresh_channel_chat_ids(bot: Bot, interval_seconds: int = 21600) -> None:
+    """
+    Периодически резолвит id приватных каналов и сохраняет их в БД,
+    чтобы проверки подписки не дёргали get_chat.
+    """
+    while True:
+        try:
+            async with SessionLocal() as session:
+                channels = await get_all_channels(session)
+
+            # get_chat идёт без открытой сессии: соединение из пула не ждёт
+            # ответов Telegram по каждому каналу
+            resolved = {}
+            for channel in channels:
+                if not is_private_link(channel.link):
+                    continue
+                chat_id = await fetch_chat_id(bot, channel.username)
+                if chat_id is not None and chat_id != channel.chat_id:
+                    resolved[channel.id] = chat_id
+
+            if resolved:
+                async with SessionLocal() as session:
+                    await update_channel_chat_ids(session, resolved)
+        except Exception as e:
+            print(f"[Channel Resolver Error] {e}")
+        await asyncio.sleep(interval_seconds)
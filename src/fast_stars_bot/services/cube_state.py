@@ -0,0 +1,174 @@
+import time
+from abc import ABC, abstractmethod
+from decimal import Decimal
+
+from services.redis_client import redis_client
+
+THROW_CLAIM_TTL = 120  # сек — страховка, если бросок так и не завершился
+THROW_MESSAGE_TTL = 300
+DEADLINES_KEY = "cube:deadlines"  # zset "game_id:user_id" -> дедлайн (unix time)
+DEADLINE_GAMES_KEY = "cube:deadline_games"  # hash game_id -> "game_id:user_id"
+LOBBY_KEY = "cube:lobby"  # hash ставка -> "ожидают:играют"
+LOBBY_TTL = 5  # сек — пачка обновлений лобби считается один раз
+
+# Забирает дедлайн, только если он ещё актуален и уже наступил — сработает
+# ровно один таймер, в каком бы процессе он ни был запущен
+CLAIM_DEADLINE_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not score or tonumber(score) > tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[2])
+return 1
+"""
+
+
+class CubeStateStore(ABC):
+    """
+    Состояние партий в кубик, общее для всех процессов бота.
+    """
+
+    @abstractmethod
+    async def claim_throw(self, game_id: int, player: int) -> bool: ...
+
+    @abstractmethod
+    async def release_throws(self, game_id: int, *players: int) -> None: ...
+
+    @abstractmethod
+    async def set_cooldown(self, telegram_id: int, seconds: int) -> None: ...
+
+    @abstractmethod
+    async def get_cooldown(self, telegram_id: int) -> int: ...
+
+    @abstractmethod
+    async def set_throw_message(
+        self, game_id: int, chat_id: int, message_id: int
+    ) -> None: ...
+
+    @abstractmethod
+    async def pop_throw_message(self, game_id: int) -> tuple[int, int] | None: ...
+
+    @abstractmethod
+    async def set_deadline(self, game_id: int, user_id: int, seconds: int) -> float: ...
+
+    @abstractmethod
+    async def clear_deadline(self, game_id: int) -> None: ...
+
+    @abstractmethod
+    async def claim_deadline(self, game_id: int, user_id: int) -> bool: ...
+
+    @abstractmethod
+    async def get_due_deadlines(self, limit: int) -> list[tuple[int, int]]: ...
+
+    @abstractmethod
+    async def get_lobby_snapshot(self) -> dict[Decimal, tuple[int, int]] | None: ...
+
+    @abstractmethod
+    async def set_lobby_snapshot(
+        self, counts: dict[Decimal, tuple[int, int]]
+    ) -> None: ...
+
+    @abstractmethod
+    async def invalidate_lobby(self) -> None: ...
+
+
+class RedisCubeStateStore(CubeStateStore):
+    def __init__(self, redis=redis_client) -> None:
+        self.redis = redis
+        self._claim_deadline = redis.register_script(CLAIM_DEADLINE_SCRIPT)
+
+    async def claim_throw(self, game_id: int, player: int) -> bool:
+        return bool(
+            await self.redis.set(
+                f"cube:throw:{game_id}:{player}", "1", nx=True, ex=THROW_CLAIM_TTL
+            )
+        )
+
+    async def release_throws(self, game_id: int, *players: int) -> None:
+        if players:
+            await self.redis.delete(*(f"cube:throw:{game_id}:{p}" for p in players))
+
+    async def set_cooldown(self, telegram_id: int, seconds: int) -> None:
+        await self.redis.set(f"cube:cooldown:{telegram_id}", "1", ex=seconds)
+
+    async def get_cooldown(self, telegram_id: int) -> int:
+        ttl = await self.redis.ttl(f"cube:cooldown:{telegram_id}")
+        return max(ttl, 0)
+
+    async def set_throw_message(
+        self, game_id: int, chat_id: int, message_id: int
+    ) -> None:
+        await self.redis.set(
+            f"cube:throw_message:{game_id}",
+            f"{chat_id}:{message_id}",
+            ex=THROW_MESSAGE_TTL,
+        )
+
+    async def pop_throw_message(self, game_id: int) -> tuple[int, int] | None:
+        value = await self.redis.getdel(f"cube:throw_message:{game_id}")
+        if value is None:
+            return None
+        chat_id, message_id = value.split(":")
+        return int(chat_id), int(message_id)
+
+    async def set_deadline(self, game_id: int, user_id: int, seconds: int) -> float:
+        deadline = time.time() + seconds
+        member = f"{game_id}:{user_id}"
+        previous = await self.redis.hget(DEADLINE_GAMES_KEY, str(game_id))
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if previous and previous != member:
+                pipe.zrem(DEADLINES_KEY, previous)
+            pipe.zadd(DEADLINES_KEY, {member: deadline})
+            pipe.hset(DEADLINE_GAMES_KEY, str(game_id), member)
+            await pipe.execute()
+        return deadline
+
+    async def clear_deadline(self, game_id: int) -> None:
+        member = await self.redis.hget(DEADLINE_GAMES_KEY, str(game_id))
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if member:
+                pipe.zrem(DEADLINES_KEY, member)
+            pipe.hdel(DEADLINE_GAMES_KEY, str(game_id))
+            await pipe.execute()
+
+    async def claim_deadline(self, game_id: int, user_id: int) -> bool:
+        claimed = await self._claim_deadline(
+            keys=[DEADLINES_KEY, DEADLINE_GAMES_KEY],
+            args=[f"{game_id}:{user_id}", str(game_id), time.time()],
+        )
+        return claimed == 1
+
+    async def get_due_deadlines(self, limit: int) -> list[tuple[int, int]]:
+        members = await self.redis.zrangebyscore(
+            DEADLINES_KEY, "-inf", time.time(), start=0, num=limit
+        )
+        due = []
+        for member in members:
+            game_id, user_id = member.split(":")
+            due.append((int(game_id), int(user_id)))
+        return due
+
+    async def get_lobby_snapshot(self) -> dict[Decimal, tuple[int, int]] | None:
+        cached = await self.redis.hgetall(LOBBY_KEY)
+        if not cached:
+            return None
+        counts = {}
+        for bet, value in cached.items():
+            waiting, active = value.split(":")
+            counts[Decimal(bet)] = (int(waiting), int(active))
+        return counts
+
+    async def set_lobby_snapshot(self, counts: dict[Decimal, tuple[int, int]]) -> None:
+        mapping = {str(bet): f"{w}:{a}" for bet, (w, a) in counts.items()}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(LOBBY_KEY)
+            pipe.hset(LOBBY_KEY, mapping=mapping)
+            pipe.expire(LOBBY_KEY, LOBBY_TTL)
+            await pipe.execute()
+
+    async def invalidate_lobby(self) -> None:
+        await self.redis.delete(LOBBY_KEY)
+
+
+cube_store: CubeStateStore = RedisCubeStateStore()
@@ -0,0 +1,90 @@
+import uuid
+
+from services.redis_client import redis_client
+
+GIVEAWAY_TOTAL_KEY = "giveaway:{giveaway_id}:total"
+GIVEAWAY_TICKETS_KEY = "giveaway:{giveaway_id}:tickets"  # user_id -> билеты
+GIVEAWAY_FILL_KEY = "giveaway:{giveaway_id}:filling"  # токен идущего заполнения
+FILL_TTL = 10  # сек — зависшее заполнение не мешает следующему
+
+# Счётчики заполнены — увеличиваем их. Не заполнены — сбиваем идущее
+# заполнение: прочитанные им из БД данные могли не включать эту покупку
+ADD_TICKETS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('DEL', KEYS[3])
+    return 0
+end
+redis.call('INCRBY', KEYS[1], ARGV[2])
+return redis.call('HINCRBY', KEYS[2], ARGV[1], ARGV[2])
+"""
+
+# Записывает счётчики, только если с начала заполнения не было покупок
+FILL_COUNTERS_SCRIPT = """
+if redis.call('GET', KEYS[3]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[2], KEYS[3])
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+end
+redis.call('SET', KEYS[1], ARGV[2])
+return 1
+"""
+
+add_tickets_script = redis_client.register_script(ADD_TICKETS_SCRIPT)
+fill_counters_script = redis_client.register_script(FILL_COUNTERS_SCRIPT)
+
+
+def _keys(giveaway_id: int) -> tuple[str, str, str]:
+    return (
+        GIVEAWAY_TOTAL_KEY.format(giveaway_id=giveaway_id),
+        GIVEAWAY_TICKETS_KEY.format(giveaway_id=giveaway_id),
+        GIVEAWAY_FILL_KEY.format(giveaway_id=giveaway_id),
+    )
+
+
+async def add_tickets(giveaway_id: int, user_id: int, amount: int) -> None:
+    await add_tickets_script(keys=_keys(giveaway_id), args=[user_id, amount])
+
+
+async def start_counters_fill(giveaway_id: int) -> str:
+    """
+    Вызывается до чтения билетов из БД; токен передаётся в fill_giveaway_counters.
+    """
+    token = uuid.uuid4().hex
+    await redis_client.set(_keys(giveaway_id)[2], token, ex=FILL_TTL)
+    return token
+
+
+async def fill_giveaway_counters(
+    giveaway_id: int, token: str, user_ids: list[int], counts: list[int]
+) -> bool:
+    """
+    False — во время чтения из БД прошла покупка, счётчики не записаны.
+    """
+    args = [token, sum(counts)]
+    for user_id, count in zip(user_ids, counts):
+        args += [user_id, count]
+    return await fill_counters_script(keys=_keys(giveaway_id), args=args) == 1
+
+
+async def read_giveaway_counters(
+    giveaway_id: int, user_id: int | None = None
+) -> tuple[int, int, int] | None:
+    """
+    (всего билетов, участников, билетов у user_id) или None, если счётчики
+    ещё не заполнены.
+    """
+    total_key, tickets_key, _ = _keys(giveaway_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.get(total_key)
+        pipe.hlen(tickets_key)
+        pipe.hget(tickets_key, str(user_id) if user_id is not None else "")
+        total, participants, user_tickets = await pipe.execute()
+    if total is None:
+        return None
+    return int(total), participants, int(user_tickets or 0)
+
+
+async def drop_giveaway_counters(giveaway_id: int) -> None:
+    await redis_client.delete(*_keys(giveaway_id))
@@ -0,0 +1,38 @@
+import heapq
+import math
+import random
+from bisect import bisect_right
+from itertools import accumulate
+
+
+def draw_with_replacement(
+    user_ids: list[int], counts: list[int], k: int, rng: random.Random | None = None
+) -> list[int]:
+    """
+    k независимых розыгрышей по одному билету: пользователь может выиграть
+    несколько мест. Префиксные суммы + бинарный поиск — O(n + k log n)
+    по числу участников, а не билетов.
+    """
+    rng = rng or random
+    cumulative = list(accumulate(counts))
+    if not cumulative or cumulative[-1] <= 0:
+        return []
+    total = cumulative[-1]
+    return [user_ids[bisect_right(cumulative, rng.random() * total)] for _ in range(k)]
+
+
+def draw_without_replacement(
+    user_ids: list[int], counts: list[int], k: int, rng: random.Random | None = None
+) -> list[int]:
+    """
+    До k разных победителей с шансом, пропорциональным билетам
+    (Efraimidis–Spirakis: ключ log(u)/w, берём k наибольших) — O(n log k).
+    Порядок результата — порядок мест.
+    """
+    rng = rng or random
+    keyed = (
+        (math.log(1.0 - rng.random()) / count, user_id)
+        for user_id, count in zip(user_ids, counts)
+        if count > 0
+    )
+    return [user_id for _, user_id in heapq.nlargest(k, keyed)]
@@ -1,22 +1,28 @@
 import asyncio
 from datetime import datetime, timedelta
 from decimal import Decimal
-from random import choices
 
 from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramNotFound
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
 from db.session import SessionLocal
 from pytz import timezone
+from services.giveaway_draw import draw_with_replacement
+from services.outbound import bulk_sender
 from utils.giveaway_requests import (
     create_giveaway,
     get_active_bot_giveaway,
     get_giveaway_by_id,
-    get_tickets_for_giveaway,
-    mark_giveaway_finished,
+    get_ticket_counts,
+    settle_giveaway,
+)
+from utils.user_requests import (
+    get_all_users,
+    get_users_by_ids,
+    mark_users_unreachable,
 )
-from utils.user_requests import add_stars_to_user, get_all_users, get_user_by_id
 
 scheduler = AsyncIOScheduler()
 kyiv_tz = timezone("Europe/Kyiv")
@@ -97,12 +103,13 @@ async def ensure_active_bot_giveaway_exists() -> None:
             )
 
 
+@bulk_sender
 async def notify_giveaway_start(giveaway_id: int, bot: Bot) -> None:
     async with SessionLocal() as session:
         giveaway = await get_giveaway_by_id(session, giveaway_id)
         if not giveaway:
             return
-        users = await get_all_users(session)
+        users = await get_all_users(session, reachable_only=True)
 
         text = (
             f"<b>🎉 Начался новый розыгрыш: {giveaway.name}!</b>\n\n"
@@ -112,52 +119,61 @@ async def notify_giveaway_start(giveaway_id: int, bot: Bot) -> None:
             f"🎟 Участвуй прямо сейчас — чем больше билетов, тем выше шансы на победу!"
         )
 
+        unreachable = []
         for user in users:
             try:
                 await bot.send_message(user.telegram_id, text, parse_mode="HTML")
+            except (TelegramForbiddenError, TelegramNotFound):
+                unreachable.append(user.telegram_id)
             except Exception:
                 continue
+        await mark_users_unreachable(session, unreachable)
 
 
+@bulk_sender
 async def handle_giveaway_finish(bot: Bot, session, giveaway_id: int) -> None:
     giveaway = await get_giveaway_by_id(session, giveaway_id)
-    tickets = await get_tickets_for_giveaway(session, giveaway_id)
-    if not tickets:
+    user_ids, counts = await get_ticket_counts(session, giveaway_id)
+    if not user_ids:
         return
 
-    pool = [t.user_id for t in tickets]
-    winners = choices(pool, k=giveaway.num_of_winners)
-
-    await mark_giveaway_finished(session, giveaway_id)
+    # Каждое место разыгрывается по всем билетам, как и раньше
+    winners = draw_with_replacement(user_ids, counts, giveaway.num_of_winners)
 
     user_rewards = {}
     prize_distribution = generate_prizes(giveaway.num_of_winners, giveaway.prize_pool)
 
     for i, user_id in enumerate(winners, start=1):
         reward = prize_distribution.get(i, 0)
-        user_rewards.setdefault(user_id, 0)
+        user_rewards.setdefault(user_id, Decimal(0))
         user_rewards[user_id] += reward
 
-    for user_id, total_reward in user_rewards.items():
-        await add_stars_to_user(session, user_id, Decimal(total_reward))
+    # Завершение и начисления — одна транзакция; повторный запуск ничего не делает
+    if not await settle_giveaway(session, giveaway_id, user_rewards):
+        return
 
+    winner_users = await get_users_by_ids(session, list(user_rewards))
     result_text = (
         f"<b>🎉 Результаты розыгрыша {giveaway.name}!</b>\n"
         f"<i>Спасибо за участие. Вот список победителей:</i>\n\n"
     )
     for i, user_id in enumerate(winners[: giveaway.num_of_winners], 1):
-        user = await get_user_by_id(session, user_id)
+        user = winner_users[user_id]
         result_text += (
             f"<b>{i}.</b> @{user.username or '—'} — {prize_distribution.get(i, 0)}⭐️\n"
         )
     result_text += "\nСледи за следующими розыгрышами — скоро новый!"
 
-    users = await get_all_users(session)
+    users = await get_all_users(session, reachable_only=True)
+    unreachable = []
     for user in users:
         try:
             await bot.send_message(user.telegram_id, result_text, parse_mode="HTML")
+        except (TelegramForbiddenError, TelegramNotFound):
+            unreachable.append(user.telegram_id)
         except Exception:
             continue
+    await mark_users_unreachable(session, unreachable)
 
 
 def generate_prizes(num_winners: int, prize_pool: Decimal) -> dict:
@@ -0,0 +1,31 @@
+import logging
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from db.session import SessionLocal
+from pytz import timezone
+from utils.ledger_requests import ensure_ledger_partitions, take_balance_snapshots
+
+logger = logging.getLogger("bot.balance_ledger")
+
+scheduler = AsyncIOScheduler()
+kyiv_tz = timezone("Europe/Kyiv")
+
+
+def setup_balance_ledger_jobs() -> None:
+    scheduler.add_job(
+        balance_snapshots_job,
+        CronTrigger(hour=0, minute=15, timezone=kyiv_tz),
+    )
+    scheduler.start()
+
+
+async def balance_snapshots_job() -> None:
+    try:
+        async with SessionLocal() as session:
+            # Заодно держим секции журнала на месяцы вперёд
+            await ensure_ledger_partitions(session)
+            snapshots = await take_balance_snapshots(session)
+        logger.info(f"balance snapshots taken: {snapshots}")
+    except Exception as e:
+        print(f"[Balance Ledger Error] {e}")
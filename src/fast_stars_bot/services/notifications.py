@@ -8,13 +8,17 @@ from aiogram.exceptions import (
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from db.models.task import Task
 from db.session import SessionLocal
+from services.outbound import bulk_sender
 from utils.task_requests import is_user_subscribed_to_task
+from utils.user_requests import mark_users_unreachable
 from utils.vip_requests import get_all_vip_users
 
 
+@bulk_sender
 async def notify_vip_users_about_new_task(bot: Bot, task: Task) -> None:
     async with SessionLocal() as session:
-        vip_users = await get_all_vip_users(session)
+        vip_users = await get_all_vip_users(session, reachable_only=True)
+        unreachable = []
         for user in vip_users:
             try:
                 is_subscribed = await is_user_subscribed_to_task(
@@ -37,9 +41,11 @@ async def notify_vip_users_about_new_task(bot: Bot, task: Task) -> None:
                     ),
                 )
             except TelegramForbiddenError:
+                unreachable.append(user.telegram_id)
                 print(f"Бот заблокирован пользователем {user.telegram_id}.")
                 continue
             except TelegramNotFound:
+                unreachable.append(user.telegram_id)
                 print(f"Чат с пользователем {user.telegram_id} не найден.")
                 continue
             except TelegramBadRequest as e:
@@ -50,3 +56,4 @@ async def notify_vip_users_about_new_task(bot: Bot, task: Task) -> None:
                     f"Неизвестная ошибка при отправке пользователю {user.telegram_id}: {e}"
                 )
                 continue
+        await mark_users_unreachable(session, unreachable)
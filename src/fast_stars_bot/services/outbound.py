@@ -0,0 +1,153 @@
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+
+logger = logging.getLogger("bot.outbound")
+
+INTERACTIVE = 0
+BULK = 1
+
+GLOBAL_RATE = 30  # сообщений в секунду на весь бот
+BULK_CHAT_INTERVAL = 1.0  # сек между массовыми сообщениями в один чат
+MAX_RETRIES = 3
+
+# Методы, которые создают или меняют сообщения и попадают под лимиты Telegram
+LIMITED_PREFIXES = ("Send", "Copy", "Forward", "Edit")
+
+outbound_priority: ContextVar[int] = ContextVar(
+    "outbound_priority", default=INTERACTIVE
+)
+
+
+@contextmanager
+def bulk_traffic():
+    """
+    Все отправки внутри блока (и в созданных из него задачах) идут как массовые:
+    пропускают вперёд ответы пользователям и соблюдают лимит на чат.
+    """
+    token = outbound_priority.set(BULK)
+    try:
+        yield
+    finally:
+        outbound_priority.reset(token)
+
+
+def bulk_sender(func):
+    """
+    Декоратор для функций-рассылок: весь вызов выполняется в bulk_traffic().
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with bulk_traffic():
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """
+    Единая очередь исходящих запросов к Telegram: общий token bucket,
+    приоритеты, лимит на чат для рассылок и автоматический retry_after.
+    """
+
+    def __init__(
+        self,
+        rate: float = GLOBAL_RATE,
+        bulk_chat_interval: float = BULK_CHAT_INTERVAL,
+        max_retries: int = MAX_RETRIES,
+    ) -> None:
+        self.rate = rate
+        self.bulk_chat_interval = bulk_chat_interval
+        self.max_retries = max_retries
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: asyncio.Task | None = None
+        self._chat_next: dict[int | str, float] = {}
+
+    async def __call__(self, make_request, bot: Bot, method: TelegramMethod):
+        if not type(method).__name__.startswith(LIMITED_PREFIXES):
+            return await make_request(bot, method)
+
+        priority = outbound_priority.get()
+        chat_id = getattr(method, "chat_id", None)
+        for attempt in range(self.max_retries + 1):
+            if priority == BULK and chat_id is not None:
+                await self._wait_for_chat(chat_id)
+            await self._acquire(priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(
+                    f"flood wait {e.retry_after}s on {type(method).__name__} "
+                    f"(chat {chat_id}, attempt {attempt + 1})"
+                )
+                # Придерживаем всю очередь, а не только этот запрос
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + e.retry_after
+                )
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            float(self.rate), self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def _delay(self) -> float:
+        now = time.monotonic()
+        if self._paused_until > now:
+            return self._paused_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def _acquire(self, priority: int) -> None:
+        if not self._waiters and self._delay() == 0:
+            self._tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            delay = self._delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():  # ожидающий отменён
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+    async def _wait_for_chat(self, chat_id: int | str) -> None:
+        now = time.monotonic()
+        if len(self._chat_next) > 10000:
+            self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
+        slot = max(now, self._chat_next.get(chat_id, 0.0))
+        self._chat_next[chat_id] = slot + self.bulk_chat_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+outbound_scheduler = OutboundScheduler()
@@ -0,0 +1,30 @@
+import logging
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from db.session import SessionLocal
+from pytz import timezone
+from utils.referral_requests import reconcile_referral_stats
+
+logger = logging.getLogger("bot.referral_stats")
+
+scheduler = AsyncIOScheduler()
+kyiv_tz = timezone("Europe/Kyiv")
+
+
+def setup_referral_stats_reconciliation() -> None:
+    # Сразу после полуночи: у всех рефералов сменилось число дней с регистрации
+    scheduler.add_job(
+        reconcile_referral_stats_job,
+        CronTrigger(hour=0, minute=5, timezone=kyiv_tz),
+    )
+    scheduler.start()
+
+
+async def reconcile_referral_stats_job() -> None:
+    try:
+        async with SessionLocal() as session:
+            rows, drifted = await reconcile_referral_stats(session)
+        logger.info(f"referral stats reconciled: {rows} rows, {drifted} drifted")
+    except Exception as e:
+        print(f"[Referral Stats Error] {e}")
@@ -10,7 +10,9 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from db.session import SessionLocal
 from pytz import timezone
+from services.outbound import bulk_sender
 from utils.daily_bonus_requests import get_last_claim
+from utils.user_requests import mark_users_unreachable
 from utils.vip_requests import get_all_vip_users
 
 scheduler = AsyncIOScheduler()
@@ -26,9 +28,11 @@ def setup_daily_reminders(bot: Bot) -> None:
     scheduler.start()
 
 
+@bulk_sender
 async def send_daily_reminders(bot: Bot) -> None:
     async with SessionLocal() as session:
-        vip_users = await get_all_vip_users(session)
+        vip_users = await get_all_vip_users(session, reachable_only=True)
+        unreachable = []
         for user in vip_users:
             last_claim = await get_last_claim(session, user.id)
             if not last_claim or last_claim.claim_date != date.today():
@@ -38,9 +42,11 @@ async def send_daily_reminders(bot: Bot) -> None:
                         "🎁 Не забудь забрать двойной бонус дня! Он уже ждёт тебя в меню.",
                     )
                 except TelegramForbiddenError:
+                    unreachable.append(user.telegram_id)
                     print(f"Бот заблокирован пользователем {user.telegram_id}.")
                     continue
                 except TelegramNotFound:
+                    unreachable.append(user.telegram_id)
                     print(f"Чат с пользователем {user.telegram_id} не найден.")
                     continue
                 except TelegramBadRequest as e:
@@ -51,3 +57,4 @@ async def send_daily_reminders(bot: Bot) -> None:
                         f"Неизвестная ошибка при отправке пользователю {user.telegram_id}: {e}"
                     )
                     continue
+        await mark_users_unreachable(session, unreachable)
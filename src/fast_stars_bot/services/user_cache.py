@@ -0,0 +1,107 @@
+import logging
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+
+from db.models.user import User
+from services.redis_client import redis_client
+
+logger = logging.getLogger("bot.cache")
+
+PROFILE_KEY = "user_profile:{telegram_id}"
+PROFILE_TTL = 300  # сек
+STATS_LOG_EVERY = 1000
+
+profile_cache_stats = {"hits": 0, "misses": 0}
+
+
+@dataclass
+class UserProfile:
+    id: int
+    telegram_id: int
+    username: str | None
+    stars: Decimal
+    reg_date: date
+    is_banned: bool
+    is_admin: bool
+    vip_until: date | None = None
+    is_unreachable: bool = False
+
+    @classmethod
+    def from_user(cls, user: User, vip_until: date | None) -> "UserProfile":
+        return cls(
+            id=user.id,
+            telegram_id=user.telegram_id,
+            username=user.username,
+            stars=user.stars,
+            reg_date=user.reg_date,
+            is_banned=user.is_banned,
+            is_admin=user.is_admin,
+            vip_until=vip_until,
+            is_unreachable=user.unreachable_since is not None,
+        )
+
+    def to_hash(self) -> dict[str, str]:
+        return {
+            "id": str(self.id),
+            "telegram_id": str(self.telegram_id),
+            "username": self.username or "",
+            "stars": str(self.stars),
+            "reg_date": self.reg_date.isoformat(),
+            "is_banned": "1" if self.is_banned else "0",
+            "is_admin": "1" if self.is_admin else "0",
+            "vip_until": self.vip_until.isoformat() if self.vip_until else "",
+            "is_unreachable": "1" if self.is_unreachable else "0",
+        }
+
+    @classmethod
+    def from_hash(cls, data: dict[str, str]) -> "UserProfile":
+        return cls(
+            id=int(data["id"]),
+            telegram_id=int(data["telegram_id"]),
+            username=data["username"] or None,
+            stars=Decimal(data["stars"]),
+            reg_date=date.fromisoformat(data["reg_date"]),
+            is_banned=data["is_banned"] == "1",
+            is_admin=data["is_admin"] == "1",
+            vip_until=(
+                date.fromisoformat(data["vip_until"]) if data["vip_until"] else None
+            ),
+            is_unreachable=data.get("is_unreachable") == "1",
+        )
+
+
+def _count(outcome: str) -> None:
+    profile_cache_stats[outcome] += 1
+    total = profile_cache_stats["hits"] + profile_cache_stats["misses"]
+    if total % STATS_LOG_EVERY == 0:
+        logger.info(
+            f"user profile cache: {profile_cache_stats['hits']} hits, "
+            f"{profile_cache_stats['misses']} misses "
+            f"({profile_cache_stats['hits'] / total:.1%} hit rate)"
+        )
+
+
+async def get_cached_user_profile(telegram_id: int) -> UserProfile | None:
+    data = await redis_client.hgetall(PROFILE_KEY.format(telegram_id=telegram_id))
+    if not data:
+        _count("misses")
+        return None
+    _count("hits")
+    return UserProfile.from_hash(data)
+
+
+async def cache_user_profile(profile: UserProfile) -> None:
+    key = PROFILE_KEY.format(telegram_id=profile.telegram_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping=profile.to_hash())
+        pipe.expire(key, PROFILE_TTL)
+        await pipe.execute()
+
+
+async def invalidate_user_profile(*telegram_ids: int) -> None:
+    if not telegram_ids:
+        return
+    await redis_client.delete(
+        *(PROFILE_KEY.format(telegram_id=tid) for tid in telegram_ids)
+    )
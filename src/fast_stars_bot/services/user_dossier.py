@@ -0,0 +1,80 @@
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from decimal import Decimal
+
+from services.redis_client import redis_client
+
+DOSSIER_KEY = "user_dossier:{user_id}"
+DOSSIER_TTL = 60  # сек — хватает на рассылку заявки всем админам и их клики
+
+
+@dataclass
+class ReferralRef:
+    username: str | None
+    telegram_id: int
+    reg_date: date | None = None
+
+
+@dataclass
+class UserDossier:
+    """
+    Всё, что показывают карточки пользователя и заявки на вывод, кроме
+    полей самого пользователя (баланс, бан и т.п. берутся из User).
+    """
+
+    is_vip: bool
+    bonus_claim_percent: int
+    task_completion_percent: int
+    referral_stats: dict
+    approved_count: int
+    rejected_count: int
+    total_withdrawn: Decimal
+    last_referrals: list[ReferralRef] = field(default_factory=list)
+    referrer: ReferralRef | None = None
+
+    @property
+    def has_withdrawals(self) -> bool:
+        return self.approved_count + self.rejected_count > 0
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), default=str)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "UserDossier":
+        data = json.loads(raw)
+        referrer = data["referrer"]
+        return cls(
+            is_vip=data["is_vip"],
+            bonus_claim_percent=data["bonus_claim_percent"],
+            task_completion_percent=data["task_completion_percent"],
+            referral_stats=data["referral_stats"],
+            approved_count=data["approved_count"],
+            rejected_count=data["rejected_count"],
+            total_withdrawn=Decimal(data["total_withdrawn"]),
+            last_referrals=[
+                ReferralRef(
+                    username=r["username"],
+                    telegram_id=r["telegram_id"],
+                    reg_date=date.fromisoformat(r["reg_date"]),
+                )
+                for r in data["last_referrals"]
+            ],
+            referrer=ReferralRef(**referrer) if referrer else None,
+        )
+
+
+async def get_cached_dossier(user_id: int) -> UserDossier | None:
+    raw = await redis_client.get(DOSSIER_KEY.format(user_id=user_id))
+    return UserDossier.from_json(raw) if raw else None
+
+
+async def cache_dossier(user_id: int, dossier: UserDossier) -> None:
+    await redis_client.set(
+        DOSSIER_KEY.format(user_id=user_id), dossier.to_json(), ex=DOSSIER_TTL
+    )
+
+
+async def invalidate_dossier(*user_ids: int) -> None:
+    if user_ids:
+        await redis_client.delete(*(DOSSIER_KEY.format(user_id=u) for u in user_ids))
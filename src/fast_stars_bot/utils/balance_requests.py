@@ -0,0 +1,63 @@
+from decimal import Decimal
+from typing import NamedTuple
+
+from db.models.balance_ledger import BalanceLedger, LedgerReason
+from db.models.user import User
+from sqlalchemy import Integer, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+
+class Balance(NamedTuple):
+    stars: Decimal
+    telegram_id: int
+
+
+async def change_balance(
+    session: AsyncSession,
+    user_id: int,
+    delta: Decimal,
+    reason: LedgerReason,
+    *,
+    min_balance: Decimal | None = None,
+    ref_id: int | None = None,
+) -> Balance | None:
+    """
+    Меняет баланс одним UPDATE ... RETURNING, без чтения пользователя и без
+    потерянных обновлений при параллельных изменениях. С min_balance изменение
+    проходит, только если на счету не меньше min_balance, иначе вернёт None.
+    Строка журнала balance_ledger пишется тем же запросом. Коммит — за вызывающим.
+    """
+    updated = update(User).where(User.id == user_id)
+    if min_balance is not None:
+        updated = updated.where(User.stars >= min_balance)
+    updated = (
+        updated.values(stars=User.stars + delta)
+        .returning(User.id, User.stars, User.telegram_id)
+        .cte("updated")
+    )
+    ledger = (
+        insert(BalanceLedger)
+        .from_select(
+            ["user_id", "delta", "balance_after", "reason", "ref_id"],
+            select(
+                updated.c.id,
+                literal(delta, BalanceLedger.delta.type),
+                updated.c.stars,
+                literal(reason, BalanceLedger.reason.type),
+                literal(ref_id, Integer),
+            ),
+        )
+        .cte("ledger")
+    )
+    stmt = select(updated.c.stars, updated.c.telegram_id).add_cte(ledger)
+
+    row = (await session.execute(stmt)).first()
+    if row is None:
+        return None
+
+    # Загруженный в сессию User видит новый баланс, не становясь «грязным»
+    user = session.sync_session.identity_map.get(session.identity_key(User, user_id))
+    if user is not None:
+        set_committed_value(user, "stars", row.stars)
+    return Balance(row.stars, row.telegram_id)
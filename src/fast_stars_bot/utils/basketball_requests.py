@@ -1,9 +1,12 @@
 from decimal import Decimal
 
+from db.models.balance_ledger import LedgerReason
 from db.models.basketball_log import BasketballLog
 from db.models.user import User
+from services.user_cache import invalidate_user_profile
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
 
 
 async def log_basketball_game(
@@ -12,8 +15,12 @@ async def log_basketball_game(
     log = BasketballLog(user_id=user.id, bet=bet, result=result)
     session.add(log)
     if result:
-        user.stars += bet * multiplier
+        await change_balance(
+            session, user.id, bet * multiplier, LedgerReason.BASKETBALL
+        )
     await session.commit()
+    if result:
+        await invalidate_user_profile(user.telegram_id)
 
 
 async def get_basketball_stats(
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+
+from db.models.broadcast_job import BroadcastJob, BroadcastStatus
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def create_broadcast_job(
+    session: AsyncSession, audience: str, payload: dict, send_at: datetime
+) -> BroadcastJob:
+    job = BroadcastJob(audience=audience, payload=payload, send_at=send_at)
+    session.add(job)
+    await session.commit()
+    return job
+
+
+async def get_broadcast_job(session: AsyncSession, job_id: int) -> BroadcastJob | None:
+    return await session.get(BroadcastJob, job_id)
+
+
+async def get_unfinished_broadcast_jobs(session: AsyncSession) -> list[BroadcastJob]:
+    result = await session.execute(
+        select(BroadcastJob)
+        .where(BroadcastJob.status != BroadcastStatus.FINISHED)
+        .order_by(BroadcastJob.send_at)
+    )
+    return result.scalars().all()
+
+
+async def get_recent_broadcast_jobs(
+    session: AsyncSession, limit: int = 10
+) -> list[BroadcastJob]:
+    result = await session.execute(
+        select(BroadcastJob).order_by(BroadcastJob.id.desc()).limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def start_broadcast_job(session: AsyncSession, job_id: int, total: int) -> None:
+    await session.execute(
+        update(BroadcastJob)
+        .where(BroadcastJob.id == job_id)
+        .values(status=BroadcastStatus.RUNNING, total=total)
+    )
+    await session.commit()
+
+
+async def claim_broadcast_job(
+    session: AsyncSession, job_id: int, owner: str, lease: timedelta
+) -> bool:
+    """
+    Забирает незавершённую рассылку, если её никто не ведёт или аренда
+    прошлого владельца истекла. Из нескольких процессов выиграет один.
+    """
+    result = await session.execute(
+        update(BroadcastJob)
+        .where(
+            BroadcastJob.id == job_id,
+            BroadcastJob.status != BroadcastStatus.FINISHED,
+            or_(BroadcastJob.owner.is_(None), BroadcastJob.lease_until < func.now()),
+        )
+        .values(owner=owner, lease_until=func.now() + lease)
+        .returning(BroadcastJob.id)
+    )
+    await session.commit()
+    return result.scalar_one_or_none() is not None
+
+
+async def save_broadcast_checkpoint(
+    session: AsyncSession,
+    job_id: int,
+    last_user_id: int,
+    sent: int,
+    failed: int,
+    owner: str,
+    lease: timedelta,
+) -> bool:
+    """
+    Сохраняет чекпоинт и продлевает аренду. False — рассылку уже ведёт
+    другой процесс.
+    """
+    result = await session.execute(
+        update(BroadcastJob)
+        .where(BroadcastJob.id == job_id, BroadcastJob.owner == owner)
+        .values(
+            last_user_id=last_user_id,
+            sent=sent,
+            failed=failed,
+            lease_until=func.now() + lease,
+        )
+        .returning(BroadcastJob.id)
+    )
+    await session.commit()
+    return result.scalar_one_or_none() is not None
+
+
+async def finish_broadcast_job(
+    session: AsyncSession, job_id: int, sent: int, failed: int
+) -> None:
+    await session.execute(
+        update(BroadcastJob)
+        .where(BroadcastJob.id == job_id)
+        .values(
+            status=BroadcastStatus.FINISHED,
+            sent=sent,
+            failed=failed,
+            finished_at=datetime.now(timezone.utc),
+            owner=None,
+            lease_until=None,
+        )
+    )
+    await session.commit()
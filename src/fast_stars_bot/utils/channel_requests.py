@@ -21,17 +21,29 @@ async def add_channel(
     username: str,
     link: str,
     requires_subscription: bool,
+    chat_id: int | None = None,
 ) -> None:
     new_channel = Channel(
         name=name,
         username=username,
         link=link,
         requires_subscription=requires_subscription,
+        chat_id=chat_id,
     )
     session.add(new_channel)
     await session.commit()
 
 
+async def update_channel_chat_ids(
+    session: AsyncSession, chat_ids: dict[int, int]
+) -> None:
+    for channel_id, chat_id in chat_ids.items():
+        channel = await session.get(Channel, channel_id)
+        if channel:
+            channel.chat_id = chat_id
+    await session.commit()
+
+
 async def delete_channel(session: AsyncSession, channel_id: int) -> None:
     channel = await session.get(Channel, channel_id)
     if channel:
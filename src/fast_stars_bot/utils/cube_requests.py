@@ -1,41 +1,80 @@
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 
+from db.models.balance_ledger import LedgerReason
 from db.models.cube_game import CubeGame, GameStatus
 from db.models.user import User
+from services.active_players import track_game, untrack_players
+from services.user_cache import invalidate_user_profile
 from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
 from utils.game_settings_requests import get_game_setting
 from utils.user_requests import get_user_by_id
 
 
-async def find_waiting_game(session: AsyncSession, bet: Decimal) -> CubeGame | None:
+async def match_cube_game(
+    session: AsyncSession, player: User, bet: Decimal
+) -> CubeGame | None:
+    """
+    Сажает игрока за стол одной транзакцией: занимает чужую ожидающую игру
+    или создаёт новую и тем же коммитом списывает ставку. Возвращает None,
+    если игрок уже сидит за столом; ValueError — если звёзд не хватает.
+    """
+    # Блокировка строки игрока сериализует его повторные нажатия
+    await session.execute(select(User.id).where(User.id == player.id).with_for_update())
+
+    if await get_active_game_by_user(session, player.id):
+        await session.rollback()
+        return None
+
+    # SKIP LOCKED: параллельные игроки разбирают разные ожидающие игры,
+    # а не ждут и не занимают одну и ту же
     result = await session.execute(
         select(CubeGame)
-        .where(CubeGame.status == GameStatus.WAITING, CubeGame.bet == bet)
+        .where(
+            CubeGame.status == GameStatus.WAITING,
+            CubeGame.bet == bet,
+            CubeGame.player2_id.is_(None),
+            CubeGame.player1_id != player.id,
+        )
+        .order_by(CubeGame.id)
         .limit(1)
+        .with_for_update(skip_locked=True)
     )
-    return result.scalars().first()
-
+    game = result.scalars().first()
 
-async def create_game(session: AsyncSession, player1: User, bet: Decimal) -> CubeGame:
-    game = CubeGame(
-        player1_id=player1.id,
-        bet=bet,
-        status=GameStatus.WAITING,
-        created_at=datetime.now(),
+    if game:
+        game.player2_id = player.id
+        game.status = GameStatus.IN_PROGRESS
+    else:
+        game = CubeGame(
+            player1_id=player.id,
+            bet=bet,
+            status=GameStatus.WAITING,
+            created_at=datetime.now(),
+        )
+        session.add(game)
+        await session.flush()
+
+    # Ставка резервируется при входе за стол: проверка баланса и списание —
+    # один UPDATE, поэтому проигрыш уже не уведёт баланс в минус
+    balance = await change_balance(
+        session,
+        player.id,
+        -bet,
+        LedgerReason.CUBE_GAME,
+        min_balance=bet,
+        ref_id=game.id,
     )
-    session.add(game)
-    await session.commit()
-    await session.refresh(game)
-    return game
-
+    if balance is None:
+        await session.rollback()
+        raise ValueError("Insufficient stars for the bet.")
 
-async def join_game(session: AsyncSession, game: CubeGame, player2: User) -> CubeGame:
-    game.player2_id = player2.id
-    game.status = GameStatus.IN_PROGRESS
     await session.commit()
     await session.refresh(game)
+    await track_game(game)
+    await invalidate_user_profile(balance.telegram_id)
     return game
 
 
@@ -45,7 +84,7 @@ async def finish_game(
     player1 = await get_user_by_id(session, game.player1_id)
     player2 = await get_user_by_id(session, game.player2_id)
 
-    winner, loser = (player1, player2) if p1_result > p2_result else (player2, player1)
+    winner = player1 if p1_result > p2_result else player2
 
     commission = await get_game_setting(session, "cube_commission")
     if commission is None:
@@ -56,19 +95,34 @@ async def finish_game(
 
     win_amount = game.bet * multiplier
 
-    winner.stars += win_amount
-    loser.stars -= game.bet
+    # Обе ставки списаны в match_cube_game: победителю возвращается его ставка
+    # и выигрыш, ставка проигравшего уже удержана
+    await change_balance(
+        session,
+        winner.id,
+        game.bet + win_amount,
+        LedgerReason.CUBE_GAME,
+        ref_id=game.id,
+    )
 
     game.winner_id = winner.id
     game.status = GameStatus.FINISHED
 
     await session.commit()
+    await track_game(game)
+    await invalidate_user_profile(player1.telegram_id, player2.telegram_id)
     return winner
 
 
 async def cancel_game(session: AsyncSession, game: CubeGame) -> None:
+    # Со стола уходит только ожидающий игрок — возвращаем его ставку
+    balance = await change_balance(
+        session, game.player1_id, game.bet, LedgerReason.CUBE_GAME, ref_id=game.id
+    )
     game.status = GameStatus.CANCELED
     await session.commit()
+    await track_game(game)
+    await invalidate_user_profile(balance.telegram_id)
 
 
 async def get_game_by_id(session: AsyncSession, game_id: int) -> CubeGame | None:
@@ -86,24 +140,28 @@ async def get_active_game_by_user(session: AsyncSession, user_id: int):
     return result.scalars().first()
 
 
-async def get_waiting_count(session, bet: Decimal) -> int:
-    result = await session.execute(
-        select(CubeGame).where(
-            CubeGame.status == GameStatus.WAITING, CubeGame.bet == bet
-        )
-    )
-    players = result.scalars().all()
-    return len(players) or 0
-
-
-async def get_active_count(session, bet: Decimal) -> int:
+async def get_lobby_counts(
+    session: AsyncSession, bets: tuple[Decimal, ...]
+) -> dict[Decimal, tuple[int, int]]:
+    """
+    Для каждой ставки: (ожидающих игроков, играющих игроков) — одним запросом.
+    """
     result = await session.execute(
-        select(CubeGame).where(
-            CubeGame.status == GameStatus.IN_PROGRESS, CubeGame.bet == bet
+        select(CubeGame.status, CubeGame.bet, func.count(CubeGame.id))
+        .where(
+            CubeGame.status.in_([GameStatus.WAITING, GameStatus.IN_PROGRESS]),
+            CubeGame.bet.in_(bets),
         )
+        .group_by(CubeGame.status, CubeGame.bet)
     )
-    games = result.scalars().all()
-    return len(games) * 2 or 0
+    counts = {bet: (0, 0) for bet in bets}
+    for status, bet, games in result.all():
+        waiting, active = counts[bet]
+        if status == GameStatus.WAITING:
+            counts[bet] = (waiting + games, active)
+        else:
+            counts[bet] = (waiting, active + games * 2)
+    return counts
 
 
 async def get_cube_game_stats(
@@ -137,7 +195,7 @@ async def delete_old_canceled_games(session: AsyncSession) -> None:
 
 
 async def handle_throw_timeout(
-    session: AsyncSession, game_id: int, user_id: int, bet: Decimal
+    session: AsyncSession, game_id: int, user_id: int
 ) -> tuple[User, User, CubeGame | None]:
     game = await get_game_by_id(session, game_id)
     if not game or game.status != GameStatus.IN_PROGRESS:
@@ -147,18 +205,18 @@ async def handle_throw_timeout(
     if not leaver:
         return None, None, None
 
-    if leaver.stars >= bet:
-        leaver.stars -= bet
-
+    # Ставка ушедшего удержана ещё при входе за стол, ставка оставшегося
+    # остаётся в игре, пока он ждёт нового соперника
     other_player_id = game.player2_id if game.player1_id == user_id else game.player1_id
     other_player = await get_user_by_id(session, other_player_id)
 
-    if game.player1_id == user_id:
-        game.player1_id = game.player2_id
-    else:
-        game.player2_id = None
-
+    # Оставшийся игрок снова ждёт соперника: второе место должно освободиться,
+    # иначе ожидающую игру не найдёт match_cube_game
+    game.player1_id = other_player_id
+    game.player2_id = None
     game.status = GameStatus.WAITING
     await session.commit()
+    await untrack_players(leaver.id)
+    await track_game(game)
 
     return leaver, other_player, game
@@ -1,10 +1,14 @@
 from datetime import date, timedelta
 from decimal import Decimal
 
+from db.models.balance_ledger import LedgerReason
 from db.models.daily_bonus_claim import DailyBonusClaim
 from db.models.user import User
+from services.user_cache import invalidate_user_profile
 from sqlalchemy import desc, distinct, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
+from utils.referral_requests import track_referral_bonus_claim
 from utils.vip_requests import is_user_vip
 
 MAX_BONUS_STREAK = 15
@@ -51,8 +55,10 @@ async def claim_daily_bonus(session: AsyncSession, user: User) -> Decimal:
         streak=streak,
     )
     session.add(claim)
-    user.stars += bonus_amount
+    await change_balance(session, user.id, bonus_amount, LedgerReason.DAILY_BONUS)
+    await track_referral_bonus_claim(session, user)
     await session.commit()
+    await invalidate_user_profile(user.telegram_id)
     return bonus_amount
 
 
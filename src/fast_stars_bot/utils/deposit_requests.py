@@ -1,9 +1,11 @@
 from decimal import Decimal
 
+from db.models.balance_ledger import LedgerReason
 from db.models.deposit import Deposit, DepositStatus
-from db.models.user import User
+from services.user_cache import invalidate_user_profile
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
 
 
 async def create_deposit(
@@ -46,10 +48,12 @@ async def confirm_deposit(
     if deposit:
         deposit.status = DepositStatus.CONFIRMED
 
-        user = await session.get(User, user_id)
-        user.stars += deposit.stars
+        balance = await change_balance(
+            session, user_id, deposit.stars, LedgerReason.DEPOSIT, ref_id=deposit.id
+        )
 
         await session.commit()
+        await invalidate_user_profile(balance.telegram_id)
     return deposit
 
 
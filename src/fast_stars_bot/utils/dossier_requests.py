@@ -0,0 +1,107 @@
+from datetime import date
+from decimal import Decimal
+
+from db.models.daily_bonus_claim import DailyBonusClaim
+from db.models.referral import Referral
+from db.models.task import Task, TaskCompletion
+from db.models.user import User
+from db.models.vip_subscription import VipSubscription
+from db.models.withdrawal import Withdrawal, WithdrawalStatus
+from services.user_dossier import (
+    ReferralRef,
+    UserDossier,
+    cache_dossier,
+    get_cached_dossier,
+)
+from sqlalchemy import exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.referral_requests import get_referral_stats, kyiv_today
+
+LAST_REFERRALS_LIMIT = 10
+
+
+def _count(model, *where):
+    return select(func.count()).select_from(model).where(*where).scalar_subquery()
+
+
+async def load_user_dossier(session: AsyncSession, user_id: int) -> UserDossier:
+    """
+    Досье за четыре запроса: сводка по пользователю, счётчики рефералов,
+    последние рефералы и пригласивший.
+    """
+    approved = (Withdrawal.user_id == user_id) & (
+        Withdrawal.status == WithdrawalStatus.APPROVED
+    )
+    result = await session.execute(
+        select(
+            User.reg_date,
+            exists().where(
+                VipSubscription.user_id == user_id,
+                VipSubscription.end_date >= date.today(),
+            ),
+            _count(DailyBonusClaim, DailyBonusClaim.user_id == user_id),
+            _count(TaskCompletion, TaskCompletion.user_id == user_id),
+            _count(Task),
+            _count(Withdrawal, approved),
+            _count(
+                Withdrawal,
+                Withdrawal.user_id == user_id,
+                Withdrawal.status == WithdrawalStatus.REJECTED,
+            ),
+            select(func.coalesce(func.sum(Withdrawal.stars), 0))
+            .where(approved)
+            .scalar_subquery(),
+        ).where(User.id == user_id)
+    )
+    (
+        reg_date,
+        is_vip,
+        claim_count,
+        completed,
+        total_tasks,
+        approved_count,
+        rejected_count,
+        total_withdrawn,
+    ) = result.one()
+
+    days_since_reg = (kyiv_today() - reg_date).days + 1 or 1
+    bonus_percent = round(min((claim_count / days_since_reg) * 100, 100))
+    task_percent = (
+        round(min((completed / total_tasks) * 100, 100)) if total_tasks else 0
+    )
+
+    result = await session.execute(
+        select(User.username, User.telegram_id, User.reg_date)
+        .join(Referral, Referral.referral_id == User.id)
+        .where(Referral.referrer_id == user_id)
+        .order_by(User.reg_date.desc())
+        .limit(LAST_REFERRALS_LIMIT)
+    )
+    last_referrals = [ReferralRef(*row) for row in result.all()]
+
+    result = await session.execute(
+        select(User.username, User.telegram_id)
+        .join(Referral, Referral.referrer_id == User.id)
+        .where(Referral.referral_id == user_id)
+    )
+    referrer = result.first()
+
+    return UserDossier(
+        is_vip=is_vip,
+        bonus_claim_percent=bonus_percent,
+        task_completion_percent=task_percent,
+        referral_stats=await get_referral_stats(session, user_id),
+        approved_count=approved_count,
+        rejected_count=rejected_count,
+        total_withdrawn=Decimal(total_withdrawn),
+        last_referrals=last_referrals,
+        referrer=ReferralRef(*referrer) if referrer else None,
+    )
+
+
+async def get_user_dossier(session: AsyncSession, user_id: int) -> UserDossier:
+    dossier = await get_cached_dossier(user_id)
+    if dossier is None:
+        dossier = await load_user_dossier(session, user_id)
+        await cache_dossier(user_id, dossier)
+    return dossier
@@ -1,9 +1,31 @@
 from datetime import datetime
 from decimal import Decimal
 
+from db.models.balance_ledger import BalanceLedger, LedgerReason
 from db.models.giveaway import Giveaway, GiveawayTicket
+from db.models.user import User
 from pytz import timezone
-from sqlalchemy import asc, case, delete, func, select
+from services.giveaway_counters import (
+    add_tickets,
+    drop_giveaway_counters,
+    fill_giveaway_counters,
+    read_giveaway_counters,
+    start_counters_fill,
+)
+from services.user_cache import invalidate_user_profile
+from sqlalchemy import (
+    Integer,
+    Numeric,
+    asc,
+    case,
+    column,
+    delete,
+    literal,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 kyiv_tz = timezone("Europe/Kyiv")
@@ -58,37 +80,57 @@ async def get_all_giveaways(session: AsyncSession) -> list[Giveaway]:
     return giveaways
 
 
-async def get_tickets_for_giveaway(
+async def get_ticket_counts(
     session: AsyncSession, giveaway_id: int
-) -> list[GiveawayTicket] | None:
+) -> tuple[list[int], list[int]]:
+    """
+    Возвращает (user_ids, counts) — только нужные для жеребьёвки колонки.
+    """
     result = await session.execute(
-        select(GiveawayTicket).where(GiveawayTicket.giveaway_id == giveaway_id)
+        select(GiveawayTicket.user_id, GiveawayTicket.count).where(
+            GiveawayTicket.giveaway_id == giveaway_id, GiveawayTicket.count > 0
+        )
     )
-    if result:
-        return result.scalars().all()
-    else:
-        return None
+    rows = result.all()
+    return [row.user_id for row in rows], [row.count for row in rows]
 
 
 async def buy_tickets_for_giveaway(
     session: AsyncSession, giveaway_id: int, user_id: int, amount: int
 ) -> None:
-    for t in range(amount):
-        session.add(GiveawayTicket(user_id=user_id, giveaway_id=giveaway_id))
+    stmt = insert(GiveawayTicket).values(
+        giveaway_id=giveaway_id, user_id=user_id, count=amount
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            constraint="uq_giveaway_tickets_user",
+            set_={"count": GiveawayTicket.count + stmt.excluded.count},
+        )
+    )
     await session.commit()
+    await add_tickets(giveaway_id, user_id, amount)
 
 
-async def get_tickets_per_user(
-    session: AsyncSession, giveaway_id: int, user_id: int
-) -> int:
-    result = await session.execute(
-        select(func.count())
-        .select_from(GiveawayTicket)
-        .where(
-            GiveawayTicket.giveaway_id == giveaway_id, GiveawayTicket.user_id == user_id
-        )
-    )
-    return result.scalar_one()
+async def get_giveaway_counters(
+    session: AsyncSession, giveaway_id: int, user_id: int | None = None
+) -> tuple[int, int, int]:
+    """
+    (всего билетов, участников, билетов у user_id) из Redis; при пустом кэше
+    один раз заполняет счётчики из БД.
+    """
+    counters = await read_giveaway_counters(giveaway_id, user_id)
+    if counters is not None:
+        return counters
+
+    token = await start_counters_fill(giveaway_id)
+    user_ids, counts = await get_ticket_counts(session, giveaway_id)
+    if await fill_giveaway_counters(giveaway_id, token, user_ids, counts):
+        return await read_giveaway_counters(giveaway_id, user_id)
+
+    # Параллельная покупка сбила заполнение — отвечаем прочитанным из БД,
+    # счётчики заполнит следующий запрос
+    tickets = dict(zip(user_ids, counts))
+    return sum(counts), len(user_ids), tickets.get(user_id, 0)
 
 
 async def get_giveaway_by_id(
@@ -131,9 +173,56 @@ async def delete_giveaway(session: AsyncSession, giveaway_id: int) -> None:
         )
         await session.execute(delete(Giveaway).where(Giveaway.id == giveaway_id))
         await session.commit()
-
-
-async def mark_giveaway_finished(session: AsyncSession, giveaway_id: int) -> None:
-    giveaway = await get_giveaway_by_id(session, giveaway_id)
-    giveaway.is_finished = True
+        await drop_giveaway_counters(giveaway_id)
+
+
+async def settle_giveaway(
+    session: AsyncSession, giveaway_id: int, rewards: dict[int, Decimal]
+) -> bool:
+    """
+    Завершает розыгрыш и начисляет призы одной транзакцией.
+    Возвращает False, если розыгрыш уже был завершён (повторный запуск задачи).
+    """
+    claimed = await session.execute(
+        update(Giveaway)
+        .where(Giveaway.id == giveaway_id, Giveaway.is_finished == False)
+        .values(is_finished=True)
+        .returning(Giveaway.id)
+    )
+    if claimed.scalar_one_or_none() is None:
+        await session.rollback()
+        return False
+
+    telegram_ids = []
+    if rewards:
+        reward_values = values(
+            column("user_id", Integer), column("reward", Numeric), name="rewards"
+        ).data(list(rewards.items()))
+        credited = (
+            update(User)
+            .where(User.id == reward_values.c.user_id)
+            .values(stars=User.stars + reward_values.c.reward)
+            .returning(User.id, User.stars, User.telegram_id, reward_values.c.reward)
+            .cte("credited")
+        )
+        # Строки журнала для всех победителей — тем же запросом
+        ledger = (
+            insert(BalanceLedger)
+            .from_select(
+                ["user_id", "delta", "balance_after", "reason", "ref_id"],
+                select(
+                    credited.c.id,
+                    credited.c.reward,
+                    credited.c.stars,
+                    literal(LedgerReason.GIVEAWAY, BalanceLedger.reason.type),
+                    literal(giveaway_id, Integer),
+                ),
+            )
+            .cte("ledger")
+        )
+        result = await session.execute(select(credited.c.telegram_id).add_cte(ledger))
+        telegram_ids = result.scalars().all()
     await session.commit()
+    await invalidate_user_profile(*telegram_ids)
+    await drop_giveaway_counters(giveaway_id)
+    return True
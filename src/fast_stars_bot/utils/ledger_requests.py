@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from db.models.balance_ledger import BalanceLedger, BalanceSnapshot
+from db.models.user import User
+from sqlalchemy import func, insert, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+LEDGER_MONTHS_AHEAD = 2  # секции создаются заранее, чтобы вставка не упала
+SNAPSHOT_LAG = timedelta(minutes=5)  # не снимаем то, что ещё может коммититься
+
+
+def _add_months(month: date, months: int) -> date:
+    year, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + year, index + 1, 1)
+
+
+async def ensure_ledger_partitions(
+    session: AsyncSession, months_ahead: int = LEDGER_MONTHS_AHEAD
+) -> None:
+    """
+    Создаёт месячные секции balance_ledger на текущий и следующие месяцы.
+    """
+    month = datetime.now(timezone.utc).date().replace(day=1)
+    for offset in range(months_ahead + 1):
+        start = _add_months(month, offset)
+        end = _add_months(start, 1)
+        await session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS balance_ledger_{start:%Y_%m} "
+                "PARTITION OF balance_ledger "
+                f"FOR VALUES FROM ('{start} 00:00+00') TO ('{end} 00:00+00')"
+            )
+        )
+    await session.commit()
+
+
+async def take_balance_snapshots(session: AsyncSession) -> int:
+    """
+    Снимок баланса для каждого, у кого были движения после прошлого снимка:
+    прошлый снимок + сумма журнала за интервал. Возвращает число снимков.
+    """
+    cutoff = datetime.now(timezone.utc) - SNAPSHOT_LAG
+    watermark = await session.scalar(select(func.max(BalanceSnapshot.taken_at)))
+
+    movements = select(
+        BalanceLedger.user_id, func.sum(BalanceLedger.delta).label("delta")
+    ).where(BalanceLedger.created_at <= cutoff)
+    if watermark is not None:
+        movements = movements.where(BalanceLedger.created_at > watermark)
+    movements = movements.group_by(BalanceLedger.user_id).subquery()
+
+    previous = (
+        select(BalanceSnapshot.stars)
+        .where(BalanceSnapshot.user_id == movements.c.user_id)
+        .order_by(BalanceSnapshot.taken_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        insert(BalanceSnapshot).from_select(
+            ["user_id", "taken_at", "stars"],
+            select(
+                movements.c.user_id,
+                literal(cutoff, BalanceSnapshot.taken_at.type),
+                func.coalesce(previous, 0) + movements.c.delta,
+            ),
+        )
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def get_ledger_balance(
+    session: AsyncSession, user_id: int, at: datetime | None = None
+) -> Decimal:
+    """
+    Баланс по журналу на момент at (по умолчанию — сейчас): ближайший снимок
+    плюс строки журнала после него, без просмотра всей истории.
+    """
+    snapshot_query = select(BalanceSnapshot.stars, BalanceSnapshot.taken_at).where(
+        BalanceSnapshot.user_id == user_id
+    )
+    if at is not None:
+        snapshot_query = snapshot_query.where(BalanceSnapshot.taken_at <= at)
+    snapshot = (
+        await session.execute(
+            snapshot_query.order_by(BalanceSnapshot.taken_at.desc()).limit(1)
+        )
+    ).first()
+
+    movements = select(func.coalesce(func.sum(BalanceLedger.delta), 0)).where(
+        BalanceLedger.user_id == user_id
+    )
+    if snapshot is not None:
+        movements = movements.where(BalanceLedger.created_at > snapshot.taken_at)
+    if at is not None:
+        movements = movements.where(BalanceLedger.created_at <= at)
+
+    base = snapshot.stars if snapshot is not None else Decimal(0)
+    return base + await session.scalar(movements)
+
+
+async def verify_user_balance(
+    session: AsyncSession, user_id: int
+) -> tuple[Decimal, Decimal]:
+    """
+    (баланс по журналу, баланс в users) — расхождение означает изменение
+    баланса в обход change_balance.
+    """
+    expected = await get_ledger_balance(session, user_id)
+    actual = await session.scalar(select(User.stars).where(User.id == user_id))
+    return expected, actual
@@ -1,12 +1,15 @@
 from decimal import Decimal
 
 from aiogram import Bot
+from db.models.balance_ledger import LedgerReason
 from db.models.promo_code import PromoActivation, PromoCode
 from db.models.user import User
 from services.redis_client import redis_client
+from services.user_cache import invalidate_user_profile
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from utils.balance_requests import change_balance
 from utils.user_requests import ban_user, get_all_admins, get_user_by_telegram_id
 
 # Redis config
@@ -87,9 +90,12 @@ async def activate_promo(
 
         # Активируем
         promo.activations_left -= 1
-        user.stars += promo.reward
+        await change_balance(
+            session, user.id, promo.reward, LedgerReason.PROMO, ref_id=promo.id
+        )
         session.add(PromoActivation(user_id=user.id, promo_code_id=promo.id))
         await session.commit()
+        await invalidate_user_profile(user.telegram_id)
 
         await redis_client.set(key, "1", ex=86400)
         return True, None, promo.reward
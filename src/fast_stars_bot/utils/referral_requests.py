@@ -1,11 +1,25 @@
-from datetime import date
+from datetime import date, datetime, timezone
+from decimal import Decimal
 
+import pytz
+from db.models.balance_ledger import LedgerReason
 from db.models.daily_bonus_claim import DailyBonusClaim
 from db.models.referral import Referral
+from db.models.referral_stats import ReferralStats
 from db.models.task import Task, TaskCompletion
 from db.models.user import User
-from sqlalchemy import distinct, func, select
+from services.user_cache import invalidate_user_profile
+from sqlalchemy import Date, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
+
+kyiv_tz = pytz.timezone("Europe/Kyiv")
+
+
+def kyiv_today() -> date:
+    # Дни с регистрации считаем по Киеву — как ночная сверка и весь бот
+    return datetime.now(kyiv_tz).date()
 
 
 async def create_referral(
@@ -13,6 +27,16 @@ async def create_referral(
 ) -> None:
     referral = Referral(referral_id=referral_id, referrer_id=referrer_id)
     session.add(referral)
+    await session.execute(
+        update(ReferralStats)
+        .where(ReferralStats.user_id == referrer_id)
+        .values(referral_count=ReferralStats.referral_count + 1)
+    )
+    await session.execute(
+        update(ReferralStats)
+        .where(ReferralStats.user_id == _referrer_of(referrer_id))
+        .values(nested_referrals=ReferralStats.nested_referrals + 1)
+    )
     await session.commit()
 
 
@@ -24,8 +48,9 @@ async def has_referral(session: AsyncSession, referral_id: int) -> bool:
 
 
 async def reward_for_referral(session: AsyncSession, user: User) -> None:
-    user.stars += 4
+    await change_balance(session, user.id, Decimal(4), LedgerReason.REFERRAL)
     await session.commit()
+    await invalidate_user_profile(user.telegram_id)
 
 
 async def get_referral_count(session: AsyncSession, user_id: int) -> int:
@@ -64,92 +89,211 @@ async def get_referrals_page(
     return result.scalars().all()
 
 
-async def get_nested_referral_count(
-    session: AsyncSession, referral_ids: list[int]
-) -> int:
-    if not referral_ids:
-        return 0
-    result = await session.execute(
-        select(func.count())
-        .select_from(Referral)
-        .where(Referral.referrer_id.in_(referral_ids))
+STATS_FIELDS = (
+    "referral_count",
+    "nested_referrals",
+    "banned_count",
+    "bonus_percent_sum",
+    "task_percent_sum",
+)
+UPSERT_CHUNK = 1000
+
+
+def _referral_ids(referrer_id: int):
+    return (
+        select(Referral.referral_id)
+        .where(Referral.referrer_id == referrer_id)
+        .scalar_subquery()
     )
-    return result.scalar_one()
 
 
-async def get_bonus_claim_percent(
-    session: AsyncSession, referral_ids: list[int]
-) -> int:
-    if not referral_ids:
-        return 0
+def _task_percent(completed):
+    total_tasks = select(func.count()).select_from(Task).scalar_subquery()
+    # Без заданий — 0%: least() пропускает NULL и без coalesce вернул бы 100
+    return func.least(
+        func.coalesce(completed * 100.0 / func.nullif(total_tasks, 0), 0), 100
+    )
 
-    total_percent = 0
-    counted = 0
 
-    for referral_id in referral_ids:
-        user_data = await session.execute(
-            select(User.reg_date).where(User.id == referral_id)
-        )
-        reg_date = user_data.scalar_one_or_none()
-        if not reg_date:
-            continue
+def _referrer_of(user_id: int):
+    return (
+        select(Referral.referrer_id)
+        .where(Referral.referral_id == user_id)
+        .scalar_subquery()
+    )
 
-        days_since_reg = (date.today() - reg_date).days + 1 or 1
 
-        claim_count_result = await session.execute(
-            select(func.count()).where(DailyBonusClaim.user_id == referral_id)
+async def compute_referral_stats(
+    session: AsyncSession, referrer_id: int | None = None
+) -> dict[int, dict]:
+    """
+    Счётчики рефералов, посчитанные с нуля одним запросом: для одного
+    пользователя или для всех, у кого есть рефералы.
+    """
+    claims = select(DailyBonusClaim.user_id, func.count().label("claims"))
+    completions = select(TaskCompletion.user_id, func.count().label("completed"))
+    children = select(Referral.referrer_id.label("user_id"), func.count().label("n"))
+    if referrer_id is not None:
+        ids = _referral_ids(referrer_id)
+        claims = claims.where(DailyBonusClaim.user_id.in_(ids))
+        completions = completions.where(TaskCompletion.user_id.in_(ids))
+        children = children.where(Referral.referrer_id.in_(ids))
+    claims = claims.group_by(DailyBonusClaim.user_id).subquery()
+    completions = completions.group_by(TaskCompletion.user_id).subquery()
+    children = children.group_by(Referral.referrer_id).subquery()
+
+    days = func.greatest(literal(kyiv_today(), Date) - User.reg_date + 1, 1)
+    bonus_percent = func.least(func.coalesce(claims.c.claims, 0) * 100.0 / days, 100)
+    task_percent = _task_percent(func.coalesce(completions.c.completed, 0))
+
+    stmt = (
+        select(
+            Referral.referrer_id,
+            func.count(),
+            func.coalesce(func.sum(children.c.n), 0),
+            func.count().filter(User.is_banned.is_(True)),
+            func.coalesce(func.sum(bonus_percent), 0),
+            func.coalesce(func.sum(task_percent), 0),
+        )
+        .select_from(Referral)
+        .join(User, User.id == Referral.referral_id)
+        .outerjoin(claims, claims.c.user_id == Referral.referral_id)
+        .outerjoin(completions, completions.c.user_id == Referral.referral_id)
+        .outerjoin(children, children.c.user_id == Referral.referral_id)
+        .group_by(Referral.referrer_id)
+    )
+    if referrer_id is not None:
+        stmt = stmt.where(Referral.referrer_id == referrer_id)
+
+    result = await session.execute(stmt)
+    return {row[0]: dict(zip(STATS_FIELDS, row[1:])) for row in result.all()}
+
+
+async def save_referral_stats(session: AsyncSession, stats: dict[int, dict]) -> None:
+    """
+    Upsert строк referral_stats; коммит — за вызывающим.
+    """
+    rows = [
+        {"user_id": user_id, **values, "reconciled_at": datetime.now(timezone.utc)}
+        for user_id, values in stats.items()
+    ]
+    for i in range(0, len(rows), UPSERT_CHUNK):
+        stmt = insert(ReferralStats).values(rows[i : i + UPSERT_CHUNK])
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ReferralStats.user_id],
+                set_={
+                    field: stmt.excluded[field]
+                    for field in (*STATS_FIELDS, "reconciled_at")
+                },
+            )
         )
-        claim_count = claim_count_result.scalar_one()
 
-        percent = min((claim_count / days_since_reg) * 100, 100)
-        total_percent += percent
-        counted += 1
-    return round(total_percent / counted) if counted > 0 else 0
 
+async def reconcile_referral_stats(session: AsyncSession) -> tuple[int, int]:
+    """
+    Пересчитывает все счётчики заново. Возвращает (строк, из них разошлось).
+    """
+    fresh = await compute_referral_stats(session)
+    result = await session.execute(select(ReferralStats))
+    stored = {row.user_id: row for row in result.scalars().all()}
+
+    zero = dict.fromkeys(STATS_FIELDS, 0)
+    drifted = 0
+    for user_id, row in stored.items():
+        values = fresh.setdefault(user_id, zero)
+        if any(
+            abs(Decimal(getattr(row, field)) - Decimal(values[field])) > Decimal("0.01")
+            for field in STATS_FIELDS
+        ):
+            drifted += 1
+
+    await save_referral_stats(session, fresh)
+    await session.commit()
+    return len(fresh), drifted
 
-async def get_task_completion_percent(
-    session: AsyncSession, referral_ids: list[int]
-) -> int:
-    if not referral_ids:
-        return 0
 
-    result = await session.execute(select(func.count()).select_from(Task))
-    total_tasks = result.scalar_one()
-    if total_tasks == 0:
-        return 0
+async def get_referral_stats(session: AsyncSession, referrer_id: int) -> dict:
+    """
+    Чтение счётчиков. Если строки ещё нет, она добавляется в транзакцию
+    вызывающего — сохранится с его коммитом, без коммита посчитается снова.
+    """
+    stats = await session.get(ReferralStats, referrer_id)
+    if stats is None:
+        # Строки ещё нет — считаем один раз, дальше её ведут события
+        fresh = await compute_referral_stats(session, referrer_id)
+        values = fresh.get(referrer_id, dict.fromkeys(STATS_FIELDS, 0))
+        await save_referral_stats(session, {referrer_id: values})
+        stats = ReferralStats(user_id=referrer_id, **values)
+
+    count = stats.referral_count
+    return {
+        "referral_count": count,
+        "nested_referrals": stats.nested_referrals,
+        "bonus_percent": round(stats.bonus_percent_sum / count) if count else 0,
+        "task_percent": round(stats.task_percent_sum / count) if count else 0,
+        "banned_count": stats.banned_count,
+    }
 
-    total_percent = 0
-    counted = 0
 
-    for referral_id in referral_ids:
-        completed_result = await session.execute(
-            select(func.count())
-            .select_from(TaskCompletion)
-            .where(TaskCompletion.user_id == referral_id)
-        )
-        completed = completed_result.scalar_one()
+async def track_referral_ban(session: AsyncSession, user_id: int, delta: int) -> None:
+    await session.execute(
+        update(ReferralStats)
+        .where(ReferralStats.user_id == _referrer_of(user_id))
+        .values(banned_count=ReferralStats.banned_count + delta)
+    )
 
-        percent = min((completed / total_tasks) * 100, 100)
-        total_percent += percent
-        counted += 1
-    return round(total_percent / counted) if counted > 0 else 0
 
+async def track_referral_bonus_claim(session: AsyncSession, user: User) -> None:
+    # Заявок не больше, чем дней, поэтому каждая добавляет ровно 100 / дней
+    days = (kyiv_today() - user.reg_date).days + 1 or 1
+    await session.execute(
+        update(ReferralStats)
+        .where(ReferralStats.user_id == _referrer_of(user.id))
+        .values(bonus_percent_sum=ReferralStats.bonus_percent_sum + Decimal(100) / days)
+    )
 
-def get_banned_referral_count(referrals: list[User]) -> int:
-    return sum(1 for r in referrals if r.is_banned)
 
+async def track_referral_task_completion(session: AsyncSession, user: User) -> None:
+    total_tasks = select(func.count()).select_from(Task).scalar_subquery()
+    await session.execute(
+        update(ReferralStats)
+        .where(ReferralStats.user_id == _referrer_of(user.id))
+        .values(
+            task_percent_sum=ReferralStats.task_percent_sum
+            + func.coalesce(100.0 / func.nullif(total_tasks, 0), 0)
+        )
+    )
 
-async def get_referral_stats(session: AsyncSession, referrer_id: int) -> dict:
-    referrals = await get_referrals(session, referrer_id)
-    referral_ids = [r.id for r in referrals]
 
-    return {
-        "referral_count": len(referrals),
-        "nested_referrals": await get_nested_referral_count(session, referral_ids),
-        "bonus_percent": await get_bonus_claim_percent(session, referral_ids),
-        "task_percent": await get_task_completion_percent(session, referral_ids),
-        "banned_count": get_banned_referral_count(referrals),
-    }
+async def refresh_referral_task_percents(session: AsyncSession) -> None:
+    """
+    Доля выполненных заданий зависит от их общего числа: после добавления
+    или удаления задания пересчитываем task_percent_sum у всех одним UPDATE.
+    Коммит — за вызывающим.
+    """
+    completions = (
+        select(TaskCompletion.user_id, func.count().label("completed"))
+        .group_by(TaskCompletion.user_id)
+        .subquery()
+    )
+    sums = (
+        select(
+            Referral.referrer_id.label("user_id"),
+            func.sum(_task_percent(func.coalesce(completions.c.completed, 0))).label(
+                "task_percent_sum"
+            ),
+        )
+        .join(User, User.id == Referral.referral_id)
+        .outerjoin(completions, completions.c.user_id == Referral.referral_id)
+        .group_by(Referral.referrer_id)
+        .subquery()
+    )
+    await session.execute(
+        update(ReferralStats)
+        .where(ReferralStats.user_id == sums.c.user_id)
+        .values(task_percent_sum=sums.c.task_percent_sum)
+    )
 
 
 async def get_who_referred(session: AsyncSession, user_id: int) -> User | None:
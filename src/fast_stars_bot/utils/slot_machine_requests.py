@@ -1,19 +1,30 @@
 from decimal import Decimal
 
+from db.models.balance_ledger import LedgerReason
 from db.models.slot_machine_log import SlotMachineLog
 from db.models.user import User
+from services.user_cache import invalidate_user_profile
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
 
 
-async def log_slot_machine_spin(
-    session: AsyncSession, user: User, win_amount: Decimal
-) -> None:
-    log = SlotMachineLog(user_id=user.id, win_amount=win_amount)
-    session.add(log)
-    if win_amount > 0:
-        user.stars += win_amount
+async def log_slot_machine_spins(
+    session: AsyncSession, user: User, rewards: list[Decimal]
+) -> Decimal:
+    """
+    Записывает все прокруты покупки и начисляет выигрыш одной транзакцией.
+    """
+    session.add_all(
+        SlotMachineLog(user_id=user.id, win_amount=reward) for reward in rewards
+    )
+    total = sum(rewards, Decimal(0))
+    if total > 0:
+        await change_balance(session, user.id, total, LedgerReason.SLOT_MACHINE)
     await session.commit()
+    if total > 0:
+        await invalidate_user_profile(user.telegram_id)
+    return total
 
 
 async def get_total_slot_spins(session: AsyncSession) -> int:
@@ -1,64 +1,192 @@
 import asyncio
+import time
 from decimal import Decimal
 
 from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest
+from db.models.balance_ledger import LedgerReason
 from db.models.channel import Channel
 from db.models.subscription_log import SubscriptionLog
 from db.models.user import User
 from services.redis_client import redis_client
+from services.user_cache import invalidate_user_profile
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
 
+MEMBER_STATUSES = ("member", "administrator", "creator")
+CHANNEL_MEMBERS_KEY = "channel_members:{chat}"
+CHANNEL_TRACKED_KEY = "channel_tracked:{chat}"
+CHANNEL_TRACKED_TTL = 86400  # 1 день
+USER_SUBS_KEY = "user_subs:{telegram_id}"  # channel_id -> "статус:истекает"
+SUB_POSITIVE_TTL = 600  # 10 мин
+SUB_NEGATIVE_TTL = 60  # 1 мин
 
-async def resolve_chat_id(bot: Bot, channel: Channel) -> int | str | None:
-    url_part = channel.link.strip().rstrip("/").split("/")[-1]
 
-    if not url_part.startswith("+"):
-        return "@" + url_part  # публичный канал
+def chat_key(chat_id: int | str) -> str:
+    # @username регистронезависим, числовой id храним как есть
+    return chat_id.lower() if isinstance(chat_id, str) else str(chat_id)
+
+
+async def set_channel_tracked(chat_keys: list[str], tracked: bool) -> None:
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for key in chat_keys:
+            pipe.set(
+                CHANNEL_TRACKED_KEY.format(chat=key),
+                "1" if tracked else "0",
+                ex=CHANNEL_TRACKED_TTL,
+            )
+            if not tracked:
+                # без прав админа события не приходят — список устареет
+                pipe.delete(CHANNEL_MEMBERS_KEY.format(chat=key))
+        await pipe.execute()
+
+
+async def is_channel_tracked(bot: Bot, chat_id: int | str) -> bool:
+    """
+    Бот получает chat_member апдейты только в каналах, где он админ.
+    """
+    key = chat_key(chat_id)
+    cached = await redis_client.get(CHANNEL_TRACKED_KEY.format(chat=key))
+    if cached is not None:
+        return cached == "1"
+
     try:
-        chat = await bot.get_chat(channel.username)
-        return chat.id  # приватный канал
+        member = await bot.get_chat_member(chat_id=chat_id, user_id=bot.id)
+        tracked = member.status == "administrator"
+    except Exception:
+        tracked = False
+    await set_channel_tracked([key], tracked)
+    return tracked
+
+
+async def set_channel_member(
+    chat_keys: list[str], telegram_id: int, is_member: bool
+) -> None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key in chat_keys:
+            pipe.hset(
+                CHANNEL_MEMBERS_KEY.format(chat=key),
+                str(telegram_id),
+                "1" if is_member else "0",
+            )
+        await pipe.execute()
+
+
+async def is_chat_member(bot: Bot, chat_id: int | str, telegram_id: int) -> bool:
+    key = chat_key(chat_id)
+    tracked = await is_channel_tracked(bot, chat_id)
+    if tracked:
+        cached = await redis_client.hget(
+            CHANNEL_MEMBERS_KEY.format(chat=key), str(telegram_id)
+        )
+        if cached is not None:
+            return cached == "1"
+
+    # Фолбэк: канал без прав админа или пользователь ещё не встречался
+    member = await bot.get_chat_member(chat_id=chat_id, user_id=telegram_id)
+    is_member = member.status in MEMBER_STATUSES
+    if tracked:
+        await set_channel_member([key], telegram_id, is_member)
+    return is_member
+
+
+def is_private_link(link: str) -> bool:
+    return link.strip().rstrip("/").split("/")[-1].startswith("+")
+
+
+async def fetch_chat_id(bot: Bot, username: str) -> int | None:
+    try:
+        chat = await bot.get_chat(username)
+        return chat.id
     except Exception as e:
-        # print(f"Error resolving chat ID for {channel.username}: {e}")
+        # print(f"Error resolving chat ID for {username}: {e}")
         return None
 
 
+async def resolve_chat_id(bot: Bot, channel: Channel) -> int | str | None:
+    if not is_private_link(channel.link):
+        url_part = channel.link.strip().rstrip("/").split("/")[-1]
+        return "@" + url_part  # публичный канал
+    if channel.chat_id is not None:
+        return channel.chat_id  # приватный канал, id сохранён в БД
+    # id ещё не сохранён — его допишет refresh_channel_chat_ids
+    return await fetch_chat_id(bot, channel.username)
+
+
 async def check_channel_subscription(bot: Bot, telegram_id: int, channel: Channel):
+    if not channel.requires_subscription:
+        return True
     try:
         chat_id = await resolve_chat_id(bot, channel)
-        if not channel.requires_subscription:
-            return True
         if chat_id is None:
             return False
 
-        member = await bot.get_chat_member(chat_id=chat_id, user_id=telegram_id)
-        return member.status in ["member", "administrator", "creator"]
+        return await is_chat_member(bot, chat_id, telegram_id)
     except TelegramBadRequest:
         return False  # неверные данные о канале, но не пускаем
 
 
+async def get_cached_subscriptions(telegram_id: int) -> dict[int, bool]:
+    data = await redis_client.hgetall(USER_SUBS_KEY.format(telegram_id=telegram_id))
+    now = int(time.time())
+    subscriptions = {}
+    for channel_id, value in data.items():
+        status, expires_at = value.split(":")
+        if int(expires_at) > now:
+            subscriptions[int(channel_id)] = status == "1"
+    return subscriptions
+
+
+async def cache_subscriptions(telegram_id: int, results: dict[int, bool]) -> None:
+    now = int(time.time())
+    key = USER_SUBS_KEY.format(telegram_id=telegram_id)
+    mapping = {
+        str(channel_id): (
+            f"1:{now + SUB_POSITIVE_TTL}"
+            if subscribed
+            else f"0:{now + SUB_NEGATIVE_TTL}"
+        )
+        for channel_id, subscribed in results.items()
+    }
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, SUB_POSITIVE_TTL)
+        await pipe.execute()
+
+
+async def invalidate_user_subscriptions(telegram_id: int) -> None:
+    await redis_client.delete(USER_SUBS_KEY.format(telegram_id=telegram_id))
+
+
 async def is_user_subscribed_to_all(
-    bot: Bot, telegram_id: int, channels: list[Channel]
+    bot: Bot, telegram_id: int, channels: list[Channel], recheck_negative: bool = False
 ) -> bool:
-    cache_key = f"subs:{telegram_id}"
-    cached = await redis_client.get(cache_key)
-    if cached is not None:
-        return cached == "1"
-
-    results = await asyncio.gather(
-        *(check_channel_subscription(bot, telegram_id, ch) for ch in channels)
-    )
-    all_subscribed = all(results)
-    await redis_client.set(
-        cache_key, "1" if all_subscribed else "0", ex=120
-    )  # 2 мин TTL
-    return all_subscribed
+    """
+    Кэш хранится по каждому каналу отдельно: проверяются только каналы без
+    записи (в том числе новые), а при recheck_negative — ещё и отрицательные.
+    """
+    required = [ch for ch in channels if ch.requires_subscription]
+    cached = await get_cached_subscriptions(telegram_id)
+    to_check = [
+        ch
+        for ch in required
+        if ch.id not in cached or (recheck_negative and not cached[ch.id])
+    ]
+    if to_check:
+        results = await asyncio.gather(
+            *(check_channel_subscription(bot, telegram_id, ch) for ch in to_check)
+        )
+        fresh = {ch.id: subscribed for ch, subscribed in zip(to_check, results)}
+        await cache_subscriptions(telegram_id, fresh)
+        cached.update(fresh)
+    return all(cached[ch.id] for ch in required)
 
 
 async def reward_user_for_subscription(
     session: AsyncSession, bot: Bot, user: User, channels: list[Channel]
 ) -> None:
+    reward = Decimal(0)
     for channel in channels:
         rewarded = await session.execute(
             select(SubscriptionLog).filter(
@@ -73,22 +201,22 @@ async def reward_user_for_subscription(
             chat_id = await resolve_chat_id(bot, channel)
             if chat_id is None:
                 session.add(SubscriptionLog(user_id=user.id, channel_id=channel.id))
-                user.stars += Decimal("1")
+                reward += 1
                 continue
 
-            member = await bot.get_chat_member(
-                chat_id=chat_id, user_id=user.telegram_id
-            )
-            if member.status in ["member", "administrator", "creator"]:
+            if await is_chat_member(bot, chat_id, user.telegram_id):
                 subscription_log = SubscriptionLog(
                     user_id=user.id, channel_id=channel.id
                 )
                 session.add(subscription_log)
-                user.stars += Decimal("1")
+                reward += 1
         except Exception as e:
             pass
             # print(
             #     f"Error checking channel {channel.username} for user {user.telegram_id}: {e}"
             # )
 
+    if reward:
+        await change_balance(session, user.id, reward, LedgerReason.SUBSCRIPTION)
     await session.commit()
+    await invalidate_user_profile(user.telegram_id)
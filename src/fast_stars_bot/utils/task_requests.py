@@ -1,10 +1,17 @@
 from decimal import Decimal
 
 from aiogram import Bot
+from db.models.balance_ledger import LedgerReason
 from db.models.task import Task, TaskCompletion
 from db.models.user import User
+from services.user_cache import invalidate_user_profile
 from sqlalchemy import delete, desc, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
+from utils.referral_requests import (
+    refresh_referral_task_percents,
+    track_referral_task_completion,
+)
 
 
 async def add_task(
@@ -23,6 +30,8 @@ async def add_task(
         requires_subscription=requires_subscription,
     )
     session.add(new_task)
+    # Доля выполненных заданий у рефералов считается от их общего числа
+    await refresh_referral_task_percents(session)
     await session.commit()
     return new_task
 
@@ -54,6 +63,7 @@ async def delete_task(session: AsyncSession, task_id: int) -> None:
             delete(TaskCompletion).where(TaskCompletion.task_id == task_id)
         )
         await session.execute(delete(Task).where(Task.id == task_id))
+        await refresh_referral_task_percents(session)
         await session.commit()
 
 
@@ -91,6 +101,9 @@ async def is_user_subscribed_to_task(bot: Bot, user_id: int, task: Task) -> bool
 async def complete_task(session: AsyncSession, user: User, task: Task) -> None:
     task_completion = TaskCompletion(user_id=user.id, task_id=task.id)
     session.add(task_completion)
-    user.stars += task.reward
-    session.add(user)
+    await change_balance(
+        session, user.id, task.reward, LedgerReason.TASK, ref_id=task.id
+    )
+    await track_referral_task_completion(session, user)
     await session.commit()
+    await invalidate_user_profile(user.telegram_id)
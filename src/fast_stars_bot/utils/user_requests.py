@@ -1,12 +1,16 @@
-from datetime import date
+from datetime import date, datetime, timezone
 from decimal import Decimal
 
-from db.models.daily_bonus_claim import DailyBonusClaim
-from db.models.task import Task, TaskCompletion
+from db.models.balance_ledger import LedgerReason
+from db.models.cube_game import CubeGame, GameStatus
 from db.models.user import User
+from db.models.vip_subscription import VipSubscription
 from db.models.withdrawal import Withdrawal
-from sqlalchemy import desc, func, select
+from services.user_cache import invalidate_user_profile
+from sqlalchemy import and_, desc, exists, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
+from utils.referral_requests import track_referral_ban
 
 
 def allowed_phone_number(phone: str) -> bool:
@@ -24,6 +28,37 @@ async def get_user_by_telegram_id(
         return user.scalars().first()
 
 
+async def get_user_context(
+    session: AsyncSession, telegram_id: int
+) -> tuple[User | None, CubeGame | None, date | None]:
+    # Пользователь, его активная игра в кубик и дата окончания VIP одним запросом
+    vip_until = (
+        select(func.max(VipSubscription.end_date))
+        .where(
+            VipSubscription.user_id == User.id,
+            VipSubscription.end_date >= date.today(),
+        )
+        .correlate(User)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        select(User, CubeGame, vip_until)
+        .outerjoin(
+            CubeGame,
+            and_(
+                CubeGame.status.in_([GameStatus.WAITING, GameStatus.IN_PROGRESS]),
+                or_(CubeGame.player1_id == User.id, CubeGame.player2_id == User.id),
+            ),
+        )
+        .where(User.telegram_id == telegram_id)
+        .limit(1)
+    )
+    row = result.first()
+    if row is None:
+        return None, None, None
+    return row[0], row[1], row[2]
+
+
 async def get_user_by_id(session: AsyncSession, user_id: int) -> User | None:
     user = await session.execute(select(User).filter(User.id == user_id))
     if user:
@@ -43,13 +78,19 @@ async def add_user(
 
 
 async def ban_user(session: AsyncSession, user: User) -> None:
+    if not user.is_banned:
+        await track_referral_ban(session, user.id, 1)
     user.is_banned = True
     await session.commit()
+    await invalidate_user_profile(user.telegram_id)
 
 
 async def unban_user(session: AsyncSession, user: User) -> None:
+    if user.is_banned:
+        await track_referral_ban(session, user.id, -1)
     user.is_banned = False
     await session.commit()
+    await invalidate_user_profile(user.telegram_id)
 
 
 async def check_admin(session: AsyncSession, telegram_id: int) -> bool:
@@ -63,11 +104,13 @@ async def check_admin(session: AsyncSession, telegram_id: int) -> bool:
 async def add_admin(session: AsyncSession, user: User) -> None:
     user.is_admin = True
     await session.commit()
+    await invalidate_user_profile(user.telegram_id)
 
 
 async def remove_admin(session: AsyncSession, user: User) -> None:
     user.is_admin = False
     await session.commit()
+    await invalidate_user_profile(user.telegram_id)
 
 
 async def get_top_10_users(session: AsyncSession) -> list[User]:
@@ -77,11 +120,51 @@ async def get_top_10_users(session: AsyncSession) -> list[User]:
     return result.scalars().all()
 
 
-async def get_all_users(session: AsyncSession) -> list[User]:
-    result = await session.execute(select(User))
+async def get_all_users(
+    session: AsyncSession, reachable_only: bool = False
+) -> list[User]:
+    query = select(User)
+    if reachable_only:
+        query = query.where(User.unreachable_since.is_(None))
+    result = await session.execute(query)
     return result.scalars().all()
 
 
+def has_active_vip():
+    return exists().where(
+        VipSubscription.user_id == User.id,
+        VipSubscription.end_date >= date.today(),
+    )
+
+
+async def get_audience_page(
+    session: AsyncSession, after_id: int, limit: int, vip_only: bool = False
+) -> list[tuple[int, int]]:
+    """
+    Страница (id, telegram_id) после after_id — keyset-пагинация без OFFSET
+    и без загрузки ORM-объектов. Недоступные пользователи пропускаются.
+    """
+    query = select(User.id, User.telegram_id).where(
+        User.id > after_id, User.unreachable_since.is_(None)
+    )
+    if vip_only:
+        query = query.where(has_active_vip())
+    result = await session.execute(query.order_by(User.id).limit(limit))
+    return [tuple(row) for row in result.all()]
+
+
+async def count_audience(
+    session: AsyncSession, after_id: int = 0, vip_only: bool = False
+) -> int:
+    query = select(func.count(User.id)).where(
+        User.id > after_id, User.unreachable_since.is_(None)
+    )
+    if vip_only:
+        query = query.where(has_active_vip())
+    result = await session.execute(query)
+    return result.scalar_one()
+
+
 async def get_all_admins(session: AsyncSession) -> list[User]:
     result = await session.execute(select(User).filter(User.is_admin == True))
     return result.scalars().all()
@@ -101,40 +184,6 @@ async def get_users_registered_today(session: AsyncSession):
     return users_today
 
 
-async def get_user_bonus_claim_percent(session: AsyncSession, user_id: int) -> int:
-    user_data = await session.execute(select(User.reg_date).where(User.id == user_id))
-    reg_date = user_data.scalar_one_or_none()
-    if not reg_date:
-        return 0
-
-    days_since_reg = (date.today() - reg_date).days + 1 or 1
-
-    claim_count_result = await session.execute(
-        select(func.count()).where(DailyBonusClaim.user_id == user_id)
-    )
-    claim_count = claim_count_result.scalar_one()
-
-    percent = min((claim_count / days_since_reg) * 100, 100)
-    return round(percent)
-
-
-async def get_user_task_completion_percent(session: AsyncSession, user_id: int) -> int:
-    result = await session.execute(select(func.count()).select_from(Task))
-    total_tasks = result.scalar_one()
-    if total_tasks == 0:
-        return 0
-
-    completed_result = await session.execute(
-        select(func.count())
-        .select_from(TaskCompletion)
-        .where(TaskCompletion.user_id == user_id)
-    )
-    completed = completed_result.scalar_one()
-
-    percent = min((completed / total_tasks) * 100, 100)
-    return round(percent)
-
-
 async def has_previous_withdrawals(session: AsyncSession, user_id: int) -> bool:
     result = await session.execute(
         select(Withdrawal.id).filter_by(user_id=user_id).limit(1)
@@ -148,6 +197,31 @@ async def update_user_username(
     if user.username != new_username:
         user.username = new_username
         await session.commit()
+        await invalidate_user_profile(user.telegram_id)
+
+
+async def mark_users_unreachable(
+    session: AsyncSession, telegram_ids: list[int]
+) -> None:
+    if not telegram_ids:
+        return
+    await session.execute(
+        update(User)
+        .where(User.telegram_id.in_(telegram_ids), User.unreachable_since.is_(None))
+        .values(unreachable_since=datetime.now(timezone.utc))
+    )
+    await session.commit()
+    await invalidate_user_profile(*telegram_ids)
+
+
+async def mark_user_reachable(session: AsyncSession, telegram_id: int) -> None:
+    await session.execute(
+        update(User)
+        .where(User.telegram_id == telegram_id)
+        .values(unreachable_since=None)
+    )
+    await session.commit()
+    await invalidate_user_profile(telegram_id)
 
 
 async def get_banned_users_page(
@@ -171,9 +245,19 @@ async def get_banned_users_count(session: AsyncSession) -> int:
     return result.scalar_one()
 
 
+async def get_users_by_ids(
+    session: AsyncSession, user_ids: list[int]
+) -> dict[int, User]:
+    if not user_ids:
+        return {}
+    result = await session.execute(select(User).where(User.id.in_(user_ids)))
+    return {user.id: user for user in result.scalars().all()}
+
+
 async def add_stars_to_user(
     session: AsyncSession, user_id: int, stars: Decimal
 ) -> None:
-    user = await get_user_by_id(session, user_id)
-    user.stars += stars
+    balance = await change_balance(session, user_id, stars, LedgerReason.ADMIN)
     await session.commit()
+    if balance:
+        await invalidate_user_profile(balance.telegram_id)
@@ -1,10 +1,13 @@
 from datetime import date, timedelta
 from decimal import Decimal
 
+from db.models.balance_ledger import LedgerReason
 from db.models.user import User
 from db.models.vip_subscription import VipSubscription
+from services.user_cache import invalidate_user_profile
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
 
 
 async def is_user_vip(session: AsyncSession, user_id: int) -> bool:
@@ -37,7 +40,14 @@ async def grant_vip(session: AsyncSession, user: User) -> bool:
     if already_vip:
         return False
 
-    user.stars -= Decimal("99.9")
+    price = Decimal("99.9")
+    if (
+        await change_balance(
+            session, user.id, -price, LedgerReason.VIP, min_balance=price
+        )
+        is None
+    ):
+        return False
     vip_subscription = VipSubscription(
         user_id=user.id,
         start_date=date.today(),
@@ -45,13 +55,19 @@ async def grant_vip(session: AsyncSession, user: User) -> bool:
     )
     session.add(vip_subscription)
     await session.commit()
+    await invalidate_user_profile(user.telegram_id)
     return True
 
 
-async def get_all_vip_users(session: AsyncSession) -> list[User]:
-    result = await session.execute(
+async def get_all_vip_users(
+    session: AsyncSession, reachable_only: bool = False
+) -> list[User]:
+    query = (
         select(User)
         .join(VipSubscription)
         .where(VipSubscription.end_date >= date.today())
     )
+    if reachable_only:
+        query = query.where(User.unreachable_since.is_(None))
+    result = await session.execute(query)
     return result.scalars().all()
@@ -1,23 +1,29 @@
 from decimal import Decimal
 
+from db.models.balance_ledger import LedgerReason
 from db.models.withdrawal import Withdrawal, WithdrawalStatus
+from services.user_cache import invalidate_user_profile
+from services.user_dossier import invalidate_dossier
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from utils.user_requests import get_user_by_id
+from utils.balance_requests import change_balance
 
 
 async def create_withdrawal_request(
     session: AsyncSession, user_id: int, stars: Decimal, ton_address: str | None = None
 ) -> int:
-    user = await get_user_by_id(session, user_id)
-    if user.stars < stars:
+    # Проверка и списание — одним UPDATE, двойной вывод не пройдёт
+    balance = await change_balance(
+        session, user_id, -stars, LedgerReason.WITHDRAWAL, min_balance=stars
+    )
+    if balance is None:
         raise ValueError("Insufficient stars for withdrawal.")
-    user.stars -= stars
     withdrawal_request = Withdrawal(
         user_id=user_id, stars=stars, ton_address=ton_address
     )
-    session.add_all([user, withdrawal_request])
+    session.add(withdrawal_request)
     await session.commit()
+    await invalidate_user_profile(balance.telegram_id)
     return withdrawal_request.id
 
 
@@ -61,6 +67,7 @@ async def update_withdrawal_status(
     if withdrawal:
         withdrawal.status = status
         await session.commit()
+        await invalidate_dossier(withdrawal.user_id)
     else:
         raise ValueError(f"Withdrawal with id {withdrawal_id} not found.")
 
@@ -1,9 +1,12 @@
 from decimal import Decimal
 
+from db.models.balance_ledger import LedgerReason
 from db.models.user import User
 from db.models.x2game import X2Game
+from services.user_cache import invalidate_user_profile
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.balance_requests import change_balance
 
 
 async def get_or_create_stats(session: AsyncSession) -> X2Game:
@@ -18,12 +21,24 @@ async def get_or_create_stats(session: AsyncSession) -> X2Game:
 
 async def save_x2game_results(
     session: AsyncSession, user: User, bet: Decimal, result: bool
-) -> None:
+) -> bool:
+    """
+    Проводит ставку одним UPDATE: баланс проверяется в том же запросе, что и
+    меняется. Если звёзд на ставку уже не хватает, игра не засчитывается — False.
+    """
+    delta = bet if result else -bet
+    balance = await change_balance(
+        session, user.id, delta, LedgerReason.X2GAME, min_balance=bet
+    )
+    if balance is None:
+        await session.rollback()
+        return False
+
     stats = await get_or_create_stats(session)
     if result:
         stats.won += bet
-        user.stars += bet
     else:
         stats.lost += bet
-        user.stars -= bet
     await session.commit()
+    await invalidate_user_profile(user.telegram_id)
+    return True
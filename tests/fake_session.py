@@ -0,0 +1,145 @@
+import asyncio
+import random
+
+from sqlalchemy.orm.evaluator import _EvaluatorCompiler
+
+
+class FakeResult:
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+
+    def scalars(self) -> "FakeResult":
+        return self
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar_one_or_none(self):
+        assert len(self.rows) <= 1
+        return self.first()
+
+    def all(self) -> list:
+        return list(self.rows)
+
+
+class FakeDatabase:
+    """
+    Таблицы в памяти: {модель: {id: объект}}. Блокировки строк держатся
+    сессией до commit/rollback, как FOR UPDATE в PostgreSQL.
+    """
+
+    def __init__(self, *rows) -> None:
+        self.tables: dict[type, dict[int, object]] = {}
+        self.locks: dict[tuple[type, int], "FakeSession"] = {}
+        # Вставленные, но не закоммиченные строки видны только своей сессии
+        self.uncommitted: dict[tuple[type, int], "FakeSession"] = {}
+        self.released = asyncio.Condition()
+        self.next_id = 1
+        for row in rows:
+            self.insert(row)
+
+    def insert(self, row) -> None:
+        if row.id is None:
+            row.id = self.next_id
+        self.next_id = max(self.next_id, row.id) + 1
+        self.tables.setdefault(type(row), {})[row.id] = row
+
+    def rows(self, model: type) -> list:
+        return list(self.tables.get(model, {}).values())
+
+
+class FakeSession:
+    """
+    Понимает простые SELECT одной модели: WHERE считается в Python,
+    ORDER BY — по id, поддерживаются LIMIT и FOR UPDATE [SKIP LOCKED].
+    Перед каждым запросом отдаёт управление, чтобы корутины перемешивались.
+    """
+
+    def __init__(self, db: FakeDatabase, rng: random.Random | None = None) -> None:
+        self.db = db
+        self.rng = rng or random.Random(0)
+        self.pending: list = []
+        self.flushed: list = []
+        self.held: set[tuple[type, int]] = set()
+
+    async def _yield(self) -> None:
+        for _ in range(self.rng.randint(1, 3)):
+            await asyncio.sleep(0)
+
+    async def execute(self, stmt) -> FakeResult:
+        await self._yield()
+        model = stmt.column_descriptions[0]["entity"]
+        if stmt.whereclause is None:
+            matches = lambda row: True  # noqa: E731
+        else:
+            matches = _EvaluatorCompiler(model).process(stmt.whereclause)
+        rows = sorted(
+            (row for row in self.db.rows(model) if self._visible(row) and matches(row)),
+            key=lambda r: r.id,
+        )
+
+        for_update = stmt._for_update_arg
+        if for_update is not None:
+            rows = await self._lock(rows, matches, for_update.skip_locked, stmt._limit)
+        elif stmt._limit is not None:
+            rows = rows[: stmt._limit]
+        return FakeResult(rows)
+
+    def _visible(self, row) -> bool:
+        return self.db.uncommitted.get((type(row), row.id), self) is self
+
+    async def _lock(self, rows, matches, skip_locked: bool, limit) -> list:
+        locked = []
+        for row in rows:
+            if limit is not None and len(locked) >= limit:
+                break
+            key = (type(row), row.id)
+            while self.db.locks.get(key, self) is not self:
+                if skip_locked:
+                    break
+                async with self.db.released:
+                    await self.db.released.wait()
+            else:
+                # Как EvalPlanQual: после ожидания строка перепроверяется
+                if matches(row):
+                    self.db.locks[key] = self
+                    self.held.add(key)
+                    locked.append(row)
+        return locked
+
+    def add(self, row) -> None:
+        self.pending.append(row)
+
+    async def _release(self) -> None:
+        for key in self.held:
+            self.db.locks.pop(key, None)
+        self.held.clear()
+        async with self.db.released:
+            self.db.released.notify_all()
+
+    async def flush(self) -> None:
+        # Строка получает id сразу, но исчезнет при rollback
+        for row in self.pending:
+            self.db.insert(row)
+            self.db.uncommitted[(type(row), row.id)] = self
+        self.flushed.extend(self.pending)
+        self.pending.clear()
+
+    async def commit(self) -> None:
+        await self._yield()
+        await self.flush()
+        for row in self.flushed:
+            del self.db.uncommitted[(type(row), row.id)]
+        self.flushed.clear()
+        await self._release()
+
+    async def rollback(self) -> None:
+        for row in self.flushed:
+            del self.db.tables[type(row)][row.id]
+            del self.db.uncommitted[(type(row), row.id)]
+        self.pending.clear()
+        self.flushed.clear()
+        await self._release()
+
+    async def refresh(self, row) -> None:
+        pass
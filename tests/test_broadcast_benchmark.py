@@ -0,0 +1,148 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+from db.models.user import User
+from services import broadcast
+from services.outbound import GLOBAL_RATE, OutboundScheduler
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from utils.broadcast_requests import create_broadcast_job
+
+API_LATENCY = 0.02  # сек на ответ Bot API
+BEFORE_USERS = 60
+LIMITED_USERS = 150
+UNLIMITED_USERS = 1500
+
+
+class FakeBotApi:
+    """
+    Локальный сервер Bot API: отвечает на sendMessage с задержкой API_LATENCY
+    и запоминает, кому ушло сообщение.
+    """
+
+    def __init__(self) -> None:
+        self.chat_ids: list[int] = []
+        self.runner: web.AppRunner | None = None
+        self.url = ""
+
+    async def handle(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        await asyncio.sleep(API_LATENCY)
+        chat_id = int(data["chat_id"])
+        self.chat_ids.append(chat_id)
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {
+                    "message_id": len(self.chat_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": data.get("text", ""),
+                },
+            }
+        )
+
+    async def __aenter__(self) -> "FakeBotApi":
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.runner.cleanup()
+
+    def bot(self, rate: float) -> Bot:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(self.url))
+        session.middleware(OutboundScheduler(rate=rate))
+        return Bot(token="123:test", session=session)
+
+
+async def _old_send_broadcast(bot: Bot, session: AsyncSession, data: dict) -> None:
+    # Прежняя рассылка: все пользователи в память, по одному сообщению с паузой
+    users = (await session.execute(select(User))).scalars().all()
+    for user in users:
+        try:
+            await bot.send_message(chat_id=user.telegram_id, text=data["text"])
+            await asyncio.sleep(0.05)
+        except Exception as e:
+            print(
+                f"Неизвестная ошибка при отправке пользователю {user.telegram_id}: {e}"
+            )
+
+
+async def _add_users(session: AsyncSession, count: int) -> list[int]:
+    await session.execute(text("TRUNCATE users CASCADE"))
+    await session.execute(
+        text("""
+            INSERT INTO users (id, telegram_id, stars, reg_date, is_banned, is_admin)
+            SELECT g, 100000 + g, 0, current_date, false, false
+            FROM generate_series(1, :count) g
+            """),
+        {"count": count},
+    )
+    await session.commit()
+    return [100000 + i for i in range(1, count + 1)]
+
+
+async def _benchmark(postgres_url: str, monkeypatch) -> dict[str, float]:
+    engine = create_async_engine(postgres_url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    monkeypatch.setattr(broadcast, "SessionLocal", sessions)
+    rates = {}
+    try:
+        async with FakeBotApi() as api:
+            async with sessions() as session:
+                audience = await _add_users(session, BEFORE_USERS)
+                bot = api.bot(GLOBAL_RATE)
+                started = time.monotonic()
+                await _old_send_broadcast(bot, session, {"text": "hi"})
+                rates["before"] = BEFORE_USERS / (time.monotonic() - started)
+                await bot.session.close()
+            assert sorted(api.chat_ids) == audience
+
+            for name, users, rate in (
+                ("after", LIMITED_USERS, GLOBAL_RATE),
+                ("after, no rate limit", UNLIMITED_USERS, 100_000),
+            ):
+                api.chat_ids.clear()
+                async with sessions() as session:
+                    audience = await _add_users(session, users)
+                    job = await create_broadcast_job(
+                        session,
+                        "all",
+                        broadcast.serialize_payload({"text": "hi"}),
+                        datetime.now(timezone.utc),
+                    )
+                bot = api.bot(rate)
+                stats = await broadcast.run_broadcast_job(bot, job.id)
+                await bot.session.close()
+                assert sorted(api.chat_ids) == audience
+                assert (stats.sent, stats.failed) == (users, 0)
+                rates[name] = stats.rate
+    finally:
+        await engine.dispose()
+    return rates
+
+
+def test_broadcast_throughput(postgres_url, monkeypatch):
+    rates = asyncio.run(_benchmark(postgres_url, monkeypatch))
+
+    print(
+        "\nbroadcast throughput, msgs/sec: "
+        + ", ".join(f"{name} {rate:.1f}" for name, rate in rates.items())
+    )
+    # Прежний цикл упирается в задержку API и паузу: ~1 / (0.02 + 0.05).
+    # Новый конвейер выбирает весь безопасный лимит, а без лимита упирается
+    # только в число воркеров
+    assert rates["after"] >= 0.9 * GLOBAL_RATE
+    assert rates["after, no rate limit"] >= 10 * rates["before"]
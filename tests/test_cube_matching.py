@@ -0,0 +1,157 @@
+import asyncio
+import random
+from collections import Counter
+from decimal import Decimal
+
+import pytest
+from db.models.cube_game import CubeGame, GameStatus
+from db.models.user import User
+from utils import cube_requests
+from utils.balance_requests import Balance
+
+from tests.fake_session import FakeDatabase, FakeSession
+
+PLAYERS = 40
+CLICKS_PER_PLAYER = 3
+
+
+async def _noop(*args, **kwargs) -> None:
+    pass
+
+
+async def _change_balance(
+    session, user_id, delta, reason, *, min_balance=None, ref_id=None
+) -> Balance | None:
+    # Как UPDATE ... WHERE stars >= :min RETURNING, по строке в FakeDatabase
+    user = session.db.tables[User][user_id]
+    if min_balance is not None and user.stars < min_balance:
+        return None
+    user.stars += delta
+    return Balance(user.stars, user.telegram_id)
+
+
+async def _commission(session, key) -> Decimal:
+    return Decimal(20)
+
+
+@pytest.fixture(autouse=True)
+def no_side_effects(monkeypatch):
+    monkeypatch.setattr(cube_requests, "track_game", _noop)
+    monkeypatch.setattr(cube_requests, "untrack_players", _noop)
+    monkeypatch.setattr(cube_requests, "invalidate_user_profile", _noop)
+    monkeypatch.setattr(cube_requests, "change_balance", _change_balance)
+    monkeypatch.setattr(cube_requests, "get_game_setting", _commission)
+
+
+def _players(count: int, stars: Decimal = Decimal(100)) -> list[User]:
+    return [User(id=i, telegram_id=1000 + i, stars=stars) for i in range(1, count + 1)]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_concurrent_matching_seats_every_player_once(seed):
+    rng = random.Random(seed)
+    players = _players(PLAYERS)
+    db = FakeDatabase(*players)
+
+    clicks = [player for player in players for _ in range(CLICKS_PER_PLAYER)]
+    rng.shuffle(clicks)
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                cube_requests.match_cube_game(
+                    FakeSession(db, random.Random(rng.random())), player, Decimal(1)
+                )
+                for player in clicks
+            )
+        )
+
+    results = asyncio.run(run())
+
+    # Повторные нажатия получают None, ровно одно нажатие сажает игрока
+    assert sum(game is not None for game in results) == PLAYERS
+    assert not db.locks
+
+    seated = Counter()
+    for game in db.rows(CubeGame):
+        assert game.player1_id != game.player2_id
+        if game.status == GameStatus.WAITING:
+            assert game.player2_id is None
+        else:
+            assert game.status == GameStatus.IN_PROGRESS
+            assert game.player2_id is not None
+        seated.update(p for p in (game.player1_id, game.player2_id) if p)
+    assert seated == Counter({player.id: 1 for player in players})
+
+
+def test_table_left_by_timeout_can_be_joined_again():
+    player1, player2, newcomer = _players(3)
+    game = CubeGame(
+        id=1,
+        player1_id=player1.id,
+        player2_id=player2.id,
+        bet=Decimal(1),
+        status=GameStatus.IN_PROGRESS,
+    )
+    db = FakeDatabase(player1, player2, newcomer, game)
+
+    async def run():
+        leaver, other, waiting = await cube_requests.handle_throw_timeout(
+            FakeSession(db), game.id, player1.id
+        )
+        assert (leaver, other) == (player1, player2)
+        assert (waiting.player1_id, waiting.player2_id) == (player2.id, None)
+        assert waiting.status == GameStatus.WAITING
+        return await cube_requests.match_cube_game(
+            FakeSession(db), newcomer, Decimal(1)
+        )
+
+    joined = asyncio.run(run())
+
+    assert joined is game
+    assert (game.player1_id, game.player2_id) == (player2.id, newcomer.id)
+    assert game.status == GameStatus.IN_PROGRESS
+
+
+def test_stake_is_reserved_when_seated_and_paid_out_on_finish():
+    player1, player2 = _players(2, stars=Decimal(10))
+    db = FakeDatabase(player1, player2)
+
+    async def run():
+        game = await cube_requests.match_cube_game(FakeSession(db), player1, Decimal(5))
+        await cube_requests.match_cube_game(FakeSession(db), player2, Decimal(5))
+        assert (player1.stars, player2.stars) == (5, 5)
+        return await cube_requests.finish_game(FakeSession(db), game, 6, 1)
+
+    winner = asyncio.run(run())
+
+    # Победитель получает свою ставку и ставку соперника минус 20% комиссии
+    assert winner is player1
+    assert (player1.stars, player2.stars) == (Decimal("14"), Decimal("5"))
+
+
+def test_player_without_enough_stars_is_not_seated():
+    (poor,) = _players(1, stars=Decimal(3))
+    db = FakeDatabase(poor)
+
+    with pytest.raises(ValueError):
+        asyncio.run(cube_requests.match_cube_game(FakeSession(db), poor, Decimal(5)))
+
+    assert db.rows(CubeGame) == []
+    assert poor.stars == 3
+
+
+def test_leaving_a_waiting_table_refunds_the_stake():
+    (player,) = _players(1, stars=Decimal(10))
+    db = FakeDatabase(player)
+
+    async def run():
+        game = await cube_requests.match_cube_game(FakeSession(db), player, Decimal(5))
+        assert player.stars == 5
+        await cube_requests.cancel_game(FakeSession(db), game)
+        return game
+
+    game = asyncio.run(run())
+
+    assert game.status == GameStatus.CANCELED
+    assert player.stars == 10
@@ -0,0 +1,78 @@
+import asyncio
+
+import fakeredis
+import pytest
+from services.cube_state import DEADLINE_GAMES_KEY, DEADLINES_KEY, RedisCubeStateStore
+
+
+@pytest.fixture
+def store():
+    return RedisCubeStateStore(redis=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+
+def test_deadline_is_not_claimed_before_it_is_due(store):
+    async def run():
+        await store.set_deadline(1, 10, 60)
+        return (
+            await store.get_due_deadlines(10),
+            await store.claim_deadline(1, 10),
+            await store.redis.zcard(DEADLINES_KEY),
+        )
+
+    assert asyncio.run(run()) == ([], False, 1)
+
+
+def test_due_deadline_is_claimed_exactly_once(store):
+    async def run():
+        await store.set_deadline(1, 10, -1)
+        assert await store.get_due_deadlines(10) == [(1, 10)]
+        # Таймеры нескольких процессов срабатывают одновременно
+        claims = await asyncio.gather(*(store.claim_deadline(1, 10) for _ in range(10)))
+        return (
+            claims,
+            await store.get_due_deadlines(10),
+            await store.redis.hgetall(DEADLINE_GAMES_KEY),
+        )
+
+    claims, due, games = asyncio.run(run())
+
+    assert claims.count(True) == 1
+    assert due == []
+    assert games == {}
+
+
+def test_new_deadline_replaces_previous_one_for_the_game(store):
+    async def run():
+        await store.set_deadline(1, 10, -1)
+        await store.set_deadline(1, 20, -1)  # ход перешёл ко второму игроку
+        return (
+            await store.get_due_deadlines(10),
+            await store.claim_deadline(1, 10),
+            await store.claim_deadline(1, 20),
+        )
+
+    assert asyncio.run(run()) == ([(1, 20)], False, True)
+
+
+def test_cleared_deadline_cannot_be_claimed(store):
+    async def run():
+        await store.set_deadline(1, 10, -1)
+        await store.set_deadline(2, 30, -1)
+        await store.clear_deadline(1)
+        return (
+            await store.get_due_deadlines(10),
+            await store.claim_deadline(1, 10),
+            await store.redis.hgetall(DEADLINE_GAMES_KEY),
+        )
+
+    assert asyncio.run(run()) == ([(2, 30)], False, {"2": "2:30"})
+
+
+def test_due_deadlines_respect_limit_and_order(store):
+    async def run():
+        for game_id in range(1, 6):
+            await store.set_deadline(game_id, game_id * 10, -game_id)
+        return await store.get_due_deadlines(3)
+
+    # Сначала самые просроченные
+    assert asyncio.run(run()) == [(5, 50), (4, 40), (3, 30)]
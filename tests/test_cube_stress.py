@@ -0,0 +1,133 @@
+import asyncio
+import random
+from collections import Counter
+from decimal import Decimal
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from db.models.balance_ledger import BalanceLedger
+from db.models.cube_game import CubeGame, GameStatus
+from db.models.user import User
+from handlers.minigames_handlers import cube_handlers
+from services import active_players, cube_state, user_cache, user_dossier
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+PLAYERS = 150
+POOR_PLAYERS = 30  # звёзд меньше ставки — за стол не попадают
+CLICKS_PER_PLAYER = 3
+BET = Decimal(5)
+
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.sent = 0
+
+    async def send_message(self, chat_id, *args, **kwargs):
+        self.sent += 1
+        await asyncio.sleep(0)
+        return SimpleNamespace(message_id=self.sent, chat=SimpleNamespace(id=chat_id))
+
+
+class FakeCallback:
+    def __init__(self, telegram_id: int, bot: FakeBot, answers: Counter) -> None:
+        self.data = f"cube_bet_{BET}"
+        self.from_user = SimpleNamespace(id=telegram_id)
+        self.bot = bot
+        self.message = SimpleNamespace(edit_text=self._edit_text)
+        self.answers = answers
+
+    async def answer(self, text="", *args, **kwargs) -> None:
+        self.answers[text] += 1
+
+    async def _edit_text(self, *args, **kwargs) -> None:
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = fakeredis.FakeAsyncRedis(
+        decode_responses=True, max_connections=PLAYERS * CLICKS_PER_PLAYER
+    )
+    for module in (active_players, user_cache, user_dossier):
+        monkeypatch.setattr(module, "redis_client", redis)
+    store = cube_state.RedisCubeStateStore(redis=redis)
+    monkeypatch.setattr(cube_handlers, "cube_store", store)
+    monkeypatch.setattr(active_players, "cube_store", store)
+    return redis
+
+
+async def _stress(postgres_url: str, monkeypatch, seed: int):
+    # Движок создаётся в цикле теста — asyncpg привязан к нему
+    engine = create_async_engine(postgres_url, pool_size=20, max_overflow=0)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    monkeypatch.setattr(cube_handlers, "SessionLocal", sessions)
+    try:
+        async with sessions() as session:
+            session.add_all(
+                User(
+                    id=i,
+                    telegram_id=1000 + i,
+                    username=f"p{i}",
+                    stars=BET - 1 if i <= POOR_PLAYERS else BET * 2,
+                )
+                for i in range(1, PLAYERS + 1)
+            )
+            await session.commit()
+
+        bot, answers = FakeBot(), Counter()
+        clicks = [
+            1000 + i for i in range(1, PLAYERS + 1) for _ in range(CLICKS_PER_PLAYER)
+        ]
+        random.Random(seed).shuffle(clicks)
+        await asyncio.gather(
+            *(
+                cube_handlers.play_cube_game(FakeCallback(tg, bot, answers))
+                for tg in clicks
+            )
+        )
+
+        async with sessions() as session:
+            games = (await session.execute(select(CubeGame))).scalars().all()
+            stars = dict((await session.execute(select(User.id, User.stars))).all())
+            stakes = dict(
+                (
+                    await session.execute(
+                        select(BalanceLedger.user_id, func.count()).group_by(
+                            BalanceLedger.user_id
+                        )
+                    )
+                ).all()
+            )
+        return games, stars, stakes, answers
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_concurrent_cube_bets_on_postgres(postgres_url, fake_redis, monkeypatch, seed):
+    games, stars, stakes, answers = asyncio.run(
+        _stress(postgres_url, monkeypatch, seed)
+    )
+
+    seated = Counter()
+    for game in games:
+        assert game.bet == BET
+        if game.status == GameStatus.WAITING:
+            assert game.player2_id is None
+        else:
+            assert game.status == GameStatus.IN_PROGRESS
+            assert game.player2_id not in (None, game.player1_id)
+        seated.update(p for p in (game.player1_id, game.player2_id) if p)
+
+    rich = range(POOR_PLAYERS + 1, PLAYERS + 1)
+    # Каждый игрок со звёздами сидит ровно за одним столом, бедные — ни за каким
+    assert seated == Counter({player_id: 1 for player_id in rich})
+    # Ставка списана один раз, баланс нигде не ушёл в минус
+    assert stakes == {player_id: 1 for player_id in rich}
+    assert all(value >= 0 for value in stars.values())
+    assert all(stars[player_id] == BET for player_id in rich)
+    assert answers["Недостаточно звезд для ставки! ⭐️"] == (
+        POOR_PLAYERS * CLICKS_PER_PLAYER
+    )
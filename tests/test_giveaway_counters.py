@@ -0,0 +1,94 @@
+import asyncio
+
+import fakeredis
+import pytest
+from services import giveaway_counters
+from utils import giveaway_requests
+
+GIVEAWAY_ID = 7
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(giveaway_counters, "redis_client", fake)
+    for name in ("add_tickets_script", "fill_counters_script"):
+        script = getattr(giveaway_counters, name)
+        monkeypatch.setattr(
+            giveaway_counters, name, fake.register_script(script.script)
+        )
+    return fake
+
+
+class TicketTable:
+    """
+    giveaway_tickets в памяти; on_read вызывается между чтением из БД
+    и возвратом результата — туда ставится «параллельная» покупка.
+    """
+
+    def __init__(self, tickets: dict[int, int]) -> None:
+        self.tickets = dict(tickets)
+        self.on_read = None
+
+    async def get_ticket_counts(self, session, giveaway_id):
+        snapshot = dict(self.tickets)
+        if self.on_read:
+            on_read, self.on_read = self.on_read, None
+            await on_read()
+        return list(snapshot), list(snapshot.values())
+
+    async def buy(self, user_id: int, amount: int) -> None:
+        self.tickets[user_id] = self.tickets.get(user_id, 0) + amount
+        await giveaway_counters.add_tickets(GIVEAWAY_ID, user_id, amount)
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = TicketTable({1: 3, 2: 5})
+    monkeypatch.setattr(giveaway_requests, "get_ticket_counts", table.get_ticket_counts)
+    return table
+
+
+def test_fill_then_purchases_are_counted(redis, table):
+    async def run():
+        assert await giveaway_requests.get_giveaway_counters(None, GIVEAWAY_ID, 1) == (
+            8,
+            2,
+            3,
+        )
+        await table.buy(1, 2)
+        await table.buy(3, 4)
+        return await giveaway_counters.read_giveaway_counters(GIVEAWAY_ID, 1)
+
+    assert asyncio.run(run()) == (14, 3, 5)
+
+
+def test_purchase_during_fill_is_not_lost(redis, table):
+    async def run():
+        # Покупка коммитится после чтения из БД, но до записи счётчиков
+        table.on_read = lambda: table.buy(3, 4)
+        first = await giveaway_requests.get_giveaway_counters(None, GIVEAWAY_ID, 3)
+        cached = await giveaway_counters.read_giveaway_counters(GIVEAWAY_ID, 3)
+        second = await giveaway_requests.get_giveaway_counters(None, GIVEAWAY_ID, 3)
+        return first, cached, second
+
+    first, cached, second = asyncio.run(run())
+
+    assert first == (8, 2, 0)  # ответ по прочитанному снимку БД
+    assert cached is None  # устаревший снимок не попал в Redis
+    assert second == (12, 3, 4)
+
+
+def test_fill_with_stale_token_is_rejected(redis):
+    async def run():
+        stale = await giveaway_counters.start_counters_fill(GIVEAWAY_ID)
+        fresh = await giveaway_counters.start_counters_fill(GIVEAWAY_ID)
+        assert not await giveaway_counters.fill_giveaway_counters(
+            GIVEAWAY_ID, stale, [1], [1]
+        )
+        assert await giveaway_counters.fill_giveaway_counters(
+            GIVEAWAY_ID, fresh, [1, 2], [1, 2]
+        )
+        return await giveaway_counters.read_giveaway_counters(GIVEAWAY_ID, 2)
+
+    assert asyncio.run(run()) == (3, 2, 2)
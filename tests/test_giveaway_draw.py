@@ -0,0 +1,112 @@
+import random
+import time
+import tracemalloc
+from collections import Counter
+
+import pytest
+from services.giveaway_draw import draw_with_replacement, draw_without_replacement
+
+MILLION_TICKETS_USERS = 100_000  # по 1–19 билетов — около 1 млн билетов
+
+
+def _draw_from_ticket_pool(user_ids, counts, k, rng):
+    # Прежняя жеребьёвка: по строке на билет и random.choices
+    pool = [user_id for user_id, count in zip(user_ids, counts) for _ in range(count)]
+    return rng.choices(pool, k=k)
+
+
+def test_empty_or_ticketless_giveaway_has_no_winners():
+    assert draw_with_replacement([], [], 5) == []
+    assert draw_with_replacement([1, 2], [0, 0], 5) == []
+
+
+def test_returns_k_places_and_skips_users_without_tickets():
+    winners = draw_with_replacement([1, 2, 3], [0, 4, 0], 50, random.Random(1))
+    assert winners == [2] * 50
+
+
+def test_win_rate_is_proportional_to_tickets():
+    user_ids = [1, 2, 3, 4]
+    counts = [1, 2, 3, 4]
+    draws = 200_000
+
+    wins = Counter(draw_with_replacement(user_ids, counts, draws, random.Random(7)))
+
+    total = sum(counts)
+    for user_id, count in zip(user_ids, counts):
+        assert abs(wins[user_id] / draws - count / total) < 0.005
+
+
+def test_matches_ticket_pool_distribution():
+    rng = random.Random(3)
+    user_ids = list(range(1, 51))
+    counts = [rng.randint(1, 20) for _ in user_ids]
+    draws = 100_000
+
+    new = Counter(draw_with_replacement(user_ids, counts, draws, random.Random(11)))
+    old = Counter(_draw_from_ticket_pool(user_ids, counts, draws, random.Random(13)))
+
+    for user_id in user_ids:
+        assert abs(new[user_id] - old[user_id]) / draws < 0.01
+
+
+def test_without_replacement_picks_distinct_ticket_holders():
+    winners = draw_without_replacement(
+        [1, 2, 3, 4, 5], [3, 0, 1, 7, 2], 10, random.Random(4)
+    )
+    assert sorted(winners) == [1, 3, 4, 5]
+    assert draw_without_replacement([], [], 3) == []
+    assert draw_without_replacement([1, 2], [0, 0], 3) == []
+
+
+def test_without_replacement_first_place_is_proportional_to_tickets():
+    user_ids = [1, 2, 3, 4]
+    counts = [1, 2, 3, 4]
+    draws = 50_000
+    rng = random.Random(9)
+
+    first = Counter(
+        draw_without_replacement(user_ids, counts, 2, rng)[0] for _ in range(draws)
+    )
+
+    total = sum(counts)
+    for user_id, count in zip(user_ids, counts):
+        assert abs(first[user_id] / draws - count / total) < 0.01
+
+
+def _million_tickets() -> tuple[list[int], list[int]]:
+    rng = random.Random(5)
+    user_ids = list(range(1, MILLION_TICKETS_USERS + 1))
+    counts = [rng.randint(1, 19) for _ in user_ids]
+    assert 950_000 < sum(counts) < 1_050_000
+    return user_ids, counts
+
+
+@pytest.mark.parametrize("draw", [draw_with_replacement, draw_without_replacement])
+def test_million_ticket_draw_is_fast(draw):
+    user_ids, counts = _million_tickets()
+
+    started = time.perf_counter()
+    winners = draw(user_ids, counts, 100, random.Random(1))
+    elapsed = time.perf_counter() - started
+
+    assert len(winners) == 100
+    assert elapsed < 0.25
+
+
+@pytest.mark.parametrize("draw", [draw_with_replacement, draw_without_replacement])
+@pytest.mark.parametrize("tickets_per_count", [1, 1000])
+def test_draw_memory_depends_on_users_not_tickets(draw, tickets_per_count):
+    user_ids, counts = _million_tickets()
+    counts = [count * tickets_per_count for count in counts]  # до 1 млрд билетов
+
+    tracemalloc.start()
+    try:
+        draw(user_ids, counts, 100, random.Random(1))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Список по билету занял бы от 8 байт на билет; здесь — не больше
+    # префиксной суммы на участника
+    assert peak < 64 * len(user_ids)
@@ -0,0 +1,206 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from services import broadcast, giveaway_scheduler, notifications, scheduler
+from services.outbound import (
+    BULK,
+    INTERACTIVE,
+    OutboundScheduler,
+    bulk_sender,
+    bulk_traffic,
+    outbound_priority,
+)
+
+
+class SendMessage:
+    # Планировщик смотрит только на имя класса и chat_id
+    def __init__(self, chat_id: int | None = None, label: str = "") -> None:
+        self.chat_id = chat_id
+        self.label = label
+
+
+class GetMe:
+    pass
+
+
+class FakeApi:
+    """
+    make_request для планировщика: запоминает, что и когда отправлено,
+    и может ответить flood wait на первые запросы.
+    """
+
+    def __init__(self, flood_waits: int = 0, retry_after: float = 0.2) -> None:
+        self.calls: list[tuple[float, object]] = []
+        self.flood_waits = flood_waits
+        self.retry_after = retry_after
+
+    async def __call__(self, bot, method):
+        self.calls.append((time.monotonic(), method))
+        if self.flood_waits:
+            self.flood_waits -= 1
+            raise TelegramRetryAfter(method, "Too Many Requests", self.retry_after)
+        return True
+
+    def labels(self) -> list[str]:
+        return [method.label for _, method in self.calls]
+
+
+def _send(scheduler, api, method, bulk: bool = False) -> asyncio.Task:
+    # Задача копирует контекст при создании — приоритет задаётся здесь
+    if bulk:
+        with bulk_traffic():
+            return asyncio.create_task(scheduler(api, None, method))
+    return asyncio.create_task(scheduler(api, None, method))
+
+
+def test_token_bucket_limits_rate_after_burst():
+    scheduler = OutboundScheduler(rate=100)
+    api = FakeApi()
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(
+            *(_send(scheduler, api, SendMessage(i)) for i in range(150))
+        )
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(run())
+
+    # 100 токенов сразу, ещё 50 — по 10 мс
+    assert len(api.calls) == 150
+    assert 0.45 <= elapsed < 1.0
+    first = api.calls[0][0]
+    assert sum(t - first < 0.05 for t, _ in api.calls) <= 105
+
+
+def test_interactive_goes_before_queued_bulk():
+    scheduler = OutboundScheduler(rate=100)
+    scheduler._tokens = 0
+    api = FakeApi()
+
+    async def run():
+        tasks = [
+            _send(scheduler, api, SendMessage(label=f"bulk{i}"), bulk=True)
+            for i in range(5)
+        ]
+        await asyncio.sleep(0)
+        tasks += [
+            _send(scheduler, api, SendMessage(label=f"user{i}")) for i in range(5)
+        ]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert api.labels() == [f"user{i}" for i in range(5)] + [
+        f"bulk{i}" for i in range(5)
+    ]
+
+
+def test_retry_after_pauses_whole_queue_and_retries():
+    scheduler = OutboundScheduler(rate=100)
+    api = FakeApi(flood_waits=1, retry_after=0.2)
+
+    async def run():
+        flooded = _send(scheduler, api, SendMessage(1, "flooded"))
+        await asyncio.sleep(0.01)  # flood wait получен
+        other = _send(scheduler, api, SendMessage(2, "other"))
+        return await asyncio.gather(flooded, other)
+
+    assert asyncio.run(run()) == [True, True]
+
+    # Повтор встал в очередь раньше, поэтому и уходит первым
+    assert api.labels() == ["flooded", "flooded", "other"]
+    flood_at = api.calls[0][0]
+    assert all(t - flood_at >= 0.19 for t, _ in api.calls[1:])
+
+
+def test_retry_after_gives_up_after_max_retries():
+    scheduler = OutboundScheduler(rate=100, max_retries=2)
+    api = FakeApi(flood_waits=10, retry_after=0.01)
+
+    async def run():
+        await scheduler(api, None, SendMessage(1))
+
+    with pytest.raises(TelegramRetryAfter):
+        asyncio.run(run())
+    assert len(api.calls) == 3
+
+
+def test_bulk_messages_to_one_chat_are_spaced():
+    scheduler = OutboundScheduler(rate=100, bulk_chat_interval=0.1)
+    api = FakeApi()
+
+    async def run():
+        await asyncio.gather(
+            *(
+                _send(scheduler, api, SendMessage(1, "bulk"), bulk=True)
+                for _ in range(3)
+            ),
+            _send(scheduler, api, SendMessage(2, "other chat"), bulk=True),
+            _send(scheduler, api, SendMessage(1, "user")),
+        )
+
+    asyncio.run(run())
+
+    times = {label: [] for label in api.labels()}
+    for sent_at, method in api.calls:
+        times[method.label].append(sent_at)
+    start = min(t for t, _ in api.calls)
+
+    bulk = times["bulk"]
+    assert all(b - a >= 0.09 for a, b in zip(bulk, bulk[1:]))
+    # Другой чат и ответ пользователю лимит на чат не ждут
+    assert times["other chat"][0] - start < 0.05
+    assert times["user"][0] - start < 0.05
+
+
+def test_unlimited_methods_bypass_the_queue():
+    scheduler = OutboundScheduler(rate=1)
+    scheduler._tokens = 0
+    api = FakeApi()
+
+    async def run():
+        return await asyncio.wait_for(scheduler(api, None, GetMe()), 0.1)
+
+    assert asyncio.run(run()) is True
+    assert scheduler._tokens < 1
+
+
+def test_bulk_sender_marks_call_and_spawned_tasks_as_bulk():
+    seen = []
+
+    async def send():
+        seen.append(outbound_priority.get())
+
+    @bulk_sender
+    async def fan_out():
+        await send()
+        await asyncio.create_task(send())
+
+    async def run():
+        await fan_out()
+        await send()
+
+    asyncio.run(run())
+
+    assert seen == [BULK, BULK, INTERACTIVE]
+
+
+@pytest.mark.parametrize(
+    "fan_out",
+    [
+        broadcast.send_broadcast,
+        scheduler.send_daily_reminders,
+        notifications.notify_vip_users_about_new_task,
+        giveaway_scheduler.notify_giveaway_start,
+        giveaway_scheduler.handle_giveaway_finish,
+    ],
+)
+def test_fan_outs_send_as_bulk_traffic(fan_out):
+    async def probe():
+        pass
+
+    # Обёртка bulk_sender у всех одна и та же функция
+    assert fan_out.__code__ is bulk_sender(probe).__code__
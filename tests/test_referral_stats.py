@@ -0,0 +1,274 @@
+import asyncio
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from db.models.daily_bonus_claim import DailyBonusClaim
+from db.models.referral import Referral
+from db.models.task import Task, TaskCompletion
+from db.models.user import User
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from utils import referral_requests
+from utils.referral_requests import compute_referral_stats, kyiv_today
+
+USERS = 400
+TASKS = 7
+BIG_REFERRER = 1
+SMALL_REFERRER = 2
+BIG_REFERRALS = 10_000
+
+
+async def _old_referral_sums(session: AsyncSession, referrer_id: int) -> dict:
+    # Прежний подсчёт: по запросу на каждого реферала, только суммы
+    # процентов вместо среднего, чтобы сравнивать без округления
+    result = await session.execute(
+        select(User)
+        .join(Referral, Referral.referral_id == User.id)
+        .where(Referral.referrer_id == referrer_id)
+    )
+    referrals = result.scalars().all()
+    referral_ids = [r.id for r in referrals]
+
+    result = await session.execute(
+        select(func.count())
+        .select_from(Referral)
+        .where(Referral.referrer_id.in_(referral_ids))
+    )
+    nested = result.scalar_one()
+
+    total_tasks = (
+        await session.execute(select(func.count()).select_from(Task))
+    ).scalar_one()
+
+    bonus_sum = task_sum = 0
+    for referral in referrals:
+        days_since_reg = (kyiv_today() - referral.reg_date).days + 1 or 1
+        claims = (
+            await session.execute(
+                select(func.count()).where(DailyBonusClaim.user_id == referral.id)
+            )
+        ).scalar_one()
+        bonus_sum += min((claims / days_since_reg) * 100, 100)
+
+        if total_tasks:
+            completed = (
+                await session.execute(
+                    select(func.count())
+                    .select_from(TaskCompletion)
+                    .where(TaskCompletion.user_id == referral.id)
+                )
+            ).scalar_one()
+            task_sum += min((completed / total_tasks) * 100, 100)
+
+    return {
+        "referral_count": len(referrals),
+        "nested_referrals": nested,
+        "banned_count": sum(1 for r in referrals if r.is_banned),
+        "bonus_percent_sum": bonus_sum,
+        "task_percent_sum": task_sum,
+    }
+
+
+def _fill(session: AsyncSession, rng: random.Random, tasks: int) -> None:
+    today = kyiv_today()
+    users = [
+        User(
+            id=i,
+            telegram_id=1000 + i,
+            reg_date=today - timedelta(days=rng.randint(0, 60)),
+            is_banned=rng.random() < 0.1,
+        )
+        for i in range(1, USERS + 1)
+    ]
+    session.add_all(users)
+    session.add_all(
+        Task(id=i, title=f"task {i}", url="https://t.me/x") for i in range(1, tasks + 1)
+    )
+
+    # Дерево: каждый следующий пользователь приглашён кем-то из предыдущих
+    for user in users[1:]:
+        if rng.random() < 0.8:
+            referrer = rng.choice(users[: user.id - 1])
+            session.add(Referral(referral_id=user.id, referrer_id=referrer.id))
+
+        days = (today - user.reg_date).days + 1
+        for offset in rng.sample(range(days), rng.randint(0, days)):
+            session.add(
+                DailyBonusClaim(
+                    user_id=user.id,
+                    claim_date=user.reg_date + timedelta(days=offset),
+                    bonus_amount=Decimal("0.10"),
+                )
+            )
+        for task_id in rng.sample(range(1, tasks + 1), rng.randint(0, tasks)):
+            session.add(TaskCompletion(user_id=user.id, task_id=task_id))
+
+
+async def _compare(url: str, tasks: int) -> tuple[float, float]:
+    engine = create_async_engine(url)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            _fill(session, random.Random(tasks), tasks)
+            await session.commit()
+
+            started = time.perf_counter()
+            new = await compute_referral_stats(session)
+            set_based = time.perf_counter() - started
+
+            started = time.perf_counter()
+            referrer_ids = (
+                (await session.execute(select(Referral.referrer_id).distinct()))
+                .scalars()
+                .all()
+            )
+            old = {
+                referrer_id: await _old_referral_sums(session, referrer_id)
+                for referrer_id in referrer_ids
+            }
+            per_row = time.perf_counter() - started
+
+            assert new.keys() == old.keys()
+            for referrer_id, expected in old.items():
+                got = new[referrer_id]
+                for field in ("referral_count", "nested_referrals", "banned_count"):
+                    assert got[field] == expected[field], (referrer_id, field)
+                for field in ("bonus_percent_sum", "task_percent_sum"):
+                    assert float(got[field]) == pytest.approx(expected[field]), (
+                        referrer_id,
+                        field,
+                    )
+
+            # Для одного пользователя — те же числа, что и в общем пересчёте
+            some_id = referrer_ids[0]
+            assert await compute_referral_stats(session, some_id) == {
+                some_id: new[some_id]
+            }
+            return set_based, per_row
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.parametrize("tasks", [TASKS, 0])
+def test_set_based_stats_match_per_row_loop(postgres_url, tasks):
+    set_based, per_row = asyncio.run(_compare(postgres_url, tasks))
+    assert set_based < per_row
+
+
+async def _fill_big_referrer(session: AsyncSession) -> None:
+    # Пользователь 1 пригласил 10k человек, пользователь 2 — 10; у части
+    # рефералов есть свои рефералы, бонусы и задания
+    big, small = BIG_REFERRER, SMALL_REFERRER
+    statements = [
+        """
+        INSERT INTO users (id, telegram_id, stars, reg_date, is_banned, is_admin)
+        SELECT g, 1000 + g, 0, CAST(:today AS date) - g % 60, g % 17 = 0, false
+        FROM generate_series(1, :users) g
+        """,
+        """
+        INSERT INTO referrals (referral_id, referrer_id)
+        SELECT g, CASE
+            WHEN g <= 2 + :big_referrals THEN :big
+            WHEN g <= 2 + :big_referrals + :small_referrals THEN :small
+            ELSE g - :big_referrals - :small_referrals
+        END
+        FROM generate_series(3, :users) g
+        """,
+        """
+        INSERT INTO tasks (id, title, url, reward, requires_subscription)
+        SELECT g, 'task ' || g, 'https://t.me/x', 0, false
+        FROM generate_series(1, :tasks) g
+        """,
+        """
+        INSERT INTO daily_bonus_claims (user_id, claim_date, bonus_amount, streak)
+        SELECT u.id, CAST(:today AS date) - d, 0.1, 0
+        FROM users u, generate_series(0, 6) d
+        WHERE d <= (u.id * 7) % 11 AND u.reg_date <= CAST(:today AS date) - d
+        """,
+        """
+        INSERT INTO task_completions (user_id, task_id)
+        SELECT u.id, t FROM users u, generate_series(1, :tasks) t
+        WHERE (u.id + t) % 3 = 0
+        """,
+    ]
+    params = {
+        "today": kyiv_today(),
+        "users": 2 + BIG_REFERRALS + 10 + 2000,
+        "big": big,
+        "small": small,
+        "big_referrals": BIG_REFERRALS,
+        "small_referrals": 10,
+        "tasks": TASKS,
+    }
+    for statement in statements:
+        await session.execute(text(statement), params)
+    await session.commit()
+    await session.execute(text("ANALYZE"))
+
+
+def test_ten_thousand_referrals_in_constant_queries_under_100ms(postgres_url):
+    async def run():
+        engine = create_async_engine(postgres_url)
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        try:
+            async with AsyncSession(engine) as session:
+                await _fill_big_referrer(session)
+                event.listen(engine.sync_engine, "before_cursor_execute", count)
+
+                queries = {}
+                for referrer_id in (BIG_REFERRER, SMALL_REFERRER):
+                    statements.clear()
+                    await referral_requests.get_referral_stats(session, referrer_id)
+                    queries[referrer_id] = len(statements)
+                await session.rollback()
+
+                timings = []
+                for _ in range(5):
+                    started = time.perf_counter()
+                    stats = await compute_referral_stats(session, BIG_REFERRER)
+                    timings.append(time.perf_counter() - started)
+                return queries, min(timings), stats[BIG_REFERRER]
+        finally:
+            await engine.dispose()
+
+    queries, latency, stats = asyncio.run(run())
+
+    assert stats["referral_count"] == BIG_REFERRALS
+    # Чтение, пересчёт и upsert — сколько бы ни было рефералов
+    assert queries[BIG_REFERRER] == queries[SMALL_REFERRER] == 3
+    assert latency < 0.1
+
+
+def test_lazy_row_is_saved_only_with_callers_commit(postgres_url):
+    async def run():
+        engine = create_async_engine(postgres_url)
+        try:
+            async with AsyncSession(engine) as session:
+                _fill(session, random.Random(1), TASKS)
+                await session.commit()
+                referrer_id = (
+                    await session.execute(select(Referral.referrer_id).limit(1))
+                ).scalar_one()
+
+                await referral_requests.get_referral_stats(session, referrer_id)
+                await session.rollback()
+                assert (
+                    await session.get(referral_requests.ReferralStats, referrer_id)
+                    is None
+                )
+
+                stats = await referral_requests.get_referral_stats(session, referrer_id)
+                await session.commit()
+                assert await session.get(referral_requests.ReferralStats, referrer_id)
+                return stats
+        finally:
+            await engine.dispose()
+
+    stats = asyncio.run(run())
+    assert stats["referral_count"] > 0
@@ -0,0 +1,219 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from db.models.cube_game import CubeGame, GameStatus
+from db.models.game_settings import GameSetting
+from db.models.user import User
+from handlers.minigames_handlers import (
+    basketball_handlers,
+    cube_handlers,
+    slot_machine_handlers,
+)
+from services import active_players, cube_state, user_cache, user_dossier
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+TELEGRAM_LATENCY = 0.2  # сек на каждый вызов Bot API
+SLEEP_SCALE = 0.1  # анимации 3–4 с идут по 0.3–0.4 с
+# Сессия, пережившая хотя бы один вызов Telegram или паузу, сюда не влезет
+MAX_SESSION_HOLD = 0.15
+
+PLAYER1_TG, PLAYER2_TG = 1001, 1002
+
+
+class SessionHoldTimer:
+    """
+    Замена SessionLocal: настоящие сессии, но время от открытия
+    до закрытия каждой записывается.
+    """
+
+    def __init__(self, sessions: async_sessionmaker) -> None:
+        self.sessions = sessions
+        self.holds: list[float] = []
+
+    @asynccontextmanager
+    async def __call__(self):
+        started = time.monotonic()
+        try:
+            async with self.sessions() as session:
+                yield session
+        finally:
+            self.holds.append(time.monotonic() - started)
+
+
+async def _telegram(result=None):
+    await asyncio.sleep(TELEGRAM_LATENCY)
+    return result
+
+
+def _sent(chat_id: int = PLAYER1_TG, dice: int | None = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        message_id=1,
+        chat=SimpleNamespace(id=chat_id),
+        dice=SimpleNamespace(value=dice),
+    )
+
+
+class FakeBot:
+    async def send_message(self, chat_id, *args, **kwargs):
+        return await _telegram(_sent(chat_id))
+
+    async def forward_message(self, *args, **kwargs):
+        return await _telegram(_sent())
+
+    async def delete_message(self, *args, **kwargs):
+        return await _telegram(True)
+
+
+class FakeMessage:
+    def __init__(self, dice: int, total_amount: int = 1) -> None:
+        self.bot = FakeBot()
+        self.chat = SimpleNamespace(id=PLAYER1_TG)
+        self.from_user = SimpleNamespace(id=PLAYER1_TG)
+        self.successful_payment = SimpleNamespace(total_amount=total_amount)
+        self.dice = dice
+
+    async def answer_dice(self, *args, **kwargs):
+        return await _telegram(_sent(dice=self.dice))
+
+    async def answer(self, *args, **kwargs):
+        return await _telegram(_sent())
+
+    async def edit_reply_markup(self, *args, **kwargs):
+        return await _telegram(True)
+
+
+class FakeCallback:
+    def __init__(self, data: str, telegram_id: int, dice: int) -> None:
+        self.data = data
+        self.from_user = SimpleNamespace(id=telegram_id)
+        self.message = FakeMessage(dice)
+        self.bot = self.message.bot
+
+    async def answer(self, *args, **kwargs):
+        return await _telegram(True)
+
+
+class FakeState:
+    async def get_data(self) -> dict:
+        return {}
+
+    async def clear(self) -> None:
+        pass
+
+
+@pytest.fixture
+def timer(postgres_url, monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def scaled_sleep(delay, result=None):
+        return await real_sleep(delay * SLEEP_SCALE, result)
+
+    monkeypatch.setattr(asyncio, "sleep", scaled_sleep)
+
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    for module in (active_players, user_cache, user_dossier):
+        monkeypatch.setattr(module, "redis_client", redis)
+    store = cube_state.RedisCubeStateStore(redis=redis)
+    monkeypatch.setattr(cube_handlers, "cube_store", store)
+    monkeypatch.setattr(active_players, "cube_store", store)
+
+    timer = SessionHoldTimer(None)
+    for module in (cube_handlers, basketball_handlers, slot_machine_handlers):
+        monkeypatch.setattr(module, "SessionLocal", timer)
+    return timer
+
+
+async def _seed(postgres_url: str, timer: SessionHoldTimer) -> AsyncEngine:
+    # Движок создаётся в цикле теста — asyncpg привязан к нему
+    engine = create_async_engine(postgres_url)
+    timer.sessions = async_sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with timer.sessions() as session:
+        session.add_all(
+            [
+                User(id=1, telegram_id=PLAYER1_TG, username="p1", stars=Decimal(10)),
+                User(id=2, telegram_id=PLAYER2_TG, username="p2", stars=Decimal(10)),
+                GameSetting(key="cube_commission", value=Decimal(20)),
+                GameSetting(key="basketball_multiplier", value=Decimal("1.5")),
+            ]
+        )
+        await session.flush()
+        session.add(
+            CubeGame(
+                id=1,
+                player1_id=1,
+                player2_id=2,
+                bet=Decimal(1),
+                status=GameStatus.IN_PROGRESS,
+                created_at=datetime.now(),  # колонка без часового пояса
+            )
+        )
+        await session.commit()
+    timer.holds.clear()
+    return engine
+
+
+def _run(postgres_url: str, timer: SessionHoldTimer, handler) -> list[float]:
+    async def run():
+        engine = await _seed(postgres_url, timer)
+        try:
+            await handler()
+            await asyncio.gather(*slot_machine_handlers._result_tasks)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+    return timer.holds
+
+
+def test_handle_throw_cube_session_hold(postgres_url, timer):
+    async def both_throws():
+        await cube_handlers.handle_throw_cube(
+            FakeCallback("throw_cube_1_1", PLAYER1_TG, dice=6), FakeState()
+        )
+        await cube_handlers.handle_throw_cube(
+            FakeCallback("throw_cube_1_2_6", PLAYER2_TG, dice=2), FakeState()
+        )
+
+    holds = _run(postgres_url, timer, both_throws)
+
+    assert len(holds) == 3  # чтение на каждый бросок и расчёт партии
+    assert max(holds) < MAX_SESSION_HOLD
+
+
+def test_successful_basketball_payment_session_hold(postgres_url, timer):
+    holds = _run(
+        postgres_url,
+        timer,
+        lambda: basketball_handlers.successful_basketball_payment(
+            FakeMessage(dice=5, total_amount=2), FakeState()
+        ),
+    )
+
+    assert len(holds) == 1
+    assert max(holds) < MAX_SESSION_HOLD
+
+
+def test_successful_slot_machine_payment_session_hold(postgres_url, timer):
+    holds = _run(
+        postgres_url,
+        timer,
+        lambda: slot_machine_handlers.successful_slot_machine_payment(
+            FakeMessage(dice=64, total_amount=5)
+        ),
+    )
+
+    assert len(holds) == 1
+    assert max(holds) < MAX_SESSION_HOLD
@@ -0,0 +1,81 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramNetworkError
+from handlers.minigames_handlers import slot_machine_handlers
+
+
+class FakeMessage:
+    """
+    Платёж за спины: answer_dice отдаёт 🎰 по очереди и падает после fail_after.
+    """
+
+    def __init__(self, spins: int, fail_after: int | None = None) -> None:
+        self.successful_payment = SimpleNamespace(total_amount=spins)
+        self.from_user = SimpleNamespace(id=1001)
+        self.chat = SimpleNamespace(id=1001)
+        self.fail_after = fail_after
+        self.dice_sent = 0
+
+    async def answer_dice(self, emoji):
+        if self.dice_sent == self.fail_after:
+            raise TelegramNetworkError(method=None, message="connection reset")
+        self.dice_sent += 1
+        return SimpleNamespace(dice=SimpleNamespace(value=64))  # джекпот, 15⭐
+
+    async def answer(self, *args, **kwargs) -> None:
+        pass
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    logged = []
+
+    @asynccontextmanager
+    async def session_local():
+        yield None
+
+    async def get_user(session, telegram_id):
+        return SimpleNamespace(id=1, telegram_id=telegram_id)
+
+    async def log_spins(session, user, rewards):
+        logged.append(list(rewards))
+        return sum(rewards)
+
+    monkeypatch.setattr(slot_machine_handlers, "SessionLocal", session_local)
+    monkeypatch.setattr(slot_machine_handlers, "get_user_by_telegram_id", get_user)
+    monkeypatch.setattr(slot_machine_handlers, "log_slot_machine_spins", log_spins)
+    monkeypatch.setattr(slot_machine_handlers, "SLOT_ANIMATION", 0)
+    return logged
+
+
+def test_all_spins_are_settled_in_one_batch(logged):
+    async def run():
+        await slot_machine_handlers.successful_slot_machine_payment(FakeMessage(5))
+        await asyncio.gather(*slot_machine_handlers._result_tasks)
+
+    asyncio.run(run())
+
+    assert logged == [[15] * 5]
+
+
+def test_spins_sent_before_a_failure_are_still_credited(logged):
+    message = FakeMessage(10, fail_after=3)
+
+    with pytest.raises(TelegramNetworkError):
+        asyncio.run(slot_machine_handlers.successful_slot_machine_payment(message))
+
+    assert logged == [[15] * 3]
+
+
+def test_nothing_is_logged_when_no_spin_was_sent(logged):
+    with pytest.raises(TelegramNetworkError):
+        asyncio.run(
+            slot_machine_handlers.successful_slot_machine_payment(
+                FakeMessage(10, fail_after=0)
+            )
+        )
+
+    assert logged == []
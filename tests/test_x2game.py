@@ -0,0 +1,58 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from db.models.user import User
+from db.models.x2game import X2Game
+from utils import x2game_requests
+from utils.balance_requests import Balance
+
+from tests.fake_session import FakeDatabase, FakeSession
+
+
+async def _change_balance(
+    session, user_id, delta, reason, *, min_balance=None, ref_id=None
+) -> Balance | None:
+    user = session.db.tables[User][user_id]
+    if min_balance is not None and user.stars < min_balance:
+        return None
+    user.stars += delta
+    return Balance(user.stars, user.telegram_id)
+
+
+async def _noop(*args, **kwargs) -> None:
+    pass
+
+
+@pytest.fixture(autouse=True)
+def fake_balance(monkeypatch):
+    monkeypatch.setattr(x2game_requests, "change_balance", _change_balance)
+    monkeypatch.setattr(x2game_requests, "invalidate_user_profile", _noop)
+
+
+@pytest.mark.parametrize("win, stars", [(True, 15), (False, 5)])
+def test_bet_is_settled(win, stars):
+    user = User(id=1, telegram_id=1001, stars=Decimal(10))
+    db = FakeDatabase(user)
+
+    assert asyncio.run(
+        x2game_requests.save_x2game_results(FakeSession(db), user, Decimal(5), win)
+    )
+
+    assert user.stars == stars
+    (stats,) = db.rows(X2Game)
+    assert (stats.won, stats.lost) == ((5, 0) if win else (0, 5))
+
+
+@pytest.mark.parametrize("win", [True, False])
+def test_bet_larger_than_balance_is_rejected(win):
+    # Ставка проверялась по кэшу, а баланс с тех пор уменьшился
+    user = User(id=1, telegram_id=1001, stars=Decimal(3))
+    db = FakeDatabase(user)
+
+    assert not asyncio.run(
+        x2game_requests.save_x2game_results(FakeSession(db), user, Decimal(5), win)
+    )
+
+    assert user.stars == 3
+    assert db.rows(X2Game) == []